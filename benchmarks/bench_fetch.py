@@ -0,0 +1,271 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""大结果集读取内存/首行耗时基准测试
+
+向本地数据库写入合成数据,每种读取方式在独立子进程中执行,
+统计峰值内存(RSS)增量、首行耗时和总耗时:
+
+- select: `Table.select()` 全部读取为 List[dict]
+- cursor: `Table.cursor()` 流式迭代 dict
+- tuple: pymysql SSCursor 流式迭代 tuple
+- tuple_buffered: pymysql Cursor 一次读取全部 tuple
+- scan: `Table.parallel_scan(batch=True)` 多连接分段流式读取
+
+Example:
+    python -m benchmarks.bench_fetch load --rows 1000000
+    python -m benchmarks.bench_fetch run --counts 10000,100000,1000000 -o fetch.json
+"""
+__author__ = "hbh112233abc@163.com"
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from typing import Iterator, List
+
+import think_sql
+from tests.mysql.init_data import config as default_config, load as load_rows
+
+MODES = ("select", "cursor", "tuple", "tuple_buffered", "scan")
+# 仅 mysql 驱动支持的读取方式
+MYSQL_MODES = ("tuple", "tuple_buffered")
+
+WIDTHS = {
+    "narrow": "k INT NOT NULL, name VARCHAR(32) NOT NULL, created DATETIME NOT NULL",
+    "wide": (
+        "k INT NOT NULL, name VARCHAR(32) NOT NULL, created DATETIME NOT NULL, "
+        "c1 VARCHAR(255), c2 VARCHAR(255), c3 VARCHAR(255), c4 VARCHAR(255), "
+        "amount DECIMAL(12,2), body TEXT"
+    ),
+}
+
+
+def table_name(width: str) -> str:
+    return f"bench_{width}"
+
+
+def driver(db) -> str:
+    return "sqlite" if db.config.type in ("sqlite", "memory") else "mysql"
+
+
+def synthetic_rows(width: str, count: int) -> Iterator[dict]:
+    """生成合成数据,宽表每行约1.8KB"""
+    now = datetime.datetime(2024, 1, 1)
+    for i in range(count):
+        row = {
+            "k": i % 1000,
+            "name": f"name_{i:08d}",
+            "created": now + datetime.timedelta(seconds=i),
+        }
+        if width == "wide":
+            text = f"{i:08d}" * 25
+            row.update(
+                {
+                    "c1": text,
+                    "c2": text,
+                    "c3": text,
+                    "c4": text,
+                    "amount": Decimal(i % 100000) / 100,
+                    "body": text * 5,
+                }
+            )
+        yield row
+
+
+def load(cfg: dict, rows: int, widths: List[str], batch_size: int = 2000):
+    """建表并写入合成数据"""
+    db = think_sql.db(cfg)
+    try:
+        kind = driver(db)
+        for width in widths:
+            name = table_name(width)
+            db.execute(f"DROP TABLE IF EXISTS {name}")
+            if kind == "mysql":
+                db.execute(
+                    f"CREATE TABLE {name} (id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY, {WIDTHS[width]}) "
+                    "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+                )
+            else:
+                db.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, {WIDTHS[width]})")
+            start = time.perf_counter()
+            count = load_rows(db, name, synthetic_rows(width, rows), batch_size)
+            print(f"{name}: {count} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    finally:
+        db.close()
+
+
+def peak_rss() -> int:
+    """进程峰值内存(字节),不支持时返回0"""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(cfg: dict, mode: str, width: str, count: int) -> dict:
+    """在当前进程中执行一次读取
+
+    Returns:
+        dict: {rows, first_row, total, base_rss, peak_rss, rss}
+    """
+    db = think_sql.db(cfg)
+    name = table_name(width)
+    table = db.table(name)
+    sql = table.fetch_sql().order("id").limit(count).select()
+    base = peak_rss()
+    rows = 0
+    first = None
+    start = time.perf_counter()
+    if mode == "select":
+        data = db.table(name).order("id").limit(count).select()
+        first = time.perf_counter()
+        for _ in data:
+            rows += 1
+        del data
+    elif mode == "cursor":
+        for _ in db.table(name).order("id").limit(count).cursor():
+            if first is None:
+                first = time.perf_counter()
+            rows += 1
+    elif mode in MYSQL_MODES:
+        if driver(db) != "mysql":
+            raise ValueError(f"mode `{mode}` needs mysql")
+        import pymysql
+
+        cls = pymysql.cursors.SSCursor if mode == "tuple" else pymysql.cursors.Cursor
+        cursor = db.connector.cursor(cls)
+        cursor.execute(sql)
+        for _ in cursor:
+            if first is None:
+                first = time.perf_counter()
+            rows += 1
+        cursor.close()
+    elif mode == "scan":
+        # 主键连续,按id范围取前count行
+        for batch in db.table(name).where("id", "<=", count).parallel_scan(workers=4, batch=True):
+            if first is None:
+                first = time.perf_counter()
+            rows += len(batch)
+    else:
+        raise ValueError(f"unknown mode `{mode}`")
+    total = time.perf_counter() - start
+    peak = peak_rss()
+    db.close()
+    return {
+        "rows": rows,
+        "first_row": (first or time.perf_counter()) - start,
+        "total": total,
+        "base_rss": base,
+        "peak_rss": peak,
+        "rss": peak - base,
+    }
+
+
+def run(cfg: dict, counts: List[int], widths: List[str], modes: List[str]) -> dict:
+    """每种读取方式在独立子进程中执行
+
+    Returns:
+        dict: {meta, results: [{mode, width, count, rows, first_row, total, rss, ...}]}
+    """
+    results = []
+    for width in widths:
+        for count in counts:
+            for mode in modes:
+                cmd = [
+                    sys.executable, "-m", "benchmarks.bench_fetch", "measure",
+                    "--config", json.dumps(cfg),
+                    "--mode", mode, "--width", width, "--count", str(count),
+                ]
+                proc = subprocess.run(cmd, capture_output=True, text=True)
+                result = {"mode": mode, "width": width, "count": count}
+                if proc.returncode == 0:
+                    result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                else:
+                    result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+                results.append(result)
+                print(format_row(result), file=sys.stderr)
+    meta = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "database": cfg.get("type", "mysql"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def format_row(result: dict) -> str:
+    if "error" in result:
+        return f"{result['width']:<6} {result['count']:>9} {result['mode']:<15} error: {result['error']}"
+    return (
+        f"{result['width']:<6} {result['count']:>9} {result['mode']:<15} "
+        f"first {result['first_row'] * 1000:>9.1f}ms total {result['total']:>8.2f}s "
+        f"rss +{result['rss'] / 1048576:>8.1f}MB"
+    )
+
+
+def report(result: dict) -> str:
+    """markdown 报告"""
+    from tabulate import tabulate
+
+    rows = [
+        [
+            r["width"], r["count"], r["mode"],
+            round(r["first_row"] * 1000, 1) if "error" not in r else "-",
+            round(r["total"], 3) if "error" not in r else "-",
+            round(r["rss"] / 1048576, 1) if "error" not in r else r["error"],
+        ]
+        for r in result["results"]
+    ]
+    headers = ["width", "rows", "mode", "first row (ms)", "total (s)", "peak rss (MB)"]
+    return tabulate(rows, headers, tablefmt="github")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="think_sql fetch memory benchmarks")
+    parser.add_argument("--config", default="", help="数据库配置json,默认 tests/mysql/init_data.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_load = sub.add_parser("load", help="写入合成数据")
+    p_load.add_argument("--rows", type=int, default=1000000)
+    p_load.add_argument("--widths", default="narrow,wide")
+    p_load.add_argument("--batch-size", type=int, default=2000)
+
+    p_run = sub.add_parser("run", help="执行基准测试")
+    p_run.add_argument("--counts", default="10000,100000,1000000")
+    p_run.add_argument("--widths", default="narrow,wide")
+    p_run.add_argument("--modes", default=",".join(MODES))
+    p_run.add_argument("-o", "--output", help="结果写入json文件,同时生成同名 .md 报告")
+
+    p_measure = sub.add_parser("measure", help="单次读取(子进程)")
+    p_measure.add_argument("--config", dest="measure_config", default="")
+    p_measure.add_argument("--mode", choices=MODES, required=True)
+    p_measure.add_argument("--width", default="narrow")
+    p_measure.add_argument("--count", type=int, default=10000)
+
+    args = parser.parse_args(argv)
+    raw = getattr(args, "measure_config", "") or args.config
+    cfg = json.loads(raw) if raw else dict(default_config)
+
+    if args.command == "load":
+        load(cfg, args.rows, args.widths.split(","), args.batch_size)
+    elif args.command == "measure":
+        print(json.dumps(measure(cfg, args.mode, args.width, args.count)))
+    else:
+        counts = [int(x) for x in args.counts.split(",")]
+        result = run(cfg, counts, args.widths.split(","), args.modes.split(","))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            with open(os.path.splitext(args.output)[0] + ".md", "w", encoding="utf-8") as f:
+                f.write(report(result) + "\n")
+        print(report(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
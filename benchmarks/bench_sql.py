@@ -0,0 +1,237 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""sql构建、数据行处理基准测试,无需数据库
+
+Example:
+    python -m benchmarks.bench_sql -o result.json
+    python -m benchmarks.bench_sql --compare result.json
+    python -m benchmarks.bench_sql -k parse_where --repeat 3
+"""
+__author__ = "hbh112233abc@163.com"
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List
+
+from think_sql.mysql import util
+from benchmarks.offline import FakeCursor, OfflineDB
+
+ROW_SIZES = (1, 100, 10000)
+IN_SIZES = (1, 50, 5000)
+
+
+def make_rows(n: int) -> List[dict]:
+    """生成测试数据"""
+    now = datetime.datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        {
+            "id": i + 1,
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "age": 18 + i % 60,
+            "score": 60.5 + i % 40,
+            "state": i % 2,
+            "create_time": now,
+        }
+        for i in range(n)
+    ]
+
+
+def cases(db: OfflineDB) -> Dict[str, Dict[int, Callable]]:
+    """基准用例 {名称: {规模: 函数}}"""
+    table = db.table("user")
+    suite = {}
+
+    suite["parse_key"] = {
+        1: lambda: util.parse_key("u.username"),
+        100: lambda: [util.parse_key(f"u.field_{i} AS f{i}") for i in range(100)],
+    }
+
+    def where_in(values):
+        return lambda: util.parse_where("id", "in", values)
+
+    suite["parse_where"] = {n: where_in(list(range(n))) for n in IN_SIZES}
+    suite["parse_where_like"] = {1: lambda: util.parse_where("username", "like", "%abc%")}
+
+    def select_in(values):
+        # fetch_sql 的 select 不会重置条件,每次先 init 避免条件累积
+        return lambda: (
+            table.init()
+            .fetch_sql()
+            .field("id,username,email")
+            .where("id", "in", values)
+            .where("state", 1)
+            .order("id", "desc")
+            .limit(20)
+            .select()
+        )
+
+    suite["select_sql"] = {n: select_in(list(range(n))) for n in IN_SIZES}
+
+    def insert(rows):
+        return lambda: table.fetch_sql().insert(rows)
+
+    suite["insert_sql"] = {n: insert(make_rows(n)) for n in ROW_SIZES}
+
+    def update(values):
+        return lambda: table.fetch_sql().where("id", "in", values).update({"state": 0, "age": 20})
+
+    suite["update_sql"] = {n: update(list(range(n))) for n in IN_SIZES}
+
+    def batch_update(rows):
+        return lambda: table.batch_update(rows, "id")
+
+    suite["batch_update"] = {n: batch_update(make_rows(n)) for n in ROW_SIZES}
+
+    def cache_key(values):
+        return lambda: table.cache().where("id", "in", values).select()
+
+    suite["cache_key"] = {n: cache_key(list(range(n))) for n in IN_SIZES}
+
+    def fetch_rows(rows):
+        def run():
+            FakeCursor.set_rows(rows)
+            try:
+                return table.where("state", 1).select()
+            finally:
+                FakeCursor.set_rows([])
+
+        return run
+
+    suite["select_rows"] = {n: fetch_rows(make_rows(n)) for n in ROW_SIZES}
+    return suite
+
+
+def stable(name: str, size: int, func: Callable):
+    """用例重复执行结果必须一致,避免链式条件在多次执行间累积
+
+    Raises:
+        AssertionError: 两次执行结果不一致
+    """
+    first = func()
+    if func() != first:
+        raise AssertionError(f"{name} [{size}] returns a different result when repeated")
+
+
+def measure(func: Callable, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """计时,每轮执行次数自动调整到不少于 `min_time` 秒
+
+    Returns:
+        dict: {number, repeat, min, median, mean} 单次耗时(秒)
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+def run(keyword: str = "", repeat: int = 5, min_time: float = 0.2) -> dict:
+    """执行基准测试
+
+    Args:
+        keyword (str, optional): 只执行名称包含该关键字的用例. Defaults to "".
+        repeat (int, optional): 重复轮数. Defaults to 5.
+        min_time (float, optional): 每轮最少耗时(秒). Defaults to 0.2.
+
+    Returns:
+        dict: {meta, results: [{name, size, number, repeat, min, median, mean}]}
+    """
+    db = OfflineDB()
+    results = []
+    for name, sizes in cases(db).items():
+        if keyword and keyword not in name:
+            continue
+        for size, func in sizes.items():
+            stable(name, size, func)
+            result = {"name": name, "size": size}
+            result.update(measure(func, repeat, min_time))
+            results.append(result)
+            print(f"{name:<18} {size:>6} {result['median'] * 1e6:>12.1f} us", file=sys.stderr)
+    meta = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[dict]:
+    """对比两次结果的中位数
+
+    Args:
+        baseline (dict): 基准结果
+        current (dict): 本次结果
+        threshold (float, optional): 变化超过该比例标记为 slower/faster. Defaults to 0.1.
+
+    Returns:
+        List[dict]: [{name, size, baseline, current, ratio, status}]
+    """
+    old = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+    report = []
+    for r in current["results"]:
+        key = (r["name"], r["size"])
+        if key not in old:
+            continue
+        ratio = r["median"] / old[key] if old[key] else float("inf")
+        status = "same"
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        report.append(
+            {
+                "name": key[0],
+                "size": key[1],
+                "baseline": old[key],
+                "current": r["median"],
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="think_sql offline benchmarks")
+    parser.add_argument("-o", "--output", help="结果写入json文件")
+    parser.add_argument("-k", "--keyword", default="", help="只执行名称包含关键字的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少耗时(秒)")
+    parser.add_argument("--compare", help="与之前的json结果对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="对比变化阈值")
+    args = parser.parse_args(argv)
+
+    result = run(args.keyword, args.repeat, args.min_time)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            result["compare"] = compare(json.load(f), result, args.threshold)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        slower = [r for r in result["compare"] if r["status"] == "slower"]
+        for r in slower:
+            print(f"slower: {r['name']} [{r['size']}] x{r['ratio']:.2f}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""无数据库环境运行 mysql Table
+
+使用未连接的 pymysql Connection(defer_connect) 完成参数转义,
+FakeCursor 只记录生成的sql并返回预设结果
+"""
+__author__ = "hbh112233abc@163.com"
+
+from typing import List
+
+import pymysql
+from pymysql.cursors import DictCursor
+
+from think_sql.mysql.db import DB
+from think_sql.mysql.table import Table
+
+COLUMNS = [
+    ("id", "int(11)", "PRI", "auto_increment"),
+    ("username", "varchar(64)", "", ""),
+    ("email", "varchar(128)", "", ""),
+    ("age", "int(11)", "", ""),
+    ("score", "decimal(10,2)", "", ""),
+    ("state", "tinyint(4)", "", ""),
+    ("create_time", "datetime", "", ""),
+]
+
+
+class FakeCursor(DictCursor):
+    """记录sql不执行,`desc` 返回 COLUMNS,其他查询返回 `set_rows()` 设置的数据
+
+    与 pymysql 相同,数据以 tuple 保存,每次读取时才转换为 dict
+    """
+
+    fields: tuple = ()
+    values: List[tuple] = []
+
+    @classmethod
+    def set_rows(cls, rows: List[dict]):
+        """设置查询结果,空列表清除"""
+        cls.fields = tuple(rows[0]) if rows else ()
+        cls.values = [tuple(row.values()) for row in rows]
+
+    def execute(self, query, args=None):
+        self._executed = self.mogrify(query, args)
+        if self._executed.lower().startswith("desc"):
+            self._fields = ("Field", "Type", "Null", "Key", "Default", "Extra")
+            self._rows = [(f, t, "YES", k, None, e) for f, t, k, e in COLUMNS]
+        else:
+            self._fields = self.fields
+            self._rows = self.values
+        self.rowcount = len(self._rows)
+        self.rownumber = 0
+        return self.rowcount
+
+    def fetchall(self):
+        rows = [
+            self.dict_type(zip(self._fields, row))
+            for row in self._rows[self.rownumber :]
+        ]
+        self.rownumber = len(self._rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+class OfflineDB(DB):
+    """不连接数据库的 mysql DB"""
+
+    def __init__(self, config={"database": "bench"}, params={}):
+        super().__init__(config, params)
+
+    def connect(self):
+        self.connector = pymysql.connections.Connection(
+            defer_connect=True, charset="utf8mb4"
+        )
+        self.connector.server_status = 0
+        self.cursor = self.connector.cursor(FakeCursor)
+
+    def check_connected(self):
+        return True
+
+    def commit(self):
+        self.commit_stats["commits"] += 1
+
+    def close(self):
+        pass
+
+
+def offline_table(db: OfflineDB = None, table_name: str = "user") -> Table:
+    """创建无数据库的 Table"""
+    db = db or OfflineDB()
+    return db.table(table_name)
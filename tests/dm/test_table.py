@@ -289,3 +289,10 @@ def test_get_insert_id(db):
     assert res > 0
     max_id = table.max("ID")
     assert res == max_id
+
+def test_table_batch_inc(db):
+    table = Table(db, table_name)
+    assert table.batch_inc("AGE", "ID", {1: 1, 2: 2}) == 2
+    sql = table.fetch_sql().batch_inc("AGE", "USERNAME", {"Zed": 1}, upsert=True)
+    assert sql.startswith(f'MERGE INTO DMHR."{table_name}" T USING (SELECT \'Zed\' AS "USERNAME", 1 AS "AGE" FROM DUAL)')
+    assert "WHEN NOT MATCHED THEN INSERT" in sql
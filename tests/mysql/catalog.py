@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""返回固定 information_schema 元数据的假连接,sql_helper 和 advisor 测试共用"""
+__author__ = "hbh112233abc@163.com"
+
+import re
+
+
+class CatalogDB:
+    """返回固定元数据的假连接,记录查询和执行的sql
+
+    元数据行按sql中出现的 `'表名'` 过滤,模拟 information_schema 的表条件
+    """
+
+    class config:
+        type = "mysql"
+        database = "config"
+
+    # (表名, 索引名, 序号, 字段名, NON_UNIQUE, CARDINALITY)
+    indexes = []
+    # {表名: (行数, 平均行长度, [(字段名, 类型)])}
+    tables = {}
+    # {字段名: 采样中的不同值个数}
+    ndv = {}
+
+    # 服务端版本 get_server_info()
+    version = "8.0.32"
+    # exec 执行包含该字符串的sql时抛出异常
+    fail = None
+
+    def __init__(self):
+        self.sqls = []
+        self.executed = []
+        self.invisible = False
+        # 已创建的不可见索引 {索引名: (表名, 字段)}
+        self.created = {}
+        self.connector = self
+
+    def get_server_info(self):
+        return self.version
+
+    def server_version(self):
+        return tuple(int(x) for x in self.version.split("-")[0].split("."))
+
+    def exec(self, sql, params=()):
+        if self.fail and self.fail in sql:
+            raise RuntimeError(f"execute failed: {sql}")
+        self.executed.append(sql)
+        if "use_invisible_indexes=on" in sql:
+            self.invisible = True
+        if "use_invisible_indexes=off" in sql:
+            self.invisible = False
+        match = re.match(r"ALTER TABLE `?(\w+)`? ADD INDEX (\w+)\((.*)\) INVISIBLE", sql)
+        if match:
+            table, name, columns = match.groups()
+            self.created[name] = (table, tuple(c.strip("`") for c in columns.split(",")))
+        match = re.match(r"ALTER TABLE \S+ DROP INDEX (\w+)", sql)
+        if match:
+            self.created.pop(match.group(1))
+        return 0
+
+    def execute(self, sql, params=()):
+        # 同 DB.execute,失败时返回0
+        try:
+            return self.exec(sql, params)
+        except Exception:
+            return 0
+
+    def query(self, sql, params=()):
+        self.sqls.append(sql)
+        if sql.startswith("SELECT DATABASE()"):
+            # 会话当前库与配置不同(执行过 USE test)
+            return [{"db": "test"}]
+        if "information_schema.STATISTICS" in sql:
+            return [
+                {
+                    "TABLE_SCHEMA": "test",
+                    "TABLE_NAME": table,
+                    "INDEX_NAME": index,
+                    "SEQ_IN_INDEX": seq,
+                    "COLUMN_NAME": column,
+                    "NON_UNIQUE": non_unique,
+                    "CARDINALITY": cardinality,
+                }
+                for table, index, seq, column, non_unique, cardinality in self.indexes
+                if f"'{table}'" in sql
+            ]
+        if "information_schema.TABLES" in sql:
+            return [
+                {"TABLE_SCHEMA": "test", "TABLE_NAME": t, "TABLE_ROWS": rows, "AVG_ROW_LENGTH": length}
+                for t, (rows, length, _) in self.tables.items()
+                if f"'{t}'" in sql
+            ]
+        if "information_schema.COLUMNS" in sql:
+            return [
+                {"TABLE_SCHEMA": "test", "TABLE_NAME": t, "COLUMN_NAME": c, "DATA_TYPE": d,
+                 "CHARACTER_OCTET_LENGTH": 400, "NUMERIC_PRECISION": 10}
+                for t, (_, _, columns) in self.tables.items()
+                if f"'{t}'" in sql
+                for c, d in columns
+            ]
+        if "COUNT(DISTINCT" in sql:
+            row = {"__rows": 100000}
+            row.update({c: v for c, v in self.ndv.items() if f"`{c}`)" in sql})
+            return [row]
+        return []
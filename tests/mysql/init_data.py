@@ -1,5 +1,5 @@
 
-from faker import Faker
+from typing import Iterable, Iterator
 
 from think_sql.mysql.db import DB
 
@@ -11,18 +11,46 @@ config = {
     'password': 'root',
 }
 
-data = []
-faker = Faker()
-for _ in range(100):
-    data.append(
-        {
+
+def fake_users(count: int) -> Iterator[dict]:
+    """使用 faker 生成测试用户数据"""
+    from faker import Faker
+
+    faker = Faker()
+    for _ in range(count):
+        yield {
             'name': faker.name(),
             'address': faker.address(),
             'age': faker.random.randint(1, 150),
             'remark': faker.text(),
             'status': 1,
         }
-    )
 
-with DB(**config) as db:
-    db.table('user').insert(data)
+
+def load(db, table_name: str, rows: Iterable[dict], batch_size: int = 1000) -> int:
+    """分批写入数据
+
+    Args:
+        db (Database): 数据库连接
+        table_name (str): 表名
+        rows (Iterable[dict]): 数据
+        batch_size (int, optional): 每批行数. Defaults to 1000.
+
+    Returns:
+        int: 写入行数
+    """
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            count += db.table(table_name).insert(batch)
+            batch = []
+    if batch:
+        count += db.table(table_name).insert(batch)
+    return count
+
+
+if __name__ == '__main__':
+    with DB(config) as db:
+        load(db, 'user', fake_users(100))
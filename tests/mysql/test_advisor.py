@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+from think_sql.mysql.advisor import IndexAdvisor, advise, advise_report, parse_query
+from think_sql.tool.plan import parse_json
+
+from tests.mysql.catalog import CatalogDB
+
+
+class WorkloadDB(CatalogDB):
+    tables = {
+        "user": (1000000, 200, [("id", "int"), ("name", "varchar"), ("status", "tinyint"), ("age", "int"), ("email", "varchar"), ("bio", "text")]),
+        "order": (5000000, 100, [("id", "bigint"), ("uid", "int"), ("created", "datetime"), ("amount", "decimal")]),
+    }
+    indexes = [(t, "PRIMARY", 1, "id", 0, rows) for t, (rows, _, _) in tables.items()]
+    ndv = {"status": 3, "age": 100, "name": 90000, "email": 100000, "uid": 90000, "created": 99000}
+
+
+class ExplainDB(WorkloadDB):
+    """支持 explain,不可见索引开启时代价降低"""
+
+    def explain(self, sql, params=(), analyze=False):
+        self.sqls.append(f"EXPLAIN {sql}")
+        cost = 10.0 if self.invisible else 1100.0
+        return parse_json(
+            {
+                "query_block": {
+                    "cost_info": {"query_cost": str(cost)},
+                    "table": {
+                        "table_name": "user",
+                        "access_type": "ALL",
+                        "rows_examined_per_scan": 1000000,
+                        "cost_info": {"read_cost": "900.0", "eval_cost": "100.0"},
+                    },
+                }
+            }
+        )
+
+
+WORKLOAD = {
+    "SELECT * FROM user WHERE email = 'a@b.c'": 1000,
+    "SELECT id, name FROM user WHERE status = 1 AND age > 30 ORDER BY name LIMIT 20": 200,
+    "SELECT u.name FROM user u JOIN `order` o ON u.id = o.uid WHERE u.email = 'x' AND o.created > '2024-01-01'": 10,
+    "INSERT INTO user (name) VALUES ('x')": 5000,
+    "SELECT * FROM user WHERE bio = 'x'": 1,
+}
+
+
+def test_parse_query():
+    shape = parse_query(
+        "SELECT u.name FROM user u JOIN `order` o ON u.id = o.uid "
+        "WHERE u.status = 1 AND o.created > '2024-01-01' AND u.name LIKE '%a' ORDER BY o.created LIMIT 10"
+    )
+    assert shape.tables == ["user", "order"]
+    assert shape.eq == {"user": ["id", "status"], "order": ["uid"]}
+    assert shape.join == {"user": ["id"], "order": ["uid"]}
+    # 前缀模糊匹配不能使用索引
+    assert shape.range == {"order": ["created"]}
+    assert shape.order == {"order": ["created"]}
+    assert shape.limit == 10
+
+    shape = parse_query("UPDATE user SET name = 'x', age = age + 1 WHERE email = 'a'")
+    assert shape.write == "UPDATE"
+    assert shape.set_columns == ["name", "age"]
+    assert shape.eq == {"user": ["email"]}
+
+
+def test_advise():
+    db = WorkloadDB()
+    result = advise(db, WORKLOAD)
+    indexes = [(i["table"], tuple(i["columns"])) for i in result["indexes"]]
+    assert indexes == [
+        ("user", ("email",)),
+        ("user", ("status", "name")),
+        ("order", ("uid", "created")),
+    ]
+    # 每次插入都要维护user表的索引
+    assert result["indexes"][0]["write_cost"] == 5000
+    assert result["total"]["cost_after"] < result["total"]["cost_before"]
+    # text字段不能直接建索引,代价不变
+    bio = [q for q in result["queries"] if "bio" in q["sql"]][0]
+    assert bio["cost_after"] == bio["cost_before"]
+    # 每个表的索引、行数、字段信息只查询一次
+    assert len([sql for sql in db.sqls if "information_schema" in sql]) == 6
+    assert "idx_email" in advise_report(result)
+
+
+def test_advise_budget():
+    result = advise(WorkloadDB(), WORKLOAD, max_indexes=1)
+    assert [i["columns"] for i in result["indexes"]] == [["email"]]
+
+    result = advise(WorkloadDB(), WORKLOAD, storage_budget=250 << 20)
+    assert [i["columns"] for i in result["indexes"]] == [["uid", "created"]]
+
+    # 写入代价超过收益时不推荐
+    result = advise(WorkloadDB(), {"SELECT * FROM user WHERE status = 1": 1, "INSERT INTO user (name) VALUES ('x')": 10**9})
+    assert result["indexes"] == []
+
+
+def test_advise_invisible():
+    db = ExplainDB()
+    advisor = IndexAdvisor(db, mode="invisible")
+    advisor.add("SELECT * FROM user WHERE email = 'a@b.c'", 100)
+    result = advisor.advise(max_indexes=1)
+    assert result["indexes"][0]["columns"] == ["email"]
+    assert result["queries"][0]["cost_before"] == 1100.0
+    assert result["queries"][0]["cost_after"] == 10.0
+    ddl = [sql for sql in db.executed if sql.startswith("ALTER TABLE")]
+    assert "INVISIBLE" in ddl[0] and "DROP INDEX" in ddl[1]
+    assert not db.invisible
+
+
+def test_advise_invisible_failed():
+    db = ExplainDB()
+    db.fail = "ADD INDEX"
+    advisor = IndexAdvisor(db, mode="invisible")
+    advisor.add("SELECT * FROM user WHERE email = 'a@b.c'", 100)
+    result = advisor.advise(max_indexes=1)
+    # 创建失败时不记录索引,按 hypothetical 估算
+    assert result["indexes"][0]["columns"] == ["email"]
+    assert 10.0 < result["queries"][0]["cost_after"] < 1100.0
+    assert advisor.invisible == {}
+    assert not any("DROP INDEX" in sql for sql in db.executed)
+    assert not db.invisible
+
+
+def test_advise_invisible_unsupported():
+    db = ExplainDB()
+    db.version = "10.6.12-MariaDB"
+    advisor = IndexAdvisor(db, mode="invisible")
+    advisor.add("SELECT * FROM user WHERE email = 'a@b.c'", 100)
+    result = advisor.advise(max_indexes=1)
+    assert advisor.mode == "hypothetical"
+    assert result["indexes"][0]["columns"] == ["email"]
+    assert db.executed == []
+
+
+class JoinDB(ExplainDB):
+    """关联查询两个表的索引同时存在时代价才明显降低"""
+
+    def explain(self, sql, params=(), analyze=False):
+        self.sqls.append(f"EXPLAIN {sql}")
+        created = list(self.created.values()) if self.invisible else []
+        user = any(t == "user" and c[0] == "email" for t, c in created)
+        order = any(t == "order" and c[0] == "uid" for t, c in created)
+        cost = 10.0 if user and order else 900.0 if user else 1000.0
+        return parse_json({"query_block": {"cost_info": {"query_cost": str(cost)}}})
+
+
+def test_advise_invisible_together():
+    db = JoinDB()
+    advisor = IndexAdvisor(db, mode="invisible")
+    advisor.add("SELECT u.name FROM user u JOIN `order` o ON u.id = o.uid WHERE u.email = 'x'", 1)
+    result = advisor.advise(max_indexes=3)
+    indexes = [(i["table"], i["columns"][0]) for i in result["indexes"]]
+    assert indexes == [("user", "email"), ("order", "uid")]
+    assert result["queries"][0]["cost_after"] == 10.0
+    assert db.created == {} and not db.invisible
+
+
+def test_advise_plan():
+    db = ExplainDB()
+    advisor = IndexAdvisor(db)
+    advisor.add("SELECT * FROM user WHERE email = 'a@b.c'", 100)
+    result = advisor.advise(max_indexes=1)
+    query = result["queries"][0]
+    # 以执行计划的真实代价为基准,表的访问代价按模型比例缩小,其他代价不变
+    assert query["cost_before"] == 1100.0
+    assert 100.0 <= query["cost_after"] < 101.0
+    assert not [sql for sql in db.executed if sql.startswith("ALTER TABLE")]
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import pytest
+
+from think_sql import db as connect
+from think_sql.mysql import ClusterDB
+
+dsn = "root:'root'@127.0.0.1:3306/test"
+
+
+@pytest.fixture(scope="module")
+def db():
+    db = connect({"primary": dsn, "replicas": [dsn, dsn], "sticky": 0.5})
+    yield db
+    db.close()
+
+
+def test_cluster_db(db):
+    assert isinstance(db, ClusterDB)
+    assert len(db.replicas) == 2
+    assert db.reader() in db.replicas
+
+
+def test_round_robin(db):
+    assert db.reader() is not db.reader()
+
+
+def test_transaction_reads_primary(db):
+    with db.start_trans():
+        assert db.reader() is db
+
+
+def test_sticky_primary(db):
+    db.execute("SELECT 1")
+    assert db.reader() is db
+
+
+def test_transaction_sticky(db):
+    db.last_write = 0
+    with db.start_trans(unit_of_work=True):
+        pass
+    assert db.reader() is db
+
+
+def test_query_on_replica(db):
+    db.last_write = 0
+    table = db.table("test")
+    table.where("id", 1).find()
+    assert table.last_cursor in [r.cursor for r in db.replicas]
@@ -5,6 +5,8 @@ __author__ = "hbh112233abc@163.com"
 from think_sql.mysql.db import DB
 from think_sql.mysql.sql_helper import *
 
+from tests.mysql.catalog import CatalogDB
+
 
 def test_sql_helper():
     """
@@ -24,3 +26,166 @@ def test_parse_where_condition():
     """
     res = parse_where_condition(sql)
     assert isinstance(res, dict)
+
+
+SLOW_LOG = """/usr/sbin/mysqld, Version: 8.0.32 (MySQL Community Server - GPL). started with:
+Tcp port: 3306  Unix socket: /var/run/mysqld/mysqld.sock
+Time                 Id Command    Argument
+# Time: 2024-01-01T00:00:01.000000Z
+# User@Host: root[root] @ localhost []  Id:     8
+# Query_time: 2.000000  Lock_time: 0.000100 Rows_sent: 1  Rows_examined: 10000
+use test;
+SET timestamp=1704067201;
+SELECT * FROM user WHERE age = 18;
+# Time: 2024-01-01T00:00:02.000000Z
+# User@Host: root[root] @ localhost []  Id:     8
+# Query_time: 3.000000  Lock_time: 0.000100 Rows_sent: 1  Rows_examined: 10000
+SET timestamp=1704067202;
+SELECT *
+FROM user
+WHERE age = 20;
+# Time: 2024-01-01T00:00:03.000000Z
+# User@Host: root[root] @ localhost []  Id:     8
+# Query_time: 1.000000  Lock_time: 0.000100 Rows_sent: 5  Rows_examined: 500
+SET timestamp=1704067203;
+SELECT * FROM orders WHERE status = 1;
+"""
+
+
+def test_parse_slow_log(tmp_path):
+    path = tmp_path / "slow.log"
+    path.write_text(SLOW_LOG)
+    entries = list(parse_slow_log(path))
+    assert len(entries) == 3
+    assert entries[0]["sql"] == "SELECT * FROM user WHERE age = 18"
+    assert entries[0]["database"] == "test"
+    assert entries[1]["query_time"] == 3.0
+    assert entries[1]["rows_examined"] == 10000
+    assert "WHERE age = 20" in entries[1]["sql"]
+
+
+class FakeDB:
+    def __init__(self):
+        self.clones = []
+        self.closed = False
+
+    def clone(self):
+        conn = FakeDB()
+        self.clones.append(conn)
+        return conn
+
+    def close(self):
+        self.closed = True
+
+
+def test_analyze_workload(tmp_path):
+    path = tmp_path / "slow.log"
+    path.write_text(SLOW_LOG)
+    db = FakeDB()
+    seen = []
+
+    def analyzer(conn, sql):
+        seen.append((conn, sql))
+        if "user" in sql:
+            return ["建议添加索引：ALTER TABLE user ADD INDEX idx_age(age);"]
+        return []
+
+    result = analyze_workload(db, path, workers=2, analyzer=analyzer)
+    assert result["total"] == {"statements": 3, "fingerprints": 2, "time": 6.0}
+    first, second = result["statements"]
+    assert first["count"] == 2 and first["total_time"] == 5.0
+    # 最慢的一次作为样本
+    assert "age = 20" in first["sample"]
+    assert first["suggestions"] == ["ALTER TABLE user ADD INDEX idx_age(age)"]
+    assert second["suggestions"] == []
+    assert result["indexes"][0]["weight"] == 5.0
+    # 每个指纹只分析一次,使用独立连接并在结束后关闭
+    assert len(seen) == 2
+    assert all(conn is not db for conn, _ in seen)
+    assert db.clones and all(conn.closed for conn in db.clones)
+
+
+def test_analyze_workload_statements():
+    sqls = "select * from a where id = 1; select * from a where id = 2; update a set x = 1"
+    result = analyze_workload(FakeDB(), sqls, workers=1, analyzer=lambda conn, sql: [])
+    assert result["total"]["fingerprints"] == 2
+    first, second = result["statements"]
+    assert first["count"] == 2 and first["weight"] == 2
+    assert second["logs"] == ["sql_helper工具仅支持select语句"]
+
+
+def test_count_column_values():
+    import think_sql
+
+    db = think_sql.db({"type": "memory", "database": "sql_helper_count"})
+    db.execute("DROP TABLE IF EXISTS t")
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, status INT, name VARCHAR(20))")
+    db.table("t").insert(
+        [{"status": 1 if i % 10 else 2, "name": f"n{i}"} for i in range(100)]
+    )
+    result = count_column_values(
+        db, "t", ["status", "name", ("status", "status = 2")], sample_size=50
+    )
+    # 前50行中 status=1 有45条, 阈值 min(100, 50) / 2
+    assert result[("status", "1=1")] == [("1", 45)]
+    assert result[("name", "1=1")] == []
+    assert result[("status", "status = 2")] == []
+    assert count_column_value(db, "t", "status", 50) == [("1", 45)]
+    db.close()
+
+
+def test_histogram_frequency():
+    singleton = {
+        "buckets": [[1, 0.1], [2, 0.8], [3, 1.0]],
+        "null-values": 0.0,
+        "histogram-type": "singleton",
+    }
+    value, frequency = histogram_frequency(singleton)
+    assert value == 2 and round(frequency, 2) == 0.7
+
+    text = {
+        "buckets": [["base64:type254:YQ==", 0.3], ["base64:type254:Yg==", 1.0]],
+        "histogram-type": "singleton",
+    }
+    assert histogram_frequency(text)[0] == "b"
+
+    equi_height = {
+        "buckets": [[1, 10, 0.3, 10], [11, 11, 0.9, 1], [12, 100, 1.0, 80]],
+        "histogram-type": "equi-height",
+    }
+    value, frequency = histogram_frequency(equi_height)
+    assert value == 11 and round(frequency, 2) == 0.6
+    # 多值桶合计超过一半,无法确定
+    assert histogram_frequency({"buckets": [[1, 10, 0.6, 5]], "histogram-type": "equi-height"}) is None
+
+
+class IndexCatalogDB(CatalogDB):
+    # 没有直方图,统计信息只来自索引
+    version = "5.7.40"
+    indexes = [
+        ("user", "PRIMARY", 1, "id", 0, 100),
+        ("user", "idx_name_age", 1, "name", 1, 80),
+        ("user", "idx_name_age", 2, "age", 1, 90),
+        ("user", "idx_gender", 1, "gender", 1, 2),
+        ("order", "idx_uid", 1, "uid", 1, 50),
+    ]
+
+
+def test_index_metadata():
+    db = IndexCatalogDB()
+    metadata = IndexMetadata(db)
+    metadata.preload(["user", "`order`", "test.user", "log"])
+    # 没有库名前缀的表使用会话当前库,不是配置的库名
+    assert metadata.key("user") == ("test", "user")
+    assert db.sqls[0] == "SELECT DATABASE() AS db"
+    assert len(db.sqls) == 2
+    assert check_index_exist(db, "user", "age", metadata=metadata)
+    assert not check_index_exist(db, "user", "status", metadata=metadata)
+    assert check_index_exist_multi(db, "user", "age,name", 2, metadata=metadata)[0]["INDEX_NAME"] == "idx_name_age"
+    assert not check_index_exist_multi(db, "user", "age,uid", 2, metadata=metadata)
+    assert "idx_uid" in execute_index_query(db, "order", "uid", metadata=metadata)
+    # 没有索引的表也会缓存
+    assert metadata.rows("log") == []
+    # 低基数字段不使用 CARDINALITY 估算,由服务端分组计数
+    assert column_statistics(db, "user", ["id", "name", "gender"], metadata) == {"id": []}
+    assert len(db.sqls) == 2
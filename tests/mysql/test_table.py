@@ -455,3 +455,98 @@ def test_batch_update(db):
     res = db.table('test').batch_update(data, key='id')
     assert isinstance(res, int)
     assert res > 0
+
+def test_parallel_scan(db):
+    rows = list(db.table('test').parallel_scan(workers=3))
+    assert len(rows) == db.table('test').count()
+
+    ids = [r['id'] for r in db.table('test').where('state', 1).parallel_scan(workers=3, ordered=True)]
+    assert ids == sorted(ids)
+    assert len(ids) == db.table('test').where('state', 1).count()
+
+    batches = list(db.table('test').parallel_scan(workers=2, batch=True, batch_size=2))
+    assert all(isinstance(b, list) and len(b) <= 2 for b in batches)
+
+    sql = db.table('test').fetch_sql().where('state', 1).parallel_scan(workers=2)
+    assert isinstance(sql, list)
+    assert sql[0].startswith("SELECT * FROM test  WHERE (state = 1) AND `id` >= ")
+
+    with pytest.raises(ValueError):
+        db.table('test').limit(1).parallel_scan()
+
+    # 提前结束时断开工作连接,不读取剩余数据
+    scan = db.table('test').parallel_scan(workers=2, batch_size=1)
+    assert isinstance(next(scan), dict)
+    scan.close()
+    assert db.table('test').count() > 0
+
+def test_copy_into(db):
+    target = DB(db.config)
+    drop_table(target, 'test_copy_into')
+    target.execute("CREATE TABLE test_copy_into LIKE test")
+    try:
+        res = db.table('test').where('state', 1).copy_into(target, 'test_copy_into', batch_size=2)
+        assert res == db.table('test').where('state', 1).count()
+        # resume: nothing left to copy
+        res = db.table('test').where('state', 1).copy_into(target, 'test_copy_into')
+        assert res == 0
+        assert target.table('test_copy_into').count() == db.table('test').where('state', 1).count()
+    finally:
+        drop_table(target, 'test_copy_into')
+        target.close()
+
+def test_unit_of_work(db):
+    with db.start_trans(unit_of_work=True):
+        futures = [
+            db.table('test').insert({'username': f'uow{i}', 'age': 20, 'state': 3})
+            for i in range(5)
+        ]
+        assert not futures[0].done()
+        # read of the same table flushes pending writes
+        assert db.table('test').where('state', 3).count() == 5
+        assert [f.result() for f in futures] == [1] * 5
+        updated = db.table('test').where('state', 3).update({'age': 21})
+        deleted = db.table('test').where('state', 3).delete()
+        assert not deleted.done()
+    assert updated.result() == 5
+    assert deleted.result() == 5
+    assert db.table('test').where('state', 3).count() == 0
+
+
+def test_chunked_update_delete(db):
+    db.table('test').insert(
+        [{'username': f'chunk{i}', 'age': 20, 'state': 4} for i in range(23)]
+    )
+    progress = []
+    assert db.table('test').where('state', 4).update(
+        {'age': 30}, chunk_size=5, progress=progress.append
+    ) == 23
+    assert len(progress) == 5
+    assert progress[-1]['total'] == 23
+    assert db.table('test').where('state', 4).where('age', 30).count() == 23
+
+    progress = []
+    assert db.table('test').where('state', 4).delete(
+        chunk_size=10, sleep=0.01, progress=progress.append
+    ) == 23
+    assert [p['rows'] for p in progress] == [10, 10, 3]
+    assert db.table('test').where('state', 4).count() == 0
+
+
+def test_batch_inc(db):
+    ids = [
+        db.table('test').insert({'username': f'inc{i}', 'age': 20, 'state': 5}, get_insert_id=True)
+        for i in range(3)
+    ]
+    assert db.table('test').batch_inc('age', 'id', {ids[0]: 1, ids[1]: -2, ids[2]: 0}) == 2
+    assert db.table('test').where('id', 'in', ids).column('age', 'id') == {
+        ids[0]: 21,
+        ids[1]: 18,
+        ids[2]: 20,
+    }
+
+    counter = db.table('test').counter('age', interval_ms=10000)
+    for _ in range(10):
+        counter.inc(ids[2])
+    counter.flush()
+    assert db.table('test').where('id', ids[2]).value('age') == 30
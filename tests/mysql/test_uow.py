@@ -0,0 +1,19 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+from think_sql.mysql.uow import UnitOfWork
+
+
+def test_merge_keeps_table_order():
+    uow = UnitOfWork(None)
+    delete = "DELETE FROM {} WHERE id = %s"
+    uow.statement("a", delete.format("a"), (0,))
+    uow.statement("b", delete.format("b"), (10,))
+    uow.statement("a", delete.format("a"), (1,))
+    assert [(b.table, len(b.items)) for b in uow.batches] == [("a", 1), ("b", 1), ("a", 1)]
+
+    uow.statement("a", delete.format("a"), (2,))
+    uow.insert("a", "(id)", "(%s)", (3,), 1)
+    uow.insert("a", "(id)", "(%s)", (4,), 1)
+    assert [(b.table, len(b.items)) for b in uow.batches][-2:] == [("a", 2), ("a", 2)]
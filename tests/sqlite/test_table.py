@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import datetime
+from decimal import Decimal
+
+import pytest
+
+import think_sql
+from think_sql.sqlite.db import DB
+from think_sql.sqlite import util
+from think_sql.sqlite.util import format_sql, translate
+
+
+@pytest.fixture
+def db(request):
+    db = think_sql.db({"type": "memory", "database": request.node.name})
+    db.execute(
+        "CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT UNIQUE, age INT, score DECIMAL(10,2), created DATETIME)"
+    )
+    db.table("user").insert(
+        [{"username": f"u{i}", "age": i, "score": Decimal("1.5")} for i in range(10)]
+    )
+    yield db
+    db.close()
+
+
+def test_format_sql():
+    assert format_sql("a = %s AND b IN %s AND c LIKE '%%x'", (1, [2, 3])) == (
+        "a = ? AND b IN (?,?) AND c LIKE '%x'",
+        (1, 2, 3),
+    )
+    assert format_sql("a = %(a)s", {"a": "x'y"}, bind=False) == "a = 'x''y'"
+    assert format_sql("a LIKE '%'") == ("a LIKE '%'", ())
+    when = datetime.datetime(2024, 1, 1, 8, 30)
+    assert format_sql("%s,%s,%s", (None, True, when), bind=False) == "NULL,1,'2024-01-01 08:30:00'"
+    assert translate("DELETE FROM user WHERE age > ? LIMIT 5;") == (
+        "DELETE FROM user WHERE rowid IN (SELECT rowid FROM user WHERE age > ? LIMIT 5)"
+    )
+
+
+def test_driver(db):
+    assert isinstance(db, DB)
+    assert db.get_tables() == ["user"]
+    table = db.table("user")
+    assert table.pk["Field"] == "id"
+    assert table.columns["id"]["autoinc"]
+    assert list(table.get_fields()) == ["id", "username", "age", "score", "created"]
+
+
+def test_executed_lazy(db, monkeypatch):
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return format_sql(*args, **kwargs)
+
+    table = db.table("user")
+    monkeypatch.setattr(util, "format_sql", counted)
+    table.where("username", "u1").find()
+    assert len(calls) == 1
+    assert table.get_last_sql() == "SELECT * FROM user  WHERE username = 'u1' LIMIT 1"
+    assert len(calls) == 2
+
+
+def test_select(db):
+    rows = db.table("user").where("id", "in", [1, 2]).order("id", "desc").select()
+    assert [r["username"] for r in rows] == ["u1", "u0"]
+    assert db.table("user").where("username", "like", "u%").count() == 10
+    assert db.table("user").where("id", 3).value("username") == "u2"
+    assert db.table("user").order("id").page(2, 3).column("username", "id") == {
+        4: "u3",
+        5: "u4",
+        6: "u5",
+    }
+    assert db.table("user").sum("age") == 45
+    assert db.table("user").max("age") == 9
+    assert db.table("user").where("age", ">", 100).exists() is False
+    sql = db.table("user").fetch_sql().where("username", "u'1").limit(0, 2).select()
+    assert sql == "SELECT * FROM user  WHERE username = 'u''1' LIMIT 0,2"
+
+
+def test_write(db):
+    assert db.table("user").insert({"username": "x", "age": 1}, get_insert_id=True) == 11
+    assert db.table("user").where("age", ">", 5).update({"age": 0}) == 4
+    assert db.table("user").where("age", 0).delete() == 5
+    assert db.table("user").where("age", ">", 0).delete(chunk_size=2) == 6
+    assert db.table("user").count() == 0
+
+
+def test_execute_timing(db):
+    events = db.profile(10)
+    commit_write = db.commit_write
+
+    def slow_commit():
+        time.sleep(0.05)
+        commit_write()
+
+    db.commit_write = slow_commit
+    db.table("user").where("id", 1).update({"age": 20})
+    event = events[-1]
+    assert event.operation == "execute"
+    assert event.execute >= 0.05
+    assert event.fetch < 0.05
+
+
+def test_chunk_where_or(db):
+    db.group_commit(size=100)
+    table = db.table("user").where("age", "<", 2).where_or("age", ">", 7)
+    assert table.update({"score": 0}, chunk_size=1) == 4
+    assert db.pending_writes == 0
+    assert db.table("user").where("score", 0).order("id").column("age") == [0, 1, 8, 9]
+    table = db.table("user").where("age", "<", 2).where_or("age", ">", 7)
+    assert table.delete(chunk_size=3) == 4
+    assert db.table("user").count() == 6
+
+
+def test_batch_inc(db):
+    assert db.table("user").batch_inc("age", "id", {1: 5, 2: 3}) == 2
+    assert db.table("user").where("id", "in", [1, 2]).column("age") == [5, 4]
+    db.table("user").batch_inc("age", "username", {"u0": 1, "new": 2}, upsert=True)
+    assert db.table("user").where("username", "in", ["u0", "new"]).order("id").column("age") == [6, 2]
+
+
+def test_transaction(db):
+    def insert():
+        db.table("user").insert({"username": "tx", "age": 1})
+        raise ValueError("rollback")
+
+    with pytest.raises(ValueError):
+        db.transaction(insert)
+    assert db.table("user").where("username", "tx").count() == 0
+
+
+def test_shared_memory(db):
+    conn = db.clone()
+    assert conn.table("user").count() == 10
+    conn.close()
+    for i in range(5):
+        db.table("user").insert_async({"username": f"async{i}", "age": i})
+    db.flush_writers()
+    assert db.table("user").count() == 15
+
+
+def test_copy_into_resume(db, request):
+    target = think_sql.db({"type": "memory", "database": f"{request.node.name}_target"})
+    target.execute("CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT UNIQUE, age INT, score DECIMAL(10,2), created DATETIME)")
+    target.table("user").insert({"id": 9, "username": "u8", "age": 8})
+    # 续传条件作用于整个 where_or 条件,不会重复复制 id<=9 的数据
+    table = db.table("user").where("age", "<", 2).where_or("age", ">", 7)
+    assert table.copy_into(target) == 1
+    assert target.table("user").order("id").column("id") == [9, 10]
+    target.close()
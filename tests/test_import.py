@@ -0,0 +1,45 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# `import think_sql` 不应导入的模块
+HEAVY_MODULES = (
+    "pymysql",
+    "dmPython",
+    "pydantic",
+    "dill",
+    "loguru",
+    "cacheout",
+    "http.server",
+    "think_sql.tool.base",
+)
+
+
+def run(code: str, *args, cwd: str = ROOT) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, *args, "-c", code], capture_output=True, text=True, cwd=cwd, env=env
+    )
+
+
+def test_lazy_import():
+    proc = run(
+        f"import sys, think_sql; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    assert proc.stdout.strip() == "[]"
+    proc = run("import think_sql; print(think_sql.DBConfig.__name__, think_sql.ShardedDB.__name__)")
+    assert proc.stdout.strip() == "DBConfig ShardedDB"
+
+
+def test_no_import_side_effects(tmp_path):
+    pytest.importorskip("click")
+    proc = run("import think_sql.mysql.diff", cwd=str(tmp_path))
+    assert proc.returncode == 0, proc.stderr
+    assert not (tmp_path / "logs").exists()
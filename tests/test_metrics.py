@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import gc
+import threading
+import urllib.request
+
+import pytest
+
+from think_sql import metrics
+from think_sql.tool.base import Database, TableBase
+from think_sql.tool.profile import QueryEvent
+
+
+class Connector:
+    def commit(self):
+        pass
+
+
+@pytest.fixture()
+def db():
+    db = Database({"type": "mysql", "database": "test"})
+    db.connector = Connector()
+    metrics.reset()
+    metrics.enable(db)
+    yield db
+    metrics.disable(db)
+    metrics.disable()
+    metrics.reset()
+
+
+def test_query_metrics(db):
+    db.emit(QueryEvent("query", "user", "SELECT 1", execute=0.003, rows=2))
+    db.emit(QueryEvent("query", "user", "SELECT 1", execute=0.2, rows=3))
+    db.emit(QueryEvent("execute", "user", "UPDATE", execute=0.01, error=ValueError()))
+    text = metrics.render()
+    assert 'think_sql_query_duration_seconds_bucket{table="user",operation="query",le="0.005"} 1' in text
+    assert 'think_sql_query_duration_seconds_bucket{table="user",operation="query",le="+Inf"} 2' in text
+    assert 'think_sql_query_duration_seconds_count{table="user",operation="query"} 2' in text
+    assert 'think_sql_rows_total{table="user",operation="query"} 5' in text
+    assert 'think_sql_queries_total{table="user",operation="execute",status="error"} 1' in text
+    assert "# TYPE think_sql_query_duration_seconds histogram" in text
+
+
+def test_thread_shards(db):
+    def work():
+        for _ in range(1000):
+            db.commit()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert metrics.REGISTRY.value("think_sql_commits_total", database="test") == 4000
+
+
+def test_retired_shards(db):
+    db.emit(QueryEvent("query", "user", "SELECT 1", execute=0.003, rows=1))
+    shards = len(metrics.REGISTRY.shards)
+
+    def work():
+        db.commit()
+        db.emit(QueryEvent("query", "user", "SELECT 1", execute=0.003, rows=1))
+
+    for _ in range(20):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    gc.collect()
+    # 结束线程的分片合并后移除
+    assert len(metrics.REGISTRY.shards) == shards
+    assert metrics.REGISTRY.value("think_sql_commits_total", database="test") == 20
+    assert metrics.REGISTRY.value("think_sql_rows_total", table="user") == 21
+    assert 'think_sql_query_duration_seconds_count{table="user",operation="query"} 21' in metrics.render()
+
+
+def test_cache_metrics(db):
+    table = TableBase(db, "user").cache("k")
+    table.get_cache()
+    table.set_cache([{"id": 1}])
+    table.get_cache()
+    assert metrics.REGISTRY.value("think_sql_cache_total", result="hit") == 1
+    assert metrics.REGISTRY.value("think_sql_cache_total", result="miss") == 1
+
+
+def test_disabled(db):
+    metrics.disable()
+    db.commit()
+    assert metrics.REGISTRY.value("think_sql_commits_total") == 0
+
+
+def test_serve(db):
+    db.commit()
+    server = metrics.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+    finally:
+        server.shutdown()
+    assert 'think_sql_commits_total{database="test"} 1' in body
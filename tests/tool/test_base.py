@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+
+import pytest
+
+from think_sql.tool.base import Database
+
+
+class Connector:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture()
+def db():
+    db = Database({"type": "mysql"})
+    db.connector = Connector()
+    return db
+
+
+def test_commit_default(db):
+    db.commit_read()
+    db.commit_write()
+    assert db.connector.commits == 2
+    assert db.commit_stats == {"commits": 2, "saved": 0}
+
+    db.auto_commit = False
+    db.commit_read()
+    db.commit_write()
+    assert db.connector.commits == 2
+
+
+def test_explain_unsupported(db):
+    assert db.explain("SELECT 1") is None
+
+
+def test_wait_replica(db):
+    lags = [3, 1]
+    db.max_replica_lag = lambda: lags.pop(0)
+    db.wait_replica(2, interval=0)
+    assert lags == []
+
+    # 从库未复制时延迟为无穷大,超时后抛出异常
+    db.max_replica_lag = lambda: float("inf")
+    with pytest.raises(TimeoutError):
+        db.wait_replica(2, interval=0.01, timeout=0.05)
+
+
+def test_read_only(db):
+    db.read_only()
+    for _ in range(3):
+        db.commit_read()
+    assert db.connector.commits == 0
+    assert db.commit_stats["saved"] == 3
+
+
+def test_group_commit_size(db):
+    db.group_commit(size=3)
+    for _ in range(7):
+        db.commit_write()
+    assert db.connector.commits == 2
+    assert db.pending_writes == 1
+    assert db.commit_stats["saved"] == 5
+    db.flush_pending()
+    assert db.connector.commits == 3
+    assert db.pending_writes == 0
+
+
+def test_group_commit_ms(db):
+    db.group_commit(next_write_ms=50)
+    db.commit_write()
+    db.commit_write()
+    assert db.connector.commits == 0
+    time.sleep(0.06)
+    db.commit_write()
+    assert db.connector.commits == 1
+
+    # read commits pending writes
+    db.commit_write()
+    db.commit_read()
+    assert db.connector.commits == 2
+    assert db.pending_writes == 0
+
+
+def test_group_commit_last_write(db):
+    # 没有后续写操作时,等待时间只在下一次写操作时检查,需要手动提交
+    db.group_commit(next_write_ms=10)
+    db.commit_write()
+    time.sleep(0.02)
+    assert db.connector.commits == 0
+    assert db.pending_writes == 1
+    db.flush_pending()
+    assert db.connector.commits == 1
+    assert db.pending_writes == 0
+
+
+def deadlock(times: int):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= times:
+            raise Exception(1213, "Deadlock found when trying to get lock")
+        return len(calls)
+
+    return func
+
+
+def test_retry(db):
+    db.retry(attempts=3, base=0.001, codes=(1213, 1205))
+    assert db.with_retry(deadlock(2), "user") == 3
+    assert db.connector.rollbacks == 2
+    assert db.retry_stats[("user", 1213)] == 2
+
+    with pytest.raises(Exception):
+        db.with_retry(deadlock(4), "user")
+    assert db.retry_stats[("user", 1213)] == 5
+
+
+def test_retry_unsafe(db):
+    db.retry(attempts=3, base=0.001, codes=(1213,))
+    # 事务中不重试单条语句
+    db.auto_commit = False
+    with pytest.raises(Exception):
+        db.with_retry(deadlock(1), "user")
+    db.auto_commit = True
+
+    # 未提交的合并写入会随死锁回滚,不重试
+    db.group_commit(size=10)
+    db.commit_write()
+    with pytest.raises(Exception):
+        db.with_retry(deadlock(1), "user")
+    assert not db.retry_stats
+
+    # 非重试错误码
+    db.flush_pending()
+    with pytest.raises(ValueError):
+        db.with_retry(lambda: int("x"), "user")
+
+
+def test_backoff(db):
+    db.retry(base=0.1, max_delay=0.3)
+    assert 0.05 <= db.backoff(0) <= 0.1
+    assert 0.1 <= db.backoff(1) <= 0.2
+    assert 0.15 <= db.backoff(5) <= 0.3
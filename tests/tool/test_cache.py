@@ -0,0 +1,33 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import pytest
+
+cacheout = pytest.importorskip("cacheout")
+pytest.importorskip("dill")
+
+from think_sql.tool import cache as cache_module
+from think_sql.tool.cache import cache
+
+
+def test_empty_storage():
+    storage = cacheout.Cache()
+    calls = []
+
+    @cache(storage=storage)
+    def add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    assert add(1, 2) == 3
+    assert add(1, 2) == 3
+    assert calls == [(1, 2)]
+    assert len(storage) == 1
+
+
+def test_default_storage():
+    assert cache_module.cache_storage is cache_module.default_storage()
+    assert isinstance(cache_module.cache_storage, cacheout.Cache)
+    with pytest.raises(AttributeError):
+        cache_module.missing
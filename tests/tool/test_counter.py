@@ -0,0 +1,135 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import threading
+
+import pytest
+
+from think_sql.tool.base import Database, TableBase
+
+
+class Table(TableBase):
+    def batch_inc(self, field, key, steps, upsert=False):
+        if self.db.fail:
+            raise ConnectionError("lost connection")
+        self.db.calls.append(dict(steps))
+        for k, v in steps.items():
+            self.db.rows[k] = self.db.rows.get(k, 0) + v
+        return len(steps)
+
+
+class Connector:
+    def __init__(self, db):
+        self.db = db
+
+    def commit(self):
+        if self.db.fail_commit:
+            raise ConnectionError("lost connection")
+
+    def rollback(self):
+        pass
+
+
+class DB(Database):
+    def __init__(self, config={"type": "mysql"}, params={}, shared=None):
+        super().__init__(config, params)
+        self.shared = shared or self
+        self.connector = Connector(self.shared)
+        self.rows = {}
+        self.calls = []
+        self.fail = False
+        self.fail_commit = False
+        self.tables = 0
+
+    def clone(self):
+        return DB(self.config, self.params, self)
+
+    def table(self, table_name):
+        self.tables += 1
+        return Table(self.shared, table_name)
+
+    def close(self):
+        self.close_writers()
+
+
+@pytest.fixture()
+def db():
+    db = DB()
+    yield db
+    db.close()
+
+
+def test_coalesce(db):
+    counter = db.table("page").counter("views", interval_ms=10000)
+    for _ in range(100):
+        counter.inc(1)
+    counter.inc(2, 5)
+    counter.dec(2)
+    assert counter.pending() == {1: 100, 2: 4}
+    assert counter.flush() == 2
+    assert db.calls == [{1: 100, 2: 4}]
+    assert db.table("page").counter("views") is counter
+    counter.inc(1)
+    counter.flush()
+    assert counter.conn.tables == 1
+
+
+def test_interval(db):
+    counter = db.table("page").counter("views", interval_ms=20)
+    counter.inc(1)
+    time.sleep(0.2)
+    assert db.rows == {1: 1}
+
+
+def test_exact_under_threads(db):
+    counter = db.table("page").counter("views", interval_ms=1)
+
+    def work():
+        for i in range(2000):
+            counter.inc(i % 10)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    db.close()
+    assert db.rows == {i: 1600 for i in range(10)}
+
+
+def test_failed_flush_restored(db):
+    errors = []
+    counter = db.table("page").counter(
+        "views", interval_ms=10000, on_error=lambda e, steps: errors.append(steps)
+    )
+    counter.inc(1, 3)
+    db.fail = True
+    counter.flush()
+    assert errors == [{1: 3}]
+    counter.inc(1)
+    db.fail = False
+    db.close()
+    assert db.rows == {1: 4}
+    # 失败后重新创建数据表对象
+    assert counter.conn.tables == 2
+    with pytest.raises(RuntimeError):
+        counter.inc(1)
+
+
+def test_failed_commit_not_restored(db):
+    errors = []
+    counter = db.table("page").counter(
+        "views", interval_ms=10000, on_error=lambda e, steps: errors.append(steps)
+    )
+    counter.inc(1, 3)
+    # 语句已执行,提交失败不合并回缓冲区
+    db.fail_commit = True
+    counter.flush()
+    assert errors == [{1: 3}]
+    assert counter.pending() == {}
+    db.fail_commit = False
+    counter.inc(1)
+    db.close()
+    assert db.calls == [{1: 3}, {1: 1}]
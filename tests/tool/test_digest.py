@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import random
+
+from think_sql.tool.base import Database
+from think_sql.tool.digest import QuantileSketch
+from think_sql.tool.profile import QueryEvent
+
+
+class DB(Database):
+    def close(self):
+        self.close_writers()
+
+
+def test_quantile_sketch():
+    sketch = QuantileSketch(accuracy=0.01)
+    values = [random.uniform(0.001, 2) for _ in range(10000)]
+    for v in values:
+        sketch.add(v)
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact < 0.02
+    assert QuantileSketch().quantile(0.5) == 0.0
+
+
+def test_digest():
+    db = DB({"type": "mysql"})
+    assert db.digest() == []
+    log = db.query_digest()
+    for i in range(1, 101):
+        db.emit(QueryEvent("query", "user", "SELECT * FROM user WHERE id IN (%s,%s)", (i, i + 1), execute=i / 1000, rows=2))
+    for i in range(3):
+        db.emit(QueryEvent("query", "user", "select * from user where id in (%s)", (i,), execute=0.01, rows=1))
+    db.emit(QueryEvent("execute", "user", "UPDATE user SET age=%s WHERE id=%s", (1, 2), execute=0.5, rows=1))
+    db.emit(QueryEvent("execute", "user", "UPDATE user SET age=%s WHERE id=%s", (1, 3), execute=0.1, error=ValueError()))
+
+    top = db.digest(top=10)
+    assert [d["count"] for d in top] == [103, 2]
+    select = top[0]
+    assert select["sql"] == "select * from user where id in (?+)"
+    assert select["rows_returned"] == 203
+    assert abs(select["p50"] - 0.049) < 0.002
+    assert abs(select["p99"] - 0.099) < 0.002
+    assert select["max"] == 0.1
+    assert select["sample"]["params"] == (2,)
+    update = top[1]
+    assert update["rows_affected"] == 1 and update["errors"] == 1
+    assert [d["count"] for d in db.digest(top=1, by="max")] == [2]
+
+    assert db.query_digest(0) is None
+    assert db.digest() == [] and log.closed
+    db.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import pytest
+
+from think_sql.tool.base import Database
+from think_sql.tool.nplusone import NPlusOneError
+from think_sql.tool.profile import QueryEvent
+
+
+def find(db, table: str, id: int):
+    db.emit(QueryEvent("query", table, f"SELECT * FROM {table} WHERE `id` = %s LIMIT 1", (id,)))
+
+
+def test_detect():
+    db = Database({"type": "mysql"})
+    with db.detect_n_plus_one(threshold=3) as detector:
+        for i in range(5):
+            find(db, "user", i)
+        for i in range(3):
+            find(db, "dept", i)
+    assert db.listeners == []
+    assert len(detector.findings) == 1
+    finding = detector.findings[0]
+    assert finding["count"] == 5
+    assert finding["table"] == "user"
+    assert finding["sql"] == "select * from user where `id` = ? limit ?"
+    assert "test_nplusone.py:" in finding["call_sites"][0]
+    assert "where('id', 'in', values)" in finding["suggestion"]
+
+
+def test_strict():
+    db = Database({"type": "mysql"})
+    with pytest.raises(NPlusOneError):
+        with db.detect_n_plus_one(threshold=2, strict=True):
+            for i in range(3):
+                find(db, "user", i)
+
+    with db.detect_n_plus_one(threshold=2, strict=True) as detector:
+        find(db, "user", 1)
+    assert detector.findings == []
@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import think_sql
+from think_sql.tool.plan import parse_analyze, parse_dm, parse_json
+
+JSON_PLAN = """
+{
+  "query_block": {
+    "select_id": 1,
+    "cost_info": {"query_cost": "1234.50"},
+    "ordering_operation": {
+      "using_temporary_table": true,
+      "using_filesort": true,
+      "cost_info": {"sort_cost": "100.00"},
+      "nested_loop": [
+        {
+          "table": {
+            "table_name": "u",
+            "access_type": "ALL",
+            "possible_keys": ["PRIMARY"],
+            "rows_examined_per_scan": 100000,
+            "rows_produced_per_join": 10000,
+            "filtered": "10.00",
+            "cost_info": {"read_cost": "900.00", "eval_cost": "100.00", "prefix_cost": "1000.00"},
+            "attached_condition": "(`test`.`u`.`status` = 1)"
+          }
+        },
+        {
+          "table": {
+            "table_name": "o",
+            "access_type": "ref",
+            "possible_keys": ["idx_uid"],
+            "key": "idx_uid",
+            "used_key_parts": ["uid"],
+            "rows_examined_per_scan": 2,
+            "rows_produced_per_join": 20000,
+            "filtered": "100.00",
+            "cost_info": {"read_cost": "110.00", "eval_cost": "24.50", "prefix_cost": "1134.50"}
+          }
+        }
+      ]
+    }
+  }
+}
+"""
+
+ANALYZE_PLAN = """-> Limit: 10 row(s)  (cost=1.21e+6 rows=10) (actual time=820..820 rows=10 loops=1)
+    -> Sort: u.`name`, limit input to 10 row(s) per chunk  (cost=1.21e+6 rows=99800) (actual time=820..820 rows=10 loops=1)
+        -> Filter: (u.`status` = 1)  (cost=10125 rows=99800) (actual time=0.06..790 rows=33000 loops=1)
+            -> Table scan on u  (cost=10125 rows=99800) (actual time=0.05..700 rows=100000 loops=1)
+        -> Index lookup on o using idx_uid (uid=u.id)  (cost=0.25..0.35 rows=2) (never executed)
+"""
+
+DM_PLAN = """1   #NSET2: [12, 10, 48]
+2     #PRJT2: [12, 10, 48]; exp_num(2), is_atom(FALSE)
+3       #SORT3: [12, 10, 48]; key_num(1), is_distinct(FALSE), top_flag(0), is_adaptive(0)
+4         #SLCT2: [11, 10, 48]; T.STATUS = 1
+5           #CSCN2: [11, 1000, 48]; INDEX33555484(T)
+"""
+
+
+def test_parse_json():
+    plan = parse_json(JSON_PLAN)
+    assert plan.cost == 1234.5
+    assert [n.table for n in plan.tables()] == ["u", "o"]
+    u, o = plan.table("u"), plan.table("o")
+    assert u.full_scan and u.rows == 100000 and u.filtered == 10.0 and u.cost == 1000.0
+    assert o.access_type == "ref" and o.key == "idx_uid" and o.used_key_parts == ["uid"]
+    assert plan.full_scans(min_rows=1000) == [u]
+    assert plan.full_scans(min_rows=1000000) == []
+    assert plan.using_filesort and plan.using_temporary
+    assert plan.to_dict()["root"]["children"][0]["operation"] == "ordering_operation"
+
+
+def test_parse_analyze():
+    plan = parse_analyze(ANALYZE_PLAN)
+    assert plan.root.operation.startswith("Limit")
+    assert plan.cost == 1.21e6
+    scan = plan.table("u")
+    assert scan.access_type == "ALL"
+    assert scan.actual_rows == 100000 and scan.actual_time == 700 and scan.loops == 1
+    lookup = plan.table("o")
+    assert lookup.access_type == "ref" and lookup.key == "idx_uid" and lookup.loops == 0
+    assert lookup.cost == 0.35 and lookup.used_key_parts == ["uid"]
+    # Sort 节点下有 Filter 和 Index lookup 两个子节点
+    sort = plan.root.children[0]
+    assert sort.using_filesort and len(sort.children) == 2
+    assert [n.table for n in plan.full_scans(50000)] == ["u"]
+
+
+def test_parse_dm():
+    plan = parse_dm(DM_PLAN)
+    assert plan.root.operation == "NSET2" and plan.cost == 12
+    scan = plan.table("T")
+    assert scan.operation == "CSCN2" and scan.full_scan and scan.rows == 1000
+    assert scan.key == "INDEX33555484"
+    assert plan.using_filesort
+    assert plan.find(lambda n: n.operation == "SLCT2")[0].children == [scan]
+
+
+def test_sqlite_explain():
+    db = think_sql.db({"type": "memory", "database": "plan"})
+    db.execute("DROP TABLE IF EXISTS user")
+    db.execute("CREATE TABLE user (id INTEGER PRIMARY KEY, status INT, name VARCHAR(20))")
+    db.execute("CREATE INDEX idx_status ON user (status)")
+    plan = db.explain("SELECT * FROM user WHERE status = %s ORDER BY name", (1,))
+    node = plan.table("user")
+    assert node.access_type == "ref" and node.key == "idx_status"
+    assert node.used_key_parts == ["status"]
+    assert plan.using_filesort
+    assert [n.table for n in db.explain("SELECT * FROM user WHERE name = 'a'").full_scans()] == ["user"]
+    node = db.explain("SELECT * FROM user WHERE id = 1").table("user")
+    assert node.key == "PRIMARY" and node.condition == "rowid=?" and node.used_key_parts == ["rowid"]
+    node = db.explain("SELECT status FROM user WHERE status > 1").table("user")
+    assert node.key == "idx_status" and node.access_type == "range" and node.condition == "status>?"
+    db.close()
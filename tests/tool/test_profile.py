@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+
+from think_sql.tool.base import Database
+from think_sql.tool.profile import QueryTimer, payload_size
+
+
+def test_payload_size():
+    assert payload_size([{"a": "abc", "b": 1, "c": None}, {"a": b"xy"}]) == 13
+
+
+def test_timer():
+    timer = QueryTimer()
+    time.sleep(0.01)
+    timer.mark()
+    time.sleep(0.02)
+    timer.mark()
+    event = timer.event("query", "user", "SELECT * FROM user WHERE id=%s", (1,), result=[{"name": "a"}])
+    assert event.build >= 0.01
+    assert event.execute >= 0.02
+    assert event.fetch < 0.01
+    assert event.duration == event.build + event.execute + event.fetch
+    assert event.rows == 1
+    assert event.bytes == 1
+    assert event.params_count == 1
+
+
+def test_on_query():
+    db = Database({"type": "mysql"})
+    events = []
+    db.on_query(events.append)
+
+    @db.on_query
+    def broken(event):
+        raise ValueError("listener error")
+
+    db.emit(QueryTimer().event("execute", "user", "DELETE FROM user", rows=3))
+    assert events[0].rows == 3
+    db.off_query(events.append)
+    db.off_query(broken)
+    assert db.listeners == []
+
+
+def test_ring_buffer():
+    db = Database({"type": "mysql"})
+    buffer = db.profile(2)
+    for i in range(5):
+        db.emit(QueryTimer().event("execute", "user", "UPDATE user", rows=i))
+    assert [e.rows for e in buffer] == [3, 4]
+    db.profile(0)
+    assert db.events is None
+    assert db.listeners == []
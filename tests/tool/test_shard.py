@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import pytest
+
+from think_sql.tool.base import Database
+from think_sql.tool.shard import ShardedDB
+
+
+class Table:
+    """内存数据表,仅实现分片测试用到的链式方法"""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.init()
+
+    def init(self):
+        self.conditions = []
+        self.orders = []
+        self.limits = None
+        self.fields = None
+
+    def where(self, field, symbol="", value=None):
+        if value is None:
+            symbol, value = "=", symbol
+        ops = {
+            "=": lambda x: x == value,
+            ">": lambda x: x > value,
+            "<": lambda x: x < value,
+            "in": lambda x: x in value,
+        }
+        self.conditions.append(lambda r: ops[symbol](r[field]))
+        return self
+
+    def order(self, field, sort="asc"):
+        self.orders.append((field, sort.lower() == "desc"))
+        return self
+
+    def limit(self, start, step=None):
+        self.limits = (0, start) if step is None else (start, step)
+        return self
+
+    def field(self, fields):
+        self.fields = fields
+        return self
+
+    def __rows(self):
+        rows = [r for r in self.rows if all(c(r) for c in self.conditions)]
+        for field, desc in reversed(self.orders):
+            rows.sort(key=lambda r: r[field], reverse=desc)
+        if self.limits:
+            rows = rows[self.limits[0] : self.limits[0] + self.limits[1]]
+        self.init()
+        return rows
+
+    def select(self):
+        return [dict(r) for r in self.__rows()]
+
+    def count(self, field="1"):
+        return len(self.__rows())
+
+    def sum(self, field):
+        return sum(r[field] for r in self.__rows())
+
+    def max(self, field):
+        return max((r[field] for r in self.__rows()), default=0)
+
+    def exists(self):
+        return bool(self.__rows())
+
+    def insert(self, data, replace=False):
+        self.rows.extend(data)
+        return len(data)
+
+    def update(self, data, all_record=False):
+        rows = self.__rows()
+        for r in rows:
+            r.update(data)
+        return len(rows)
+
+    def delete(self, all_record=False):
+        rows = self.__rows()
+        self.rows[:] = [r for r in self.rows if r not in rows]
+        return len(rows)
+
+
+class Shard(Database):
+    def __init__(self):
+        super().__init__({"type": "mysql"})
+        self.rows = []
+
+    def table(self, table_name):
+        return Table(self.rows)
+
+
+@pytest.fixture()
+def db():
+    shards = {i: Shard() for i in range(4)}
+    with ShardedDB(shards, lambda user_id: user_id % 4, shard_key="user_id") as db:
+        db.table("order").insert(
+            [{"id": i, "user_id": i % 7, "amount": i} for i in range(1, 41)]
+        )
+        yield db
+
+
+def test_insert_group_by_shard(db):
+    for shard, conn in db.connections.items():
+        assert conn.rows
+        assert all(r["user_id"] % 4 == shard for r in conn.rows)
+    with pytest.raises(ValueError):
+        db.table("order").insert({"id": 100})
+
+
+def test_route(db):
+    assert db.table("order").where("user_id", 3).targets() == [3]
+    assert sorted(db.table("order").where("user_id", "in", [1, 5]).targets()) == [1]
+    assert len(db.table("order").where("amount", ">", 1).targets()) == 4
+    assert db.table("order").where("user_id", 3).count() == 6
+
+
+def test_scatter_gather(db):
+    assert db.table("order").count() == 40
+    assert db.table("order").sum("amount") == 820
+    assert db.table("order").max("amount") == 40
+    assert db.table("order").avg("amount") == 20.5
+    assert db.table("order").where("user_id", 3).exists()
+    # 没有数据的分片返回的0不参与比较
+    db.table("order").insert([{"id": 101, "user_id": 1, "amount": -5}, {"id": 102, "user_id": 2, "amount": -3}])
+    assert db.table("order").where("amount", "<", 0).max("amount") == -3
+    assert db.table("order").where("amount", "<", -10).max("amount") == 0
+
+
+def test_order_limit(db):
+    rows = db.table("order").order("amount", "desc").limit(2, 5).select()
+    assert [r["amount"] for r in rows] == [38, 37, 36, 35, 34]
+    assert db.table("order").order("amount").value("amount") == 1
+    assert db.table("order").where("user_id", 3).order("id").column("amount", "id") == {
+        i: i for i in range(3, 41, 7)
+    }
+
+
+def test_write(db):
+    assert db.table("order").where("amount", ">", 35).update({"amount": 0}) == 5
+    assert db.table("order").sum("amount") == 630
+    assert db.table("order").where("user_id", 6).delete() == 5
+    assert db.table("order").count() == 35
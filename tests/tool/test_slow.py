@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import threading
+
+from think_sql.tool.base import Database
+from think_sql.tool.fingerprint import fingerprint, normalize
+from think_sql.tool.profile import QueryEvent
+
+
+def test_normalize():
+    assert (
+        normalize("SELECT * FROM t1 WHERE id IN (1, 2,3) AND name='a''b' AND x=%s -- c")
+        == "select * from t1 where id in (?+) and name=? and x=?"
+    )
+    assert normalize("INSERT INTO t (a,b) VALUES (%s,%s),(%s,%s);") == "insert into t (a,b) values (?+)"
+    assert fingerprint("SELECT * FROM user WHERE id = 1") == fingerprint(
+        "select *  from user where id=%s".replace("=", " = ")
+    )
+    assert fingerprint("SELECT * FROM user WHERE id = 1") != fingerprint(
+        "SELECT * FROM user WHERE name = 1"
+    )
+
+
+class DB(Database):
+    def clone(self):
+        return self
+
+    def close(self):
+        self.close_writers()
+
+
+def event(sql: str, duration: float) -> QueryEvent:
+    return QueryEvent("query", "user", sql, (1,), execute=duration)
+
+
+def test_slow_query():
+    db = DB({"type": "mysql"})
+    threads = []
+    slow = db.slow_query(
+        100,
+        analyzer=lambda conn, sql, params: threads.append(threading.get_ident()) or f"EXPLAIN {sql}",
+    )
+    db.emit(event("SELECT * FROM user WHERE id=%s", 0.05))
+    db.emit(event("SELECT * FROM user WHERE id=%s", 0.2))
+    db.emit(event("SELECT * FROM user WHERE id=%s", 0.3))
+    db.emit(event("SELECT * FROM user WHERE name=%s", 0.15))
+    slow.flush()
+
+    top = slow.top()
+    assert [q.count for q in top] == [2, 1]
+    assert round(top[0].total, 3) == 0.5
+    assert top[0].max == 0.3
+    assert top[0].sql == "select * from user where id=?"
+    assert top[0].explain == "EXPLAIN SELECT * FROM user WHERE id=%s"
+    assert len(top[0].samples) == 2
+    # 每个指纹只分析一次,且不在调用线程执行
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+
+    db.close()
+    assert slow.closed
+    assert db.listeners == []
+
+
+def test_slow_query_off():
+    db = DB({"type": "mysql"})
+    db.slow_query(100)
+    assert db.slow_query(0) is None
+    assert db.listeners == []
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import json
+
+import pytest
+
+from think_sql.tool.base import Database
+from think_sql.tool import tracing
+from think_sql.tool.profile import QueryEvent
+from think_sql.tool.tracing import (
+    InMemorySpanExporter,
+    JsonLinesExporter,
+    Tracer,
+    get_current_span,
+)
+
+
+def test_nested_spans():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+    with tracer.start_as_current_span("request") as parent:
+        assert get_current_span() is parent
+        with tracer.start_as_current_span("child", attributes={"a": 1}) as child:
+            child.set_attribute("b", 2)
+    assert get_current_span() is None
+
+    child, parent = exporter.get_finished_spans()
+    assert child.parent.span_id == parent.context.span_id
+    assert child.context.trace_id == parent.context.trace_id
+    assert child.attributes == {"a": 1, "b": 2}
+    assert parent.parent is None
+
+    with pytest.raises(ValueError):
+        with tracer.start_as_current_span("error"):
+            raise ValueError("boom")
+    span = exporter.get_finished_spans()[-1]
+    assert span.status == "ERROR"
+    assert span.events[0]["attributes"]["exception.type"] == "ValueError"
+
+
+def test_json_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(JsonLinesExporter(path))
+    with tracer.start_as_current_span("a"):
+        pass
+    with tracer.start_as_current_span("b"):
+        pass
+    tracer.shutdown()
+    lines = [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()]
+    assert [x["name"] for x in lines] == ["a", "b"]
+    assert len(lines[0]["trace_id"]) == 32
+
+
+def test_export_error(monkeypatch):
+    class BrokenExporter(InMemorySpanExporter):
+        def export(self, spans):
+            raise OSError("disk full")
+
+    warnings = []
+    monkeypatch.setattr(tracing.logger, "warning", warnings.append, raising=False)
+    tracer = Tracer(BrokenExporter())
+    with tracer.start_as_current_span("a"):
+        pass
+    assert warnings == ["[trace] export span a failed: disk full"]
+
+
+def test_db_trace():
+    db = Database({"type": "mysql"})
+    assert db.span("noop").__class__.__name__ == "nullcontext"
+
+    exporter = InMemorySpanExporter()
+    tracer = db.trace(exporter)
+    event = QueryEvent("query", "user", "SELECT * FROM user WHERE id=%s", (1,), execute=0.01, rows=1, time=1.0)
+    with tracer.start_as_current_span("request"):
+        with db.span("transaction"):
+            db.emit(event)
+
+    query, trans, request = exporter.get_finished_spans()
+    assert query.name == "SELECT user"
+    assert query.attributes["db.sql.table"] == "user"
+    assert query.attributes["think_sql.rows"] == 1
+    assert query.end_time - query.start_time == 10_000_000
+    assert query.parent.span_id == trans.context.span_id
+    assert trans.parent.span_id == request.context.span_id
+
+    db.trace()
+    assert db.tracer is None
+    assert db.listeners == []
+
+
+def test_db_trace_shutdown(tmp_path):
+    db = Database({"type": "mysql"})
+    exporter = JsonLinesExporter(tmp_path / "a.jsonl")
+    db.trace(exporter)
+    db.trace(InMemorySpanExporter())
+    assert exporter.file.closed
+
+    exporter = JsonLinesExporter(tmp_path / "b.jsonl")
+    db.trace(exporter)
+    db.trace()
+    assert exporter.file.closed
@@ -0,0 +1,36 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import datetime
+from decimal import Decimal
+
+from think_sql.tool.util import column_type, make_converter
+
+
+def test_column_type():
+    assert column_type("int(10) unsigned") == "int"
+    assert column_type("VARCHAR") == "varchar"
+    assert column_type("decimal(10,2)") == "decimal"
+    assert column_type("") == ""
+
+
+def test_make_converter():
+    assert make_converter("int(11)", "INT") is None
+    assert make_converter("varchar(100)", "VARCHAR") is None
+
+    to_int = make_converter("varchar(10)", "INT")
+    assert to_int("12") == 12
+    assert to_int(True) == 1
+    assert to_int(None) is None
+
+    to_str = make_converter("json", "CLOB")
+    assert to_str({"a": 1}) == '{"a": 1}'
+    assert to_str(b"abc") == "abc"
+    assert to_str(datetime.datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02 03:04:05"
+
+    to_decimal = make_converter("varchar(10)", "decimal(10,2)")
+    assert to_decimal("1.50") == Decimal("1.50")
+
+    to_bit = make_converter("bit(1)", "TINYINT")
+    assert to_bit(b"\x01") == 1
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import queue
+import threading
+
+import pytest
+
+from think_sql.tool.base import Database, TableBase
+
+
+class Table(TableBase):
+    def insert(self, data, replace=False, get_insert_id=False):
+        if any("fail" in row for row in data):
+            raise ValueError("insert failed")
+        time.sleep(self.db.delay)
+        self.db.batches.append(list(data))
+        return len(data)
+
+
+class DB(Database):
+    def __init__(self, config={"type": "mysql"}, params={}, batches=None):
+        super().__init__(config, params)
+        self.batches = [] if batches is None else batches
+        self.delay = 0
+        self.closed = False
+        self.thread = threading.get_ident()
+        self.tables = 0
+
+    def clone(self):
+        return DB(self.config, self.params, self.batches)
+
+    def table(self, table_name):
+        self.tables += 1
+        return Table(self, table_name)
+
+    def close(self):
+        self.close_writers()
+        self.closed = True
+
+
+@pytest.fixture()
+def db():
+    db = DB()
+    yield db
+    db.close()
+
+
+def test_batch_size(db):
+    db.async_writer("log", batch_size=3, interval_ms=10000)
+    for i in range(7):
+        db.table("log").insert_async({"id": i})
+    db.flush_writers()
+    assert [len(b) for b in db.batches] == [3, 3, 1]
+    assert db.writers["log"].stats["written"] == 7
+    assert db.writers["log"].conn.tables == 1
+
+
+def test_interval(db):
+    db.async_writer("log", batch_size=100, interval_ms=30)
+    db.table("log").insert_async([{"id": 1}, {"id": 2}])
+    assert db.batches == []
+    time.sleep(0.2)
+    assert db.batches == [[{"id": 1}, {"id": 2}]]
+
+
+def test_group_by_fields(db):
+    db.table("log").insert_async([{"id": 1}, {"id": 2, "name": "a"}, {"id": 3}])
+    db.flush_writers()
+    assert sorted(len(b) for b in db.batches) == [1, 2]
+
+
+def test_backpressure(db):
+    writer = db.async_writer("log", batch_size=1, queue_size=1)
+    db.delay = 0.2
+    db.table("log").insert_async({"id": 1})
+    time.sleep(0.05)
+    db.table("log").insert_async({"id": 2})
+    with pytest.raises(queue.Full):
+        db.table("log").insert_async({"id": 3}, block=False)
+    writer.close()
+    assert len(db.batches) == 2
+
+
+def test_on_error(db):
+    errors = []
+    db.async_writer("log", on_error=lambda e, rows: errors.append((e, rows)))
+    db.table("log").insert_async([{"fail": 1}, {"id": 1}])
+    db.flush_writers()
+    assert len(errors) == 1 and errors[0][1] == [{"fail": 1}]
+    assert db.batches == [[{"id": 1}]]
+
+
+def test_table_renewed_after_error(db):
+    writer = db.async_writer("log", on_error=lambda e, rows: None)
+    db.table("log").insert_async({"fail": 1})
+    db.flush_writers()
+    db.table("log").insert_async({"id": 1})
+    db.flush_writers()
+    db.table("log").insert_async({"id": 2})
+    db.flush_writers()
+    assert writer.conn.tables == 2
+    assert db.batches == [[{"id": 1}], [{"id": 2}]]
+
+
+def test_close(db):
+    db.async_writer("log", interval_ms=10000)
+    db.table("log").insert_async({"id": 1})
+    db.close()
+    assert db.batches == [[{"id": 1}]]
+    assert db.writers == {}
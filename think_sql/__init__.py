@@ -2,10 +2,31 @@ __version__ = '0.7.3'
 
 import importlib
 from contextlib import contextmanager
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
-from think_sql.tool.base import Database
-from think_sql.tool.util import DBConfig, db_config
+if TYPE_CHECKING:
+    from think_sql.tool.base import Database
+    from think_sql.tool.shard import ShardedDB
+    from think_sql.tool.util import DBConfig, ClusterConfig
+
+# 按需导入,`import think_sql` 不加载 pydantic/loguru/cacheout 等依赖
+LAZY = {
+    "Database": "think_sql.tool.base",
+    "ShardedDB": "think_sql.tool.shard",
+    "DBConfig": "think_sql.tool.util",
+    "ClusterConfig": "think_sql.tool.util",
+    "db_config": "think_sql.tool.util",
+    "cluster_config": "think_sql.tool.util",
+    "is_cluster_config": "think_sql.tool.util",
+}
+
+
+def __getattr__(name: str):
+    if name in LAZY:
+        value = getattr(importlib.import_module(LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'think_sql' has no attribute '{name}'")
 
 DRIVERS = {
     "mysql":{
@@ -16,9 +37,17 @@ DRIVERS = {
         "path":"think_sql.dm",
         "depend":["dmPython"],
     },
+    "sqlite":{
+        "path":"think_sql.sqlite",
+        "depend":["pymysql"],
+    },
+    "memory":{
+        "path":"think_sql.sqlite",
+        "depend":["pymysql"],
+    },
 }
 
-def __import_module(config:DBConfig)->Database:
+def __import_module(config:"DBConfig", name:str = 'DB')->"Database":
     if config.type not in DRIVERS:
         raise Exception(f'Unsupported database type: {config.type}')
 
@@ -28,21 +57,30 @@ def __import_module(config:DBConfig)->Database:
     except ImportError:
         raise ImportError(f"Please install {DRIVERS[config.type]['depend']}")
 
-    return getattr(module,'DB')
+    if not hasattr(module, name):
+        raise Exception(f'Unsupported {name} for database type: {config.type}')
+    return getattr(module,name)
 
 
-@contextmanager
-def DB(cfg:Union[str,dict,DBConfig]):
+def __load(cfg:Union[str,dict,"DBConfig","ClusterConfig"]):
+    from think_sql.tool.util import db_config, cluster_config, is_cluster_config
+
+    if is_cluster_config(cfg):
+        config = cluster_config(cfg)
+        return __import_module(config.primary, 'ClusterDB'), config
+
     config = db_config(cfg)
+    return __import_module(config), config
 
-    Database = __import_module(config)
+
+@contextmanager
+def DB(cfg:Union[str,dict,"DBConfig","ClusterConfig"]):
+    Database, config = __load(cfg)
 
     with Database(config) as db:
         yield db
 
-def db(cfg:Union[str,dict,DBConfig]):
-    config = db_config(cfg)
-
-    Database = __import_module(config)
+def db(cfg:Union[str,dict,"DBConfig","ClusterConfig"]):
+    Database, config = __load(cfg)
 
     return Database(config)
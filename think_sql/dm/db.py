@@ -3,14 +3,17 @@
 __author__ = 'hbh112233abc@163.com'
 
 import re
+import time
 import contextlib
 from typing import List, Union
 
 import dmPython
-from loguru import logger
 
 from think_sql.dm.table import Table
+from think_sql.tool.log import logger
 from think_sql.tool.util import DBConfig
+from think_sql.tool.plan import Plan, parse_dm
+from think_sql import metrics
 from think_sql.tool.base import Database
 from think_sql.tool.interface import DatabaseInterface
 
@@ -42,11 +45,13 @@ class DB(DatabaseInterface,Database):
     @contextlib.contextmanager
     def start_trans(self):
         """开始事务"""
+        self.flush_pending()
         self.connector.autoCommit = 0
         self.auto_commit = False
         try:
-            yield
-            self.connector.commit()
+            with self.span("transaction"):
+                yield
+                self.connector.commit()
         except Exception as e:
             logger.error(e)
             self.connector.rollback()
@@ -56,6 +61,8 @@ class DB(DatabaseInterface,Database):
 
     def close(self):
         """关闭数据库连接"""
+        self.close_writers()
+        self.flush_pending()
         self.cursor.close()
         self.connector.close()
 
@@ -71,8 +78,23 @@ class DB(DatabaseInterface,Database):
         )
         self.cursor = self.connector.cursor()
 
-    def explain(self,sql:str):
-        return self.connector.explain(sql)
+    def explain(self, sql: str, params: tuple = (), analyze: bool = False) -> Plan:
+        """结构化执行计划,解析 dmPython `explain` 返回的文本,原始文本为 `plan.raw`
+
+        Args:
+            sql (str): sql语句
+            params (tuple, optional): 不支持绑定参数. Defaults to ().
+            analyze (bool, optional): 不支持. Defaults to False.
+
+        Raises:
+            ValueError: 传入绑定参数或 analyze
+
+        Returns:
+            Plan: 执行计划
+        """
+        if params or analyze:
+            raise ValueError("dm explain does not support params or analyze")
+        return parse_dm(self.connector.explain(sql))
 
     def exec(self, sql:str, params:tuple=())->int:
         if not params:
@@ -84,8 +106,7 @@ class DB(DatabaseInterface,Database):
     def execute(self, sql:str, params:tuple=()) -> int:
         try:
             result = self.exec(sql,params)
-            if self.auto_commit:
-                self.connector.commit()
+            self.commit_write()
             return result
         except Exception as e:
             self.log.warning(sql)
@@ -136,8 +157,17 @@ class DB(DatabaseInterface,Database):
         Returns:
             Table: 数据表对象,可以执行链式操作
         """
-        if not self.check_connected():
-            self.connect()
+        start = time.perf_counter() if metrics.REGISTRY.enabled else 0
+        with self.span("connection.checkout", **{"db.sql.table": table_name}):
+            if not self.check_connected():
+                self.connect()
+                metrics.inc("think_sql_reconnects_total", database=self.database)
+        if start:
+            metrics.observe(
+                "think_sql_checkout_wait_seconds",
+                time.perf_counter() - start,
+                database=self.database,
+            )
         return Table(self, table_name)
 
     def check_connected(self):
@@ -5,12 +5,13 @@ __author__ = "hbh112233abc@163.com"
 from copy import deepcopy
 from hashlib import md5
 import itertools
-from typing import Any, Union, Tuple, List
+from typing import Any, Callable, Union, Tuple, List
 from decimal import Decimal
 
 from dmPython import Cursor
 
 from think_sql.tool.base import Database, TableBase
+from think_sql.tool.profile import QueryTimer
 from think_sql.tool.interface import TableInterface
 
 from think_sql.tool.util import to_number
@@ -198,6 +199,7 @@ class Table(TableBase, TableInterface):
         Returns:
             tuple: 查询结果
         """
+        timer = QueryTimer() if self.db.listeners else None
         try:
             finally_sql = ""
             finally_sql = self.build_sql(sql, params)
@@ -214,8 +216,12 @@ class Table(TableBase, TableInterface):
                 if result:
                     return result
 
+            timer and timer.mark()
             self.db_cursor.execute(finally_sql)
+            timer and timer.mark()
             result = self.db_cursor.fetchall()
+            if timer:
+                self.emit_query(timer, "query", sql, params, result=result)
             self.set_cache(result)
             self.__log_sql()
             return result
@@ -224,10 +230,11 @@ class Table(TableBase, TableInterface):
                 self.log.error(finally_sql)
             else:
                 self.log.error(sql, params)
+            if timer:
+                self.emit_query(timer, "query", sql, params, error=e)
             raise e
         finally:
-            if self.db.auto_commit:
-                self.connector.commit()
+            self.db.commit_read()
             self.init()
 
     def execute(self, sql: str, params: list = []) -> int:
@@ -240,14 +247,22 @@ class Table(TableBase, TableInterface):
         Returns:
             int: 影响行数
         """
+        timer = QueryTimer() if self.db.listeners else None
         try:
             finally_sql = ""
             finally_sql = self.build_sql(sql, params)
             if self._fetch_sql:
                 return finally_sql
-            self.db_cursor.execute(finally_sql)
-            self.connector.commit()
+            timer and timer.mark()
+            self.db.with_retry(
+                lambda: self.db_cursor.execute(finally_sql), self.table_name
+            )
+            self.db.commit_write()
+            # 提交耗时计入执行阶段
+            timer and timer.mark()
             result = self.db_cursor.rowcount
+            if timer:
+                self.emit_query(timer, "execute", sql, params, result)
             self.__log_sql()
             return result
         except Exception as e:
@@ -255,6 +270,8 @@ class Table(TableBase, TableInterface):
                 self.log.error(finally_sql)
             else:
                 self.log.error(sql, params)
+            if timer:
+                self.emit_query(timer, "execute", sql, params, error=e)
             raise e
         finally:
             self.init()
@@ -645,18 +662,35 @@ class Table(TableBase, TableInterface):
 
         return self.get_lastid()
 
-    def update(self, data: dict, all_record: bool = False) -> int:
+    def update(
+        self,
+        data: dict,
+        all_record: bool = False,
+        chunk_size: int = 0,
+        sleep: float = 0,
+        max_replica_lag: float = None,
+        progress: Callable[[dict], None] = None,
+    ) -> int:
         """更新数据
 
+        设置 `chunk_size` 时按主键范围分批更新,每批提交,事务中不分批
+
         Args:
             data (dict): 更新数据内容
             all_record (bool): 是否更新全部数据,默认False
+            chunk_size (int): 分批执行每批行数,0不分批. Defaults to 0.
+            sleep (float): 分批执行批次间隔秒数. Defaults to 0.
+            max_replica_lag (float): 分批执行时允许的最大从库复制延迟(秒). Defaults to None.
+            progress (Callable[[dict], None]): 分批执行进度回调,参考 `run_chunks`. Defaults to None.
 
         Returns:
             int: 影响行数
         """
         if not all_record and self.condition_str == "1=1":
             raise ValueError("please set where conditions!")
+        if chunk_size > 0 and self.db.auto_commit and not self._fetch_sql:
+            step = self.range_chunks(lambda: self.update(data, True), chunk_size)
+            return self.run_chunks(step, sleep, max_replica_lag, progress)
         inputs = ",".join(map(lambda k: f"{parse_key(k)}='%s'", data.keys()))
         params = tuple([parse_value(v) for v in data.values()]) + self.condition_val
         where = self.__condition_str_fix()
@@ -664,11 +698,24 @@ class Table(TableBase, TableInterface):
         result = self.execute(sql, params)
         return result
 
-    def delete(self, all_record: bool = False) -> int:
+    def delete(
+        self,
+        all_record: bool = False,
+        chunk_size: int = 0,
+        sleep: float = 0,
+        max_replica_lag: float = None,
+        progress: Callable[[dict], None] = None,
+    ) -> int:
         """删除数据
 
+        设置 `chunk_size` 时按主键范围分批删除,每批提交,事务中不分批
+
         Args:
             all_record (bool): 是否更新全部数据,默认False
+            chunk_size (int): 分批执行每批行数,0不分批. Defaults to 0.
+            sleep (float): 分批执行批次间隔秒数. Defaults to 0.
+            max_replica_lag (float): 分批执行时允许的最大从库复制延迟(秒). Defaults to None.
+            progress (Callable[[dict], None]): 分批执行进度回调,参考 `run_chunks`. Defaults to None.
 
         Raises:
             Exception: please set delete conditions!
@@ -678,6 +725,9 @@ class Table(TableBase, TableInterface):
         """
         if not all_record and self.condition_str == "1=1":
             raise ValueError("please set where conditions!")
+        if chunk_size > 0 and self.db.auto_commit and not self._fetch_sql:
+            step = self.range_chunks(lambda: self.delete(True), chunk_size)
+            return self.run_chunks(step, sleep, max_replica_lag, progress)
         where = self.__condition_str_fix()
         sql = f"DELETE FROM {self.real_table(self.table_name)} WHERE {where};"
         result = self.execute(sql, self.condition_val)
@@ -717,6 +767,49 @@ class Table(TableBase, TableInterface):
         step = to_number(step, "step")
         return self.inc(field, step=(0 - step))
 
+    def batch_inc(
+        self, field: str, key: str, steps: dict, upsert: bool = False
+    ) -> int:
+        """批量递增,一条sql完成多行不同步长的递增
+
+        Args:
+            field (str): 字段名
+            key (str): 行标识字段名,一般是主键
+            steps (dict): {key值: 步长}
+            upsert (bool, optional): 行不存在时插入,使用 `MERGE INTO`. Defaults to False.
+
+        Returns:
+            int: 影响行数
+        """
+        steps = {k: to_number(v, "step") for k, v in steps.items() if v}
+        if not steps:
+            self.init()
+            return 0
+        holders = ["'%s'" if isinstance(k, str) else "%s" for k in steps]
+        table = self.real_table(self.table_name)
+        field = parse_key(field)
+        key = parse_key(key)
+        if upsert:
+            source = " UNION ALL ".join(
+                f"SELECT {h} AS {key}, %s AS {field} FROM DUAL" for h in holders
+            )
+            params = tuple(p for k, v in steps.items() for p in (parse_value(k), v))
+            sql = (
+                f"MERGE INTO {table} T USING ({source}) S ON (T.{key} = S.{key}) "
+                f"WHEN MATCHED THEN UPDATE SET T.{field} = T.{field} + S.{field} "
+                f"WHEN NOT MATCHED THEN INSERT ({key}, {field}) VALUES (S.{key}, S.{field})"
+            )
+            return self.execute(sql, params)
+        cases = " ".join(f"WHEN {h} THEN %s" for h in holders)
+        inputs = ",".join(holders)
+        params = tuple(p for k, v in steps.items() for p in (parse_value(k), v))
+        params += tuple(parse_value(k) for k in steps)
+        sql = (
+            f"UPDATE {table} SET {field} = {field} + CASE {key} {cases} END "
+            f"WHERE {key} IN ({inputs})"
+        )
+        return self.execute(sql, params)
+
     def max(self, field: str) -> Union[int, float]:
         """最大值
 
@@ -900,10 +993,16 @@ class Table(TableBase, TableInterface):
                 raise ValueError(f"key:{key} not in data item")
             self.init()
             sql.append(self.where(key, row[key]).fetch_sql().update(row))
+        def run(chunk: List[str]) -> int:
+            count = 0
+            for s in chunk:
+                self.db_cursor.execute(s)
+                count += self.get_rowcount()
+            return count
+
         result = 0
         for x in range(0, len(sql), 100):
-            for s in sql[x : x + 100]:
-                self.db_cursor.execute(s)
-                result += self.get_rowcount()
-            self.connector.commit()
+            chunk = sql[x : x + 100]
+            result += self.db.with_retry(lambda: run(chunk), self.table_name)
+            self.db.commit_write()
         return result
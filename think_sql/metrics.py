@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""运行指标
+
+按 表/操作 统计sql耗时直方图、返回行数、错误数,以及缓存命中、提交、重连、获取连接等待时间,
+以 Prometheus 文本格式输出,可选启动本地HTTP服务.
+
+每个线程写入自己的分片,热路径无锁,输出时合并全部分片.
+线程结束后其分片合并到退役分片,分片数量不随线程创建次数增长.
+
+Example:
+    from think_sql import metrics
+
+    metrics.enable(db)
+    metrics.serve(9100)
+    print(metrics.render())
+"""
+__author__ = "hbh112233abc@163.com"
+
+import bisect
+import weakref
+import threading
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    "think_sql_query_duration_seconds": ("histogram", "Query latency in seconds by table and operation"),
+    "think_sql_queries_total": ("counter", "Queries executed by table, operation and status"),
+    "think_sql_rows_total": ("counter", "Rows fetched or affected by table and operation"),
+    "think_sql_fetch_bytes_total": ("counter", "Estimated bytes fetched by table"),
+    "think_sql_cache_total": ("counter", "Table cache lookups by table and result"),
+    "think_sql_commits_total": ("counter", "Commits by database"),
+    "think_sql_reconnects_total": ("counter", "Reconnects by database"),
+    "think_sql_checkout_wait_seconds": ("histogram", "Time spent checking out a connection in db.table()"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class ShardHolder:
+    """线程局部的分片持有者,线程结束时随线程局部数据释放,触发分片退役"""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: dict):
+        self.shard = shard
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self.local = threading.local()
+        self.shards: List[dict] = []
+        # 已结束线程的分片合并结果
+        self.retired = {"counters": {}, "histograms": {}}
+        self.lock = threading.Lock()
+
+    def shard(self) -> dict:
+        """当前线程的分片"""
+        holder = getattr(self.local, "holder", None)
+        if holder is None:
+            holder = ShardHolder({"counters": {}, "histograms": {}})
+            with self.lock:
+                self.shards.append(holder.shard)
+            weakref.finalize(holder, self.retire, holder.shard)
+            self.local.holder = holder
+        return holder.shard
+
+    def retire(self, shard: dict):
+        """线程结束,分片合并到退役分片"""
+        with self.lock:
+            merge(self.retired, shard)
+            self.shards = [s for s in self.shards if s is not shard]
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1):
+        """计数器累加"""
+        counters = self.shard()["counters"]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float):
+        """直方图记录"""
+        histograms = self.shard()["histograms"]
+        key = (name, labels)
+        hist = histograms.get(key)
+        if hist is None:
+            # 各区间计数 + (+Inf区间) + 合计值
+            hist = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        hist[bisect.bisect_left(self.buckets, value)] += 1
+        hist[-1] += value
+
+    def collect(self) -> Tuple[Dict[tuple, float], Dict[tuple, list]]:
+        """合并全部分片
+
+        Returns:
+            Tuple[Dict[tuple, float], Dict[tuple, list]]: (计数器, 直方图)
+        """
+        total = {"counters": {}, "histograms": {}}
+        # 持锁合并,避免同时退役的分片被统计两次
+        with self.lock:
+            merge(total, self.retired)
+            for shard in self.shards:
+                merge(total, shard)
+        return total["counters"], total["histograms"]
+
+    def value(self, name: str, **labels) -> float:
+        """获取计数器合计值,按给定标签过滤"""
+        counters, _ = self.collect()
+        return sum(
+            v
+            for (n, l), v in counters.items()
+            if n == name and all(dict(l).get(k) == str(x) for k, x in labels.items())
+        )
+
+    def reset(self):
+        """清空指标"""
+        with self.lock:
+            for shard in self.shards + [self.retired]:
+                shard["counters"].clear()
+                shard["histograms"].clear()
+
+    def render(self) -> str:
+        """Prometheus 文本格式输出"""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help) in METRICS.items():
+            if kind == "counter":
+                series = sorted((l, v) for (n, l), v in counters.items() if n == name)
+            else:
+                series = sorted((l, v) for (n, l), v in histograms.items() if n == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind == "counter":
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                    continue
+                total = 0
+                for bound, count in zip(self.buckets + (float("inf"),), value):
+                    total += count
+                    le = "+Inf" if bound == float("inf") else format_value(bound)
+                    lines.append(
+                        f"{name}_bucket{format_labels(labels + (('le', le),))} {total}"
+                    )
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(value[-1])}")
+                lines.append(f"{name}_count{format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def record_query(self, event):
+        """sql执行事件回调"""
+        labels = (("table", event.table), ("operation", event.operation))
+        self.observe("think_sql_query_duration_seconds", labels, event.duration)
+        status = "error" if event.error is not None else "ok"
+        self.inc("think_sql_queries_total", labels + (("status", status),))
+        if event.rows > 0:
+            self.inc("think_sql_rows_total", labels, event.rows)
+        if event.bytes:
+            self.inc("think_sql_fetch_bytes_total", (("table", event.table),), event.bytes)
+
+
+def merge(target: dict, shard: dict):
+    """分片累加到 `target`"""
+    counters, histograms = target["counters"], target["histograms"]
+    for key, value in list(shard["counters"].items()):
+        counters[key] = counters.get(key, 0) + value
+    for key, hist in list(shard["histograms"].items()):
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = list(hist)
+        else:
+            histograms[key] = [a + b for a, b in zip(merged, hist)]
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    items = ",".join(f'{k}="{escape(v)}"' for k, v in labels)
+    return "{" + items + "}"
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+
+def enable(*dbs):
+    """开启指标统计
+
+    Args:
+        *dbs (Database): 需要统计sql执行指标的数据库连接
+    """
+    REGISTRY.enabled = True
+    for db in dbs:
+        if REGISTRY.record_query not in db.listeners:
+            db.on_query(REGISTRY.record_query)
+
+
+def disable(*dbs):
+    """关闭指标统计,未传入连接时只关闭全局统计(缓存、提交、重连等)"""
+    for db in dbs:
+        db.off_query(REGISTRY.record_query)
+    if not dbs:
+        REGISTRY.enabled = False
+
+
+def inc(name: str, value: float = 1, **labels):
+    """开启统计时累加计数器"""
+    if REGISTRY.enabled:
+        REGISTRY.inc(name, tuple(labels.items()), value)
+
+
+def observe(name: str, value: float, **labels):
+    """开启统计时记录直方图"""
+    if REGISTRY.enabled:
+        REGISTRY.observe(name, tuple(labels.items()), value)
+
+
+def render() -> str:
+    """Prometheus 文本格式输出"""
+    return REGISTRY.render()
+
+
+def reset():
+    """清空指标"""
+    REGISTRY.reset()
+
+
+def serve(port: int = 9100, addr: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """在后台线程启动HTTP服务输出指标
+
+    Args:
+        port (int, optional): 端口,0为随机端口. Defaults to 9100.
+        addr (str, optional): 监听地址. Defaults to "127.0.0.1".
+
+    Returns:
+        ThreadingHTTPServer: HTTP服务, `server.shutdown()` 停止
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -1,2 +1,3 @@
 from think_sql.mysql.db import DB
 from think_sql.mysql.table import Table
+from think_sql.mysql.cluster import ClusterDB
@@ -0,0 +1,915 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""工作负载驱动的索引推荐
+
+根据一组带执行频率的sql,为每个表枚举单列和联合候选索引(等值条件字段在前,然后是范围/排序字段),
+估算每个候选索引对整个负载的代价收益,扣除写入维护代价后,在索引数量和存储预算内贪心选择一小组索引.
+
+代价估算有两种方式:
+
+- hypothetical: 默认,根据表行数、字段基数(索引统计信息或采样)使用MySQL代价常量估算,
+  `db.explain` 可用时以执行计划中每个表的真实代价为基准,按模型的变化比例估算
+- invisible: MySQL 8.0+,将已选索引和候选索引一起创建为不可见索引,开启 `use_invisible_indexes` 执行
+  `db.explain` 获取真实代价,会在服务端执行DDL,请在测试环境中使用.
+  服务端不支持(低于8.0或MariaDB)时回退到 hypothetical,创建索引失败时该次估算使用 hypothetical
+
+Example:
+    from think_sql.mysql.advisor import advise, advise_report
+
+    result = advise(db, {"SELECT * FROM user WHERE status = 1 AND age > 18": 1000}, max_indexes=3)
+    print(advise_report(result))
+"""
+__author__ = "hbh112233abc@163.com"
+
+import re
+import math
+import textwrap
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sql_metadata import Parser
+from tabulate import tabulate
+
+from think_sql.mysql.db import DB
+from think_sql.mysql.sql_helper import IndexMetadata, load_statements, schema_conditions
+from think_sql.tool.fingerprint import fingerprint
+from think_sql.tool.log import logger
+from think_sql.tool.plan import Plan
+
+# MySQL 8 默认代价常量
+IO_BLOCK_READ_COST = 1.0
+ROW_EVALUATE_COST = 0.1
+# 二级索引回表,按一次随机读计算
+ROW_LOOKUP_COST = 1.0
+# 范围条件的选择率,与MySQL没有统计信息时的估算一致
+RANGE_SELECTIVITY = 1 / 3
+# 每次写入维护一个二级索引的代价
+INDEX_WRITE_COST = 1.0
+PAGE_SIZE = 16384
+# 二级索引每条记录的额外开销(记录头、页目录等)及页填充率
+INDEX_ENTRY_OVERHEAD = 14
+PAGE_FILL_FACTOR = 0.7
+
+# 定长类型的字节数,字符串类型按最大长度的一半估算,text/blob等不能直接建索引
+TYPE_BYTES = {
+    "tinyint": 1,
+    "smallint": 2,
+    "mediumint": 3,
+    "int": 4,
+    "integer": 4,
+    "bigint": 8,
+    "float": 4,
+    "double": 8,
+    "date": 3,
+    "time": 3,
+    "year": 1,
+    "datetime": 5,
+    "timestamp": 4,
+    "bit": 8,
+    "enum": 2,
+    "set": 8,
+}
+STRING_TYPES = ("char", "varchar", "binary", "varbinary")
+
+IDENT = r"`?\w+`?(?:\.`?\w+`?)?"
+PREDICATE = re.compile(
+    rf"(?P<left>{IDENT})\s*"
+    r"(?P<op><=>|>=|<=|!=|<>|=|>|<|\bNOT\s+IN\b|\bIN\b|\bNOT\s+LIKE\b|\bLIKE\b|\bBETWEEN\b|\bIS\s+NOT\b|\bIS\b)"
+    rf"\s*(?P<right>{IDENT}|'[^']*')?",
+    re.I,
+)
+LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+KEYWORDS = {"NULL", "TRUE", "FALSE", "AND", "OR", "NOT"}
+
+
+@dataclass
+class QueryShape:
+    """sql中与索引相关的结构
+
+    Attributes:
+        sql (str): 样本sql
+        fingerprint (str): sql指纹
+        frequency (float): 执行频率
+        tables (List[str]): 表名,按出现顺序
+        eq (Dict[str, List[str]]): 等值条件字段 {表名: [字段]}
+        range (Dict[str, List[str]]): 范围条件字段
+        join (Dict[str, List[str]]): 与其他表字段等值关联的字段
+        order (Dict[str, List[str]]): 排序/分组字段,只在所有排序字段属于同一个表时记录
+        columns (Dict[str, Optional[Set[str]]]): 用到的字段,`SELECT *` 为None
+        limit (int): LIMIT行数,0为没有限制
+        aliases (Dict[str, str]): 表别名 {别名: 表名}
+        write (str): 写操作类型 INSERT|REPLACE|UPDATE|DELETE,查询为空
+        set_columns (List[str]): UPDATE修改的字段
+    """
+
+    sql: str
+    fingerprint: str
+    frequency: float
+    tables: List[str]
+    eq: Dict[str, List[str]] = field(default_factory=dict)
+    range: Dict[str, List[str]] = field(default_factory=dict)
+    join: Dict[str, List[str]] = field(default_factory=dict)
+    order: Dict[str, List[str]] = field(default_factory=dict)
+    columns: Dict[str, Optional[Set[str]]] = field(default_factory=dict)
+    limit: int = 0
+    aliases: Dict[str, str] = field(default_factory=dict)
+    write: str = ""
+    set_columns: List[str] = field(default_factory=list)
+
+
+@dataclass
+class IndexCandidate:
+    """候选索引
+
+    Attributes:
+        table (str): 表名
+        columns (Tuple[str, ...]): 索引字段
+        size (int): 估算存储字节数
+        write_cost (float): 负载中写操作维护该索引的代价
+        benefit (float): 被选中时带来的查询代价收益
+        queries (List[str]): 受益的sql指纹
+    """
+
+    table: str
+    columns: Tuple[str, ...]
+    size: int = 0
+    write_cost: float = 0.0
+    benefit: float = 0.0
+    queries: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"idx_{'_'.join(self.columns)}"[:64]
+
+    @property
+    def sql(self) -> str:
+        return f"ALTER TABLE {self.table} ADD INDEX {self.name}({','.join(self.columns)})"
+
+    def to_dict(self) -> dict:
+        return {
+            "table": self.table,
+            "columns": list(self.columns),
+            "sql": self.sql,
+            "size": self.size,
+            "write_cost": self.write_cost,
+            "benefit": self.benefit,
+            "net_benefit": self.benefit - self.write_cost,
+            "queries": self.queries,
+        }
+
+
+def quote(name: str) -> str:
+    """标识符加反引号,支持 `库名.表名`"""
+    return ".".join(f"`{part.strip('`')}`" for part in name.split("."))
+
+
+def unquote(name: str) -> str:
+    return name.replace("`", "").strip()
+
+
+def column_bytes(row: dict) -> Optional[int]:
+    """information_schema.COLUMNS 字段在索引中的估算字节数,不能直接建索引的类型返回None"""
+    data_type = str(row.get("DATA_TYPE") or "").lower()
+    if data_type in TYPE_BYTES:
+        return TYPE_BYTES[data_type]
+    if data_type == "decimal":
+        return int(row.get("NUMERIC_PRECISION") or 10) // 2 + 1
+    if data_type in STRING_TYPES:
+        return min(int(row.get("CHARACTER_OCTET_LENGTH") or 255), 3072) // 2 + 2
+    return None
+
+
+def parse_query(sql: str, frequency: float = 1, resolve=None) -> QueryShape:
+    """解析sql中与索引相关的结构
+
+    Args:
+        sql (str): sql语句
+        frequency (float, optional): 执行频率. Defaults to 1.
+        resolve (Callable[[List[str], str], Optional[str]], optional): 多表查询时为没有表前缀的字段查找所属的表,
+            参数为 (表名列表, 字段名). Defaults to None.
+
+    Raises:
+        ValueError: sql解析失败
+
+    Returns:
+        QueryShape: sql结构
+    """
+    try:
+        parser = Parser(sql)
+        tables = [unquote(t) for t in parser.tables]
+        aliases = {unquote(k): unquote(v) for k, v in parser.tables_aliases.items()}
+        columns_dict = parser.columns_dict or {}
+    except Exception as e:
+        raise ValueError(f"sql parse failed: {e}") from e
+    if not tables:
+        raise ValueError("sql has no table")
+
+    shape = QueryShape(sql, fingerprint(sql), frequency, tables, aliases=aliases)
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if head in ("INSERT", "REPLACE", "UPDATE", "DELETE"):
+        shape.write = head
+
+    def owner(column: str) -> Tuple[Optional[str], str]:
+        column = unquote(column)
+        if "." in column:
+            prefix, name = column.rsplit(".", 1)
+            prefix = aliases.get(prefix, prefix)
+            return (prefix if prefix in tables else None), name
+        if len(tables) == 1:
+            return tables[0], column
+        return (resolve(tables, column) if resolve else None), column
+
+    def add(target: Dict[str, List[str]], column: str) -> Optional[str]:
+        table, name = owner(column)
+        if table is None:
+            return None
+        names = target.setdefault(table, [])
+        if name not in names:
+            names.append(name)
+        return table
+
+    text = LITERAL.sub(lambda m: "'%'" if m.group(0).startswith("'%") else "'?'", sql)
+    match = re.search(r"\bFROM\b", text, re.I)
+    predicates = text[match.end():] if match else text
+    if shape.write == "UPDATE":
+        set_match = re.search(r"\bSET\b(.*?)(\bWHERE\b|\bORDER\b|\bLIMIT\b|$)", text, re.I | re.S)
+        if set_match:
+            predicates = text[set_match.end(1):]
+            for part in set_match.group(1).split(","):
+                if "=" in part:
+                    shape.set_columns.append(owner(part.split("=", 1)[0].strip())[1])
+    elif shape.write in ("INSERT", "REPLACE"):
+        predicates = ""
+
+    for m in PREDICATE.finditer(predicates):
+        left, op, right = m.group("left"), re.sub(r"\s+", " ", m.group("op").upper()), m.group("right")
+        if left.isdigit() or left.upper() in KEYWORDS:
+            continue
+        if op in ("=", "<=>", "IN", "IS"):
+            if (
+                op == "="
+                and right
+                and not right.startswith("'")
+                and not right.replace(".", "").isdigit()
+                and right.upper() not in KEYWORDS
+            ):
+                # 关联条件 a.x = b.y,两边都可以使用等值索引
+                left_table, right_table = add(shape.join, left), add(shape.join, right)
+                if left_table and right_table and left_table != right_table:
+                    add(shape.eq, left)
+                    add(shape.eq, right)
+                continue
+            add(shape.eq, left)
+        elif op in (">", ">=", "<", "<=", "BETWEEN") or (op == "LIKE" and right != "'%'"):
+            add(shape.range, left)
+
+    order = columns_dict.get("order_by") or columns_dict.get("group_by") or []
+    owners = [owner(c) for c in order]
+    if owners and all(t is not None and t == owners[0][0] for t, _ in owners):
+        shape.order[owners[0][0]] = [name for _, name in owners]
+
+    used = [c for key in ("select", "where", "join", "order_by", "group_by") for c in columns_dict.get(key, [])]
+    for table in tables:
+        shape.columns[table] = set()
+    for column in used:
+        if column.endswith("*"):
+            table, _ = owner(column[:-2]) if "." in column else (None, "")
+            for t in [table] if table else tables:
+                shape.columns[t] = None
+            continue
+        table, name = owner(column)
+        if table and shape.columns.get(table) is not None:
+            shape.columns[table].add(name)
+
+    limit = re.search(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+))?", text, re.I)
+    if limit:
+        shape.limit = int(limit.group(1)) + int(limit.group(2) or 0)
+    return shape
+
+
+class IndexAdvisor:
+    """工作负载驱动的索引推荐
+
+    Example:
+        advisor = IndexAdvisor(db)
+        advisor.add("SELECT * FROM user WHERE status = 1 ORDER BY created", 500)
+        advisor.load("/var/log/mysql/slow.log")
+        result = advisor.advise(max_indexes=5, storage_budget=1 << 30)
+    """
+
+    def __init__(
+        self,
+        db: DB,
+        metadata: IndexMetadata = None,
+        mode: str = "hypothetical",
+        sample_size: int = 100000,
+        max_columns: int = 3,
+    ):
+        """实例化
+
+        Args:
+            db (DB): 数据库连接
+            metadata (IndexMetadata, optional): 索引元数据缓存. Defaults to None.
+            mode (str, optional): 代价估算方式 hypothetical|invisible. Defaults to "hypothetical".
+            sample_size (int, optional): 字段基数采样行数. Defaults to 100000.
+            max_columns (int, optional): 联合索引最多字段数. Defaults to 3.
+        """
+        if mode not in ("hypothetical", "invisible"):
+            raise ValueError(f"unknown mode `{mode}`")
+        self.db = db
+        self.metadata = metadata or IndexMetadata(db)
+        self.mode = mode
+        self.sample_size = sample_size
+        self.max_columns = max_columns
+        self.shapes: Dict[str, QueryShape] = {}
+        self.skipped: List[str] = []
+        self.tables: Dict[Tuple[str, str], dict] = {}
+        self.ndv: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.plans: Dict[str, Optional[Plan]] = {}
+        self.measured: Dict[Tuple[str, frozenset], Optional[float]] = {}
+        # invisible 模式下服务端已创建的不可见索引 {(表名, 字段): 索引名}
+        self.invisible: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        # 服务端是否支持不可见索引,首次使用时检查
+        self.invisible_supported: Optional[bool] = None
+
+    def __repr__(self):
+        return f"<class 'think_sql.mysql.advisor.IndexAdvisor' queries={len(self.shapes)} mode={self.mode}>"
+
+    def add(self, sql: str, frequency: float = 1):
+        """添加sql,相同指纹的sql合并频率
+
+        Args:
+            sql (str): sql语句
+            frequency (float, optional): 执行频率. Defaults to 1.
+        """
+        fp = fingerprint(sql)
+        if fp in self.shapes:
+            self.shapes[fp].frequency += frequency
+            return
+        try:
+            shape = parse_query(sql, frequency)
+        except ValueError as e:
+            self.skipped.append(sql)
+            return
+        self.preload(shape.tables)
+        if len(shape.tables) > 1:
+            # 多表查询需要字段信息确定没有前缀的字段所属的表
+            shape = parse_query(sql, frequency, self.resolve)
+        self.shapes[fp] = shape
+
+    def load(self, source: Union[str, Path, Iterable[str]]):
+        """读取慢查询日志/sql文件/sql语句,每条语句频率为1
+
+        Args:
+            source (Union[str, Path, Iterable[str]]): 参考 `sql_helper.load_statements`
+        """
+        for item in load_statements(source):
+            self.add(item["sql"])
+
+    # ---------------------------------------------------------------- 元数据
+
+    def preload(self, table_names: Iterable[str]):
+        """一次查询加载多个表的行数和字段信息"""
+        keys = [k for k in dict.fromkeys(map(self.metadata.key, table_names)) if k not in self.tables]
+        if not keys:
+            return
+        self.metadata.preload(table_names)
+        for key in keys:
+            self.tables[key] = {"rows": 0, "avg_row_length": 0, "columns": {}}
+        conditions = schema_conditions(keys)
+        sql = f"""SELECT
+                TABLE_SCHEMA,TABLE_NAME,TABLE_ROWS,AVG_ROW_LENGTH
+            FROM information_schema.TABLES
+            WHERE {conditions}"""
+        for row in self.db.query(sql):
+            row = {k.upper(): v for k, v in row.items()}
+            info = self.tables.get((row["TABLE_SCHEMA"], row["TABLE_NAME"]))
+            if info is not None:
+                info["rows"] = int(row["TABLE_ROWS"] or 0)
+                info["avg_row_length"] = int(row["AVG_ROW_LENGTH"] or 0)
+        sql = f"""SELECT
+                TABLE_SCHEMA,TABLE_NAME,COLUMN_NAME,DATA_TYPE,CHARACTER_OCTET_LENGTH,NUMERIC_PRECISION
+            FROM information_schema.COLUMNS
+            WHERE {conditions}
+            ORDER BY TABLE_SCHEMA,TABLE_NAME,ORDINAL_POSITION"""
+        for row in self.db.query(sql):
+            row = {k.upper(): v for k, v in row.items()}
+            info = self.tables.get((row["TABLE_SCHEMA"], row["TABLE_NAME"]))
+            if info is not None:
+                info["columns"][row["COLUMN_NAME"]] = column_bytes(row)
+
+    def info(self, table: str) -> dict:
+        key = self.metadata.key(table)
+        if key not in self.tables:
+            self.preload([table])
+        return self.tables[key]
+
+    def resolve(self, tables: List[str], column: str) -> Optional[str]:
+        """查找没有表前缀的字段所属的表,不唯一时返回None"""
+        owners = [t for t in tables if column in self.info(t)["columns"]]
+        return owners[0] if len(owners) == 1 else None
+
+    def rows(self, table: str) -> int:
+        return max(self.info(table)["rows"], 1)
+
+    def primary(self, table: str) -> List[str]:
+        rows = self.metadata.indexes(table).get("PRIMARY", [])
+        return [row["COLUMN_NAME"] for row in rows]
+
+    def existing(self, table: str) -> List[Tuple[str, ...]]:
+        """已有索引的字段列表"""
+        return [
+            tuple(row["COLUMN_NAME"] for row in rows)
+            for rows in self.metadata.indexes(table).values()
+        ]
+
+    def distinct(self, table: str, columns: Iterable[str]) -> Dict[str, float]:
+        """字段基数,优先使用索引统计信息,否则一次查询采样所有字段
+
+        Args:
+            table (str): 表名
+            columns (Iterable[str]): 字段
+
+        Returns:
+            Dict[str, float]: {字段: 不同值数量}
+        """
+        key = self.metadata.key(table)
+        cache = self.ndv.setdefault(key, {})
+        for rows in self.metadata.indexes(table).values():
+            first = rows[0]
+            if first["CARDINALITY"] is not None and first["COLUMN_NAME"] not in cache:
+                cache[first["COLUMN_NAME"]] = max(float(first["CARDINALITY"]), 1.0)
+        missing = [c for c in dict.fromkeys(columns) if c not in cache]
+        if not missing:
+            return cache
+        select = ", ".join(f"COUNT(DISTINCT {quote(c)}) AS {quote(c)}" for c in missing)
+        sql = (
+            f"SELECT COUNT(*) AS `__rows`, {select} "
+            f"FROM (SELECT {', '.join(map(quote, missing))} FROM {quote(table)} LIMIT {self.sample_size}) AS s"
+        )
+        result = self.db.query(sql)
+        row = result[0] if result else {}
+        sampled = int(row.get("__rows") or 0)
+        total = self.rows(table)
+        for column in missing:
+            ndv = float(row.get(column) or 1)
+            if sampled and sampled < total and ndv > 0.9 * sampled:
+                # 采样中几乎没有重复值,按比例放大
+                ndv = ndv * total / sampled
+            cache[column] = max(ndv, 1.0)
+        return cache
+
+    # ---------------------------------------------------------------- 代价模型
+
+    def scan_cost(self, table: str) -> float:
+        info = self.info(table)
+        rows = self.rows(table)
+        pages = max(rows * max(info["avg_row_length"], 1) / PAGE_SIZE, 1)
+        return pages * IO_BLOCK_READ_COST + rows * ROW_EVALUATE_COST
+
+    def predicates(self, shape: QueryShape, table: str, driving: bool) -> Tuple[List[str], List[str]]:
+        """表的等值、范围条件字段,驱动表的关联字段没有外层数据,不能作为条件"""
+        eq = shape.eq.get(table, [])
+        if driving:
+            join = shape.join.get(table, [])
+            eq = [c for c in eq if c not in join]
+        return eq, shape.range.get(table, [])
+
+    def access(
+        self, shape: QueryShape, table: str, columns: Tuple[str, ...], driving: bool = True
+    ) -> Optional[Tuple[float, float, bool, List[str]]]:
+        """使用索引访问表一次的估算代价
+
+        Args:
+            shape (QueryShape): sql结构
+            table (str): 表名
+            columns (Tuple[str, ...]): 索引字段
+            driving (bool, optional): 是否驱动表. Defaults to True.
+
+        Returns:
+            Optional[Tuple[float, float, bool, List[str]]]: (代价, 过滤后行数, 是否有序, 使用的索引字段),
+                索引不可用时返回None
+        """
+        rows = self.rows(table)
+        eq, ranges = self.predicates(shape, table, driving)
+        order = shape.order.get(table, [])
+        ndv = self.distinct(table, eq)
+        matched = float(rows)
+        used = []
+        for column in columns:
+            if column not in eq:
+                break
+            matched /= ndv.get(column, 1.0)
+            used.append(column)
+        rest = list(columns[len(used):])
+        ordered = bool(order) and rest[: len(order)] == order
+        if not ordered and rest and rest[0] in ranges:
+            matched *= RANGE_SELECTIVITY
+            used.append(rest[0])
+        if not used and not ordered:
+            return None
+
+        # 索引没有用到的条件在回表后过滤
+        selectivity = 1.0
+        for column in eq:
+            if column not in used:
+                selectivity /= ndv.get(column, 1.0)
+        for column in ranges:
+            if column not in used:
+                selectivity *= RANGE_SELECTIVITY
+        if ordered and shape.limit and len(shape.tables) == 1:
+            # 有序索引扫描,取够LIMIT行即可停止
+            matched = min(matched, shape.limit / selectivity)
+        matched = max(matched, 1.0)
+
+        needed = shape.columns.get(table)
+        covering = needed is not None and needed <= set(columns) | set(self.primary(table))
+        per_row = ROW_EVALUATE_COST + (0 if covering else ROW_LOOKUP_COST)
+        cost = IO_BLOCK_READ_COST + matched * per_row
+        return cost, max(matched * selectivity, 1.0), ordered, used
+
+    def table_cost(
+        self,
+        shape: QueryShape,
+        table: str,
+        indexes: Iterable[Tuple[str, ...]],
+        loops: float = 0,
+    ) -> Tuple[float, float]:
+        """访问一个表的最小估算代价(全表扫描或可用索引),包含排序代价
+
+        Args:
+            shape (QueryShape): sql结构
+            table (str): 表名
+            indexes (Iterable[Tuple[str, ...]]): 可用索引
+            loops (float, optional): 被驱动表的外层行数,0为驱动表. Defaults to 0.
+
+        Returns:
+            Tuple[float, float]: (代价, 过滤后行数)
+        """
+        driving = not loops
+        rows = self.rows(table)
+        eq, ranges = self.predicates(shape, table, True)
+        ndv = self.distinct(table, eq)
+        selectivity = 1.0
+        for column in eq:
+            selectivity /= ndv.get(column, 1.0)
+        selectivity *= RANGE_SELECTIVITY ** len(ranges)
+        out = max(rows * selectivity, 1.0)
+        order = shape.order.get(table) if driving else None
+
+        def sort(count: float) -> float:
+            return count * math.log2(count + 2) * ROW_EVALUATE_COST if order else 0.0
+
+        # 没有可用的关联索引时按 hash join 估算: 扫描一次,外层每行探测一次
+        probe = loops * ROW_EVALUATE_COST
+        best = self.scan_cost(table) + sort(out) + probe
+        for columns in indexes:
+            result = self.access(shape, table, columns, driving)
+            if result is None:
+                continue
+            cost, count, ordered, used = result
+            if not driving and set(used) & set(shape.join.get(table, [])):
+                # 使用关联字段的索引,外层每行查找一次
+                cost *= loops
+            else:
+                cost += probe
+            best = min(best, cost + (0.0 if ordered else sort(count)))
+        return best, out
+
+    def model_costs(self, shape: QueryShape, extra: Iterable[IndexCandidate] = ()) -> Dict[str, float]:
+        """按代价模型估算每个表的访问代价,多表查询按表的出现顺序,第一个表为驱动表
+
+        Args:
+            shape (QueryShape): sql结构
+            extra (Iterable[IndexCandidate], optional): 假设已经创建的索引. Defaults to ().
+
+        Returns:
+            Dict[str, float]: {表名: 代价}
+        """
+        extra = list(extra)
+        costs = {}
+        loops = 0.0
+        for table in shape.tables:
+            indexes = self.existing(table) + [c.columns for c in extra if c.table == table]
+            costs[table], out = self.table_cost(shape, table, indexes, loops)
+            if not loops:
+                loops = out
+        return costs
+
+    def model_cost(self, shape: QueryShape, extra: Iterable[IndexCandidate] = ()) -> float:
+        """按代价模型估算sql代价"""
+        return sum(self.model_costs(shape, extra).values())
+
+    def plan(self, sql: str) -> Optional[Plan]:
+        """`db.explain` 执行计划,不支持时返回None"""
+        fp = fingerprint(sql)
+        if fp not in self.plans:
+            try:
+                self.plans[fp] = self.db.explain(sql)
+            except Exception as e:
+                self.plans[fp] = None
+        return self.plans[fp]
+
+    def supports_invisible(self) -> bool:
+        """服务端是否支持不可见索引(MySQL 8.0+,MariaDB不支持),不支持时回退到 hypothetical 模式"""
+        if self.invisible_supported is None:
+            info = ""
+            try:
+                info = self.db.connector.get_server_info() or ""
+                version = self.db.server_version()
+            except Exception:
+                version = ()
+            self.invisible_supported = version >= (8, 0) and "MariaDB" not in info
+            if not self.invisible_supported:
+                logger.warning(
+                    f"invisible indexes need MySQL 8.0+ (server {info or 'unknown'}), use hypothetical mode"
+                )
+                self.mode = "hypothetical"
+        return self.invisible_supported
+
+    def sync_invisible(self, candidates: Iterable[IndexCandidate]):
+        """使服务端的不可见索引与 `candidates` 一致,删除多余的,创建缺少的
+
+        DDL 使用 `db.exec` 执行,失败时抛出异常,只记录创建成功的索引
+        """
+        wanted = {(c.table, c.columns): c for c in candidates}
+        for key in [key for key in self.invisible if key not in wanted]:
+            self.drop_invisible(key)
+        for key in wanted:
+            if key in self.invisible:
+                continue
+            table, columns = key
+            name = f"tmp_advisor_{abs(hash(key)) % 100000000}"
+            self.db.exec(
+                f"ALTER TABLE {quote(table)} ADD INDEX {name}({','.join(map(quote, columns))}) INVISIBLE"
+            )
+            self.invisible[key] = name
+
+    def drop_invisible(self, key: Tuple[str, Tuple[str, ...]]):
+        name = self.invisible.pop(key)
+        try:
+            self.db.exec(f"ALTER TABLE {quote(key[0])} DROP INDEX {name}")
+        except Exception as e:
+            logger.warning(f"drop index {name} failed: {e}")
+
+    def measure(self, shape: QueryShape, chosen: List[IndexCandidate]) -> Optional[float]:
+        """同时创建全部已选索引(不可见),获取执行计划的真实代价(MySQL 8.0+)
+
+        只需要共同使用才能生效的索引(ex: 关联查询两个表上的索引)也能测出收益,
+        创建索引或执行计划失败时返回None
+        """
+        key = (shape.fingerprint, frozenset((c.table, c.columns) for c in chosen))
+        if key in self.measured:
+            return self.measured[key]
+        cost = None
+        try:
+            self.sync_invisible(chosen)
+            self.db.exec("SET SESSION optimizer_switch = 'use_invisible_indexes=on'")
+            cost = self.db.explain(shape.sql).cost
+        except Exception as e:
+            logger.warning(f"measure {shape.sql} failed: {e}")
+        finally:
+            try:
+                self.db.exec("SET SESSION optimizer_switch = 'use_invisible_indexes=off'")
+            except Exception as e:
+                logger.warning(e)
+        self.measured[key] = cost
+        return cost
+
+    def cost(self, shape: QueryShape, chosen: Iterable[IndexCandidate] = ()) -> float:
+        """sql在已选索引下的代价
+
+        有执行计划时以真实代价为基准: hypothetical 按代价模型中每个表代价的变化比例缩放执行计划中该表的真实代价
+        (文件排序代价计入驱动表),invisible 同时创建全部已选索引后实测,实测失败时按 hypothetical 估算
+        """
+        chosen = [c for c in chosen if c.table in shape.tables]
+        plan = self.plan(shape.sql) if not shape.write else None
+        if plan is not None and chosen and self.mode == "invisible" and self.supports_invisible():
+            cost = self.measure(shape, chosen)
+            if cost is not None:
+                return cost
+        if not chosen:
+            return plan.cost if plan is not None else self.model_cost(shape)
+        before = self.model_costs(shape)
+        after = self.model_costs(shape, chosen)
+        if plan is None:
+            return sum(after.values())
+
+        # 执行计划中每个表的真实代价
+        real = {table: 0.0 for table in shape.tables}
+        found = set()
+        for node in plan.tables():
+            table = shape.aliases.get(node.table, node.table)
+            if table in real:
+                real[table] += node.cost
+                found.add(table)
+        sorts = sum(node.cost for node in plan.filesorts() if not node.table)
+        if sorts and shape.tables[0] in found:
+            real[shape.tables[0]] += sorts
+        scale = plan.cost / sum(before.values()) if sum(before.values()) else 1.0
+        saved = 0.0
+        for table in shape.tables:
+            if not before[table]:
+                continue
+            if table in found:
+                saved += real[table] * (1 - after[table] / before[table])
+            else:
+                saved += (before[table] - after[table]) * scale
+        return max(plan.cost - saved, 0.0)
+
+    # ---------------------------------------------------------------- 推荐
+
+    def candidates(self) -> List[IndexCandidate]:
+        """枚举候选索引: 等值字段(基数高的在前),然后是一个范围字段或排序字段"""
+        found: Dict[Tuple[str, Tuple[str, ...]], IndexCandidate] = {}
+
+        def add(table: str, columns: List[str]):
+            columns = tuple(dict.fromkeys(columns))[: self.max_columns]
+            if not columns:
+                return
+            info = self.info(table)
+            sizes = [info["columns"].get(c) for c in columns]
+            if info["columns"] and any(size is None for size in sizes):
+                # 字段不存在或类型不能直接建索引
+                return
+            if any(existing[: len(columns)] == columns for existing in self.existing(table)):
+                return
+            key = (table, columns)
+            if key not in found:
+                pk = sum(info["columns"].get(c) or 8 for c in self.primary(table)) or 8
+                entry = sum(size or 8 for size in sizes) + pk + INDEX_ENTRY_OVERHEAD
+                size = int(self.rows(table) * entry / PAGE_FILL_FACTOR)
+                found[key] = IndexCandidate(table, columns, size)
+
+        for shape in self.shapes.values():
+            for table in shape.tables:
+                eq = shape.eq.get(table, [])
+                ndv = self.distinct(table, eq)
+                eq = sorted(eq, key=lambda c: ndv.get(c, 1.0), reverse=True)
+                ranges = shape.range.get(table, [])
+                order = shape.order.get(table, [])
+                for column in eq:
+                    add(table, [column])
+                if eq:
+                    add(table, eq)
+                for column in ranges[:1]:
+                    add(table, eq + [column])
+                if order:
+                    add(table, eq + order)
+
+        for candidate in found.values():
+            for shape in self.shapes.values():
+                if shape.write and candidate.table in shape.tables:
+                    if shape.write == "UPDATE" and not set(shape.set_columns) & set(candidate.columns):
+                        continue
+                    candidate.write_cost += shape.frequency * INDEX_WRITE_COST
+        return list(found.values())
+
+    def advise(self, max_indexes: int = 5, storage_budget: int = 0, min_benefit: float = 0.0) -> dict:
+        """贪心选择索引:每轮选择净收益(查询代价减少 - 写入维护代价)最大的候选索引
+
+        Args:
+            max_indexes (int, optional): 最多推荐索引数. Defaults to 5.
+            storage_budget (int, optional): 新增索引的存储预算(字节),0为不限制. Defaults to 0.
+            min_benefit (float, optional): 最小净收益. Defaults to 0.0.
+
+        Returns:
+            dict: {
+                "indexes": [{table, columns, sql, size, write_cost, benefit, net_benefit, queries}],
+                "queries": [{fingerprint, sql, frequency, cost_before, cost_after}],
+                "total": {cost_before, cost_after, storage, candidates},
+                "skipped": [sql],
+            }
+        """
+        # INSERT/REPLACE 只计算写入维护代价
+        shapes = [s for s in self.shapes.values() if s.write not in ("INSERT", "REPLACE")]
+        candidates = self.candidates()
+        current = {s.fingerprint: self.cost(s) for s in shapes}
+        before = dict(current)
+        chosen: List[IndexCandidate] = []
+        storage = 0
+        try:
+            while len(chosen) < max_indexes:
+                best, best_net, best_costs = None, min_benefit, {}
+                for candidate in candidates:
+                    if candidate in chosen:
+                        continue
+                    if storage_budget and storage + candidate.size > storage_budget:
+                        continue
+                    costs = {
+                        s.fingerprint: self.cost(s, chosen + [candidate])
+                        for s in shapes
+                        if candidate.table in s.tables
+                    }
+                    gain = sum(
+                        self.shapes[fp].frequency * (current[fp] - cost) for fp, cost in costs.items()
+                    )
+                    net = gain - candidate.write_cost
+                    if net > best_net:
+                        best, best_net, best_costs = candidate, net, costs
+                if best is None:
+                    break
+                best.benefit = best_net + best.write_cost
+                best.queries = [fp for fp, cost in best_costs.items() if cost < current[fp]]
+                current.update(best_costs)
+                chosen.append(best)
+                storage += best.size
+        finally:
+            # invisible 模式测量时创建的不可见索引
+            for key in list(self.invisible):
+                self.drop_invisible(key)
+
+        queries = [
+            {
+                "fingerprint": s.fingerprint,
+                "sql": s.sql,
+                "frequency": s.frequency,
+                "cost_before": before[s.fingerprint],
+                "cost_after": current[s.fingerprint],
+            }
+            for s in sorted(shapes, key=lambda s: s.frequency * before[s.fingerprint], reverse=True)
+        ]
+        return {
+            "indexes": [c.to_dict() for c in chosen],
+            "queries": queries,
+            "total": {
+                "cost_before": sum(s.frequency * before[s.fingerprint] for s in shapes),
+                "cost_after": sum(s.frequency * current[s.fingerprint] for s in shapes),
+                "storage": storage,
+                "candidates": len(candidates),
+            },
+            "skipped": list(self.skipped),
+        }
+
+
+def advise(
+    db: DB,
+    queries: Union[Dict[str, float], str, Path, Iterable[str]],
+    max_indexes: int = 5,
+    storage_budget: int = 0,
+    mode: str = "hypothetical",
+    metadata: IndexMetadata = None,
+    **kwargs,
+) -> dict:
+    """根据工作负载推荐索引
+
+    Args:
+        db (DB): 数据库连接
+        queries (Union[Dict[str, float], str, Path, Iterable[str]]): {sql: 执行频率} 或
+            慢查询日志路径|sql文件路径|sql语句|sql语句列表(每条频率为1)
+        max_indexes (int, optional): 最多推荐索引数. Defaults to 5.
+        storage_budget (int, optional): 新增索引的存储预算(字节),0为不限制. Defaults to 0.
+        mode (str, optional): 代价估算方式 hypothetical|invisible. Defaults to "hypothetical".
+        metadata (IndexMetadata, optional): 索引元数据缓存. Defaults to None.
+        **kwargs: `IndexAdvisor` 其他参数 sample_size, max_columns
+
+    Returns:
+        dict: 参考 `IndexAdvisor.advise`
+    """
+    advisor = IndexAdvisor(db, metadata, mode, **kwargs)
+    if isinstance(queries, dict):
+        for sql, frequency in queries.items():
+            advisor.add(sql, frequency)
+    else:
+        advisor.load(queries)
+    return advisor.advise(max_indexes, storage_budget)
+
+
+def advise_report(result: dict, width: int = 80) -> str:
+    """格式化 `advise` 结果
+
+    Args:
+        result (dict): advise 返回结果
+        width (int, optional): sql显示宽度. Defaults to 80.
+
+    Returns:
+        str: 报告
+    """
+    total = result["total"]
+    lines = [
+        f"candidates: {total['candidates']}, cost: {total['cost_before']:.1f} -> {total['cost_after']:.1f}, "
+        f"storage: {total['storage'] / 1048576:.1f}MB"
+    ]
+    if result["indexes"]:
+        lines.append(
+            tabulate(
+                [
+                    [i["sql"], round(i["benefit"], 1), round(i["write_cost"], 1), round(i["size"] / 1048576, 1), len(i["queries"])]
+                    for i in result["indexes"]
+                ],
+                headers=["index", "benefit", "write cost", "size(MB)", "queries"],
+                tablefmt="grid",
+            )
+        )
+    lines.append(
+        tabulate(
+            [
+                [q["fingerprint"], q["frequency"], round(q["cost_before"], 1), round(q["cost_after"], 1), textwrap.shorten(q["sql"], width)]
+                for q in result["queries"]
+            ],
+            headers=["fingerprint", "frequency", "cost before", "cost after", "sql"],
+            tablefmt="grid",
+        )
+    )
+    return "\n".join(lines)
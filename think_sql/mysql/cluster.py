@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import itertools
+from typing import List, Optional, Union
+
+from think_sql.tool.util import DBConfig, ClusterConfig, cluster_config
+from think_sql.mysql.db import DB
+
+
+class ClusterDB(DB):
+    """主从读写分离
+
+    select/find/value/column/count/sum/avg/max/exists 等读操作路由到从库,
+    写操作、事务内的读操作以及写操作后 `sticky` 秒内的读操作使用主库.
+    从库定期检查,复制延迟超过 `max_lag` 或无法连接的从库不参与读操作
+    """
+
+    def __init__(
+        self,
+        config: Union[dict, DBConfig, ClusterConfig],
+        params={},
+    ):
+        """实例化主从连接
+
+        Args:
+            config: dict|DBConfig|ClusterConfig 主从配置,
+                ex: {"primary": "root:'root'@127.0.0.1:3306/test", "replicas": [...]}
+            params: dict 数据库连接参数
+        """
+        self.cluster = cluster_config(config)
+        self.replicas: List[DB] = []
+        self.healthy: List[DB] = []
+        self.latency = {}
+        self.lag = {}
+        self.last_write = 0.0
+        self.last_check = 0.0
+        super().__init__(self.cluster.primary, params)
+        for cfg in self.cluster.replicas:
+            try:
+                self.replicas.append(DB(cfg, params).read_only())
+            except Exception as e:
+                self.log.warning(f"replica {cfg.host}:{cfg.port} unavailable: {e}")
+        self._round_robin = itertools.cycle(range(max(len(self.replicas), 1)))
+        self.check_replicas()
+
+    def __repr__(self):
+        return f"<class 'think_sql.mysql.ClusterDB' uri={self.config.host}:{self.config.port} database={self.database} replicas={len(self.replicas)}>"
+
+    def __exit__(self, exc_type, exc_value, trace):
+        super().__exit__(exc_type, exc_value, trace)
+        self.close_replicas()
+
+    def clone(self) -> DB:
+        """使用主库配置创建新的连接"""
+        conn = DB(self.config, self.params)
+        conn._debug = self._debug
+        conn._retry = dict(self._retry)
+        return conn
+
+    def close(self):
+        """关闭主库及从库连接"""
+        super().close()
+        self.close_replicas()
+
+    def close_replicas(self):
+        """关闭从库连接"""
+        for replica in self.replicas:
+            try:
+                replica.close()
+            except Exception as e:
+                self.log.warning(e)
+        self.replicas = []
+        self.healthy = []
+
+    def replica_lag(self, replica: DB) -> Optional[float]:
+        """获取从库复制延迟(秒)
+
+        Returns:
+            Optional[float]: 复制延迟,非从库返回0,复制中断或无法获取时返回None
+        """
+        for sql, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                replica.cursor.execute(sql)
+                rows = replica.cursor.fetchall()
+            except Exception:
+                continue
+            if not rows:
+                return 0
+            lag = rows[0].get(column)
+            return None if lag is None else float(lag)
+        return None
+
+    def max_replica_lag(self) -> Optional[float]:
+        """从库最大复制延迟(秒),无从库时返回None"""
+        self.check_replicas(force=True)
+        lags = [self.lag.get(id(r)) for r in self.replicas]
+        if not lags:
+            return None
+        if any(lag is None for lag in lags):
+            return float("inf")
+        return max(lags)
+
+    def check_replicas(self, force: bool = False):
+        """检查从库连接、延迟,更新可用从库列表
+
+        Args:
+            force (bool, optional): 忽略检查间隔立即检查. Defaults to False.
+        """
+        now = time.time()
+        if not force and now - self.last_check < self.cluster.check_interval:
+            return
+        self.last_check = now
+        healthy = []
+        for replica in self.replicas:
+            start = time.time()
+            try:
+                replica.connector.ping(True)
+            except Exception as e:
+                self.log.warning(f"replica {replica.config.host} ping failed: {e}")
+                continue
+            self.latency[id(replica)] = time.time() - start
+            if self.cluster.max_lag is None and not force:
+                healthy.append(replica)
+                continue
+            lag = self.replica_lag(replica)
+            self.lag[id(replica)] = lag
+            if self.cluster.max_lag is not None and (
+                lag is None or lag > self.cluster.max_lag
+            ):
+                self.log.warning(f"replica {replica.config.host} lag {lag}s excluded")
+                continue
+            healthy.append(replica)
+        self.healthy = healthy
+
+    def reader(self) -> DB:
+        """选择读操作连接
+
+        事务中、unit of work中、写操作后 `sticky` 秒内使用主库,否则按策略选择可用从库
+        """
+        if not self.auto_commit or self.uow is not None:
+            return self
+        if self.cluster.sticky and time.time() - self.last_write < self.cluster.sticky:
+            return self
+        self.check_replicas()
+        if not self.healthy:
+            return self
+        if self.cluster.strategy == "least_latency":
+            return min(self.healthy, key=lambda r: self.latency.get(id(r), 0))
+        return self.healthy[next(self._round_robin) % len(self.healthy)]
+
+    def commit(self):
+        """提交,事务和合并写入的提交记录写入时间用于读己之写"""
+        if not self.auto_commit or self.pending_writes:
+            self.last_write = time.time()
+        super().commit()
+
+    def commit_write(self):
+        """写操作后提交,记录写入时间用于读己之写"""
+        self.last_write = time.time()
+        super().commit_write()
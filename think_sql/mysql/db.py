@@ -4,20 +4,27 @@ __author__ = "hbh112233abc@163.com"
 
 
 import re
+import time
 import contextlib
-from typing import List, Union
+from typing import Any, Callable, List, Tuple, Union
 
 import pymysql
-from loguru import logger
 
+from think_sql.tool.log import logger
 from think_sql.tool.util import DBConfig
+from think_sql import metrics
 from think_sql.tool.base import Database
 from think_sql.tool.interface import DatabaseInterface
+from think_sql.tool.plan import Plan, parse_analyze, parse_json
 
 from think_sql.mysql.table import Table
+from think_sql.mysql.uow import UnitOfWork
 
 
 class DB(DatabaseInterface,Database):
+    # 1213: 死锁, 1205: 锁等待超时
+    RETRY_ERRORS = (1213, 1205)
+
     def __init__(
         self,
         config: Union[str, dict, DBConfig],
@@ -35,21 +42,85 @@ class DB(DatabaseInterface,Database):
         return f"<class 'think_sql.mysql.DB' uri={self.config.host}:{self.config.port} database={self.database}>"
 
     @contextlib.contextmanager
-    def start_trans(self):
-        """开始事务"""
-        self.auto_commit = False
+    def start_trans(self, unit_of_work: bool = False, flush_size: int = 1000):
+        """开始事务
+
+        with 语句块无法重放,需要死锁重试时使用 `transaction()`
+
+        Args:
+            unit_of_work (bool, optional): 是否合并事务内的写操作,
+                开启后 insert/update/delete 返回 Future. Defaults to False.
+            flush_size (int, optional): 合并写操作的最大缓存条数. Defaults to 1000.
+        """
         try:
-            self.connector.begin()
-            yield
-            self.connector.commit()
+            with self.__trans(unit_of_work, flush_size):
+                yield
         except Exception as e:
             logger.error(e)
-            self.connector.rollback()
-        finally:
-            self.auto_commit = True
+
+    def transaction(
+        self,
+        func: Callable[..., Any],
+        *args,
+        unit_of_work: bool = False,
+        flush_size: int = 1000,
+        **kwargs,
+    ) -> Any:
+        """在事务中执行函数
+
+        遇到死锁/锁等待超时(`retry()` 设置的可重试错误)时回滚并按退避策略重放整个函数,
+        函数需保证重复执行是安全的(除数据库操作外无副作用)
+
+        Args:
+            func (Callable[..., Any]): 事务函数,参数为 `*args, **kwargs`
+            unit_of_work (bool, optional): 是否合并事务内的写操作. Defaults to False.
+            flush_size (int, optional): 合并写操作的最大缓存条数. Defaults to 1000.
+
+        Returns:
+            Any: 函数返回值
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.__trans(unit_of_work, flush_size):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                code = self.retryable(e)
+                if code is None or attempt >= self._retry["attempts"]:
+                    raise e
+                name = getattr(func, "__name__", "transaction")
+                self.retry_stats[(name, code)] += 1
+                self.log.warning(f"[retry]({name}) {e}, attempt {attempt + 1}")
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
+    @contextlib.contextmanager
+    def __trans(self, unit_of_work: bool = False, flush_size: int = 1000):
+        """事务,失败时回滚并抛出异常"""
+        self.flush_pending()
+        self.auto_commit = False
+        with self.span("transaction", **{"think_sql.unit_of_work": unit_of_work}):
+            try:
+                self.connector.begin()
+                if unit_of_work:
+                    self.uow = UnitOfWork(self, flush_size)
+                yield
+                if self.uow is not None:
+                    self.uow.flush()
+                self.commit()
+            except Exception as e:
+                if self.uow is not None:
+                    self.uow.fail(e)
+                self.connector.rollback()
+                raise e
+            finally:
+                self.uow = None
+                self.auto_commit = True
 
     def close(self):
         """关闭数据库连接"""
+        self.close_writers()
+        self.flush_pending()
         self.cursor.close()
         self.connector.close()
 
@@ -65,12 +136,84 @@ class DB(DatabaseInterface,Database):
         )
         # SSCursor (流式游标) 解决 Python 使用 pymysql 查询大量数据导致内存使用过高的问题
         self.cursor = self.connector.cursor(pymysql.cursors.SSDictCursor)
+        if self._read_only:
+            self.set_read_only(True)
+
+    def connection_id(self) -> int:
+        """连接id(服务端线程id)"""
+        return self.connector.thread_id()
+
+    def analyze_slow(self, sql: str, params: tuple = ()) -> List[str]:
+        """使用 sql_helper 分析慢sql的执行计划和索引建议
+
+        Returns:
+            List[str]: 分析结果
+        """
+        from think_sql.mysql.sql_helper import help
+
+        if not self.check_connected():
+            self.connect()
+        statement = self.cursor.mogrify(sql, params or None)
+        return help(self, statement, echo=False)
+
+    def server_version(self) -> Tuple[int, ...]:
+        """服务端版本号,如 (8, 0, 32),无法获取时为 ()"""
+        if not self.check_connected():
+            self.connect()
+        try:
+            version = self.connector.get_server_info()
+        except Exception as e:
+            return ()
+        match = re.match(r"(\d+)\.(\d+)\.(\d+)", version or "")
+        return tuple(int(x) for x in match.groups()) if match else ()
+
+    def explain(self, sql: str, params: tuple = (), analyze: bool = False) -> Plan:
+        """结构化执行计划
+
+        `EXPLAIN FORMAT=JSON` 返回代价、行数、访问类型、使用的索引字段、文件排序/临时表等,
+        `analyze=True` 时使用 `EXPLAIN ANALYZE`(MySQL 8.0.18+)实际执行sql并统计每个节点的实际行数和耗时
+
+        Args:
+            sql (str): sql模板
+            params (tuple, optional): 绑定参数. Defaults to ().
+            analyze (bool, optional): 是否实际执行. Defaults to False.
+
+        Raises:
+            ValueError: 服务端不支持 EXPLAIN ANALYZE(MySQL 8.0.18 以下版本或 MariaDB)
+
+        Returns:
+            Plan: 执行计划
+        """
+        if not self.check_connected():
+            self.connect()
+        statement = self.cursor.mogrify(sql, params or None)
+        if analyze and (
+            "MariaDB" in self.connector.get_server_info() or self.server_version() < (8, 0, 18)
+        ):
+            raise ValueError("EXPLAIN ANALYZE needs MySQL 8.0.18+")
+        cursor = self.connector.cursor(pymysql.cursors.Cursor)
+        try:
+            if analyze:
+                cursor.execute(f"EXPLAIN ANALYZE {statement}")
+                return parse_analyze(cursor.fetchone()[0])
+            cursor.execute(f"EXPLAIN FORMAT=JSON {statement}")
+            return parse_json(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+
+    def set_read_only(self, flag: bool = True):
+        """设置只读会话
+
+        只读时开启连接autocommit,每条查询独立事务且无需额外commit
+        """
+        self.connector.autocommit(flag)
+        mode = "READ ONLY" if flag else "READ WRITE"
+        self.cursor.execute(f"SET SESSION TRANSACTION {mode}")
 
     def execute(self, sql:str, params:tuple=()) -> int:
         try:
             result = self.exec(sql,params)
-            if self.auto_commit:
-                self.connector.commit()
+            self.commit_write()
             return result
         except Exception as e:
             self.log.warning(sql)
@@ -113,8 +256,17 @@ class DB(DatabaseInterface,Database):
         Returns:
             Table: 数据表对象,可以执行链式操作
         """
-        if not self.check_connected():
-            self.connect()
+        start = time.perf_counter() if metrics.REGISTRY.enabled else 0
+        with self.span("connection.checkout", **{"db.sql.table": table_name}):
+            if not self.check_connected():
+                self.connect()
+                metrics.inc("think_sql_reconnects_total", database=self.database)
+        if start:
+            metrics.observe(
+                "think_sql_checkout_wait_seconds",
+                time.perf_counter() - start,
+                database=self.database,
+            )
         return Table(self, table_name)
 
     def check_connected(self):
@@ -10,19 +10,28 @@ from typing import Dict, List
 
 import click
 import pymysql
-from loguru import logger
+
+from think_sql.tool.log import logger
 
 log_path = Path.cwd() / "logs"
-log_path.mkdir(parents=True, exist_ok=True)
-log_file = log_path / f"{Path(__file__).stem}.log"
-logger.add(
-    log_file,
-    filter="",
-    rotation="00:00",
-    retention="10 days",
-    backtrace=True,
-    diagnose=True,
-)
+log_handler = None
+
+
+def setup_logger():
+    """命令行运行时创建日志目录并添加文件日志"""
+    global log_handler
+    if log_handler is not None:
+        return
+    log_path.mkdir(parents=True, exist_ok=True)
+    log_file = log_path / f"{Path(__file__).stem}.log"
+    log_handler = logger.add(
+        log_file,
+        filter="",
+        rotation="00:00",
+        retention="10 days",
+        backtrace=True,
+        diagnose=True,
+    )
 
 db_type = "mysql"
 
@@ -718,6 +727,7 @@ def reset_calc_position(
 
 
 def save_sql(sql_list: List[str]):
+    log_path.mkdir(parents=True, exist_ok=True)
     with open(log_path / "update.sql", "w", encoding="utf-8") as f:
         for sql in sql_list:
             # print(sql)
@@ -749,6 +759,7 @@ def save_sql(sql_list: List[str]):
 )
 def diff(type: str, src: str, dst: str = "", save: bool = True) -> List[str]:
     """SQL差异 工具 支持mysql 8.0 json, 支持mysql8 虚拟列, 支持阿里云polardb，待支持OceanBase"""
+    setup_logger()
     if type.lower() not in ("mysql", "polardb", "oceanbase"):
         return logger.error(
             f"不支持该数据库:{type}\n该工具仅支持mysql polardb oceanbase"
@@ -2,22 +2,30 @@
 # -*- coding: utf-8 -*-
 __author__ = "hbh112233abc@163.com"
 
+import os
 import re
+import json
+import base64
 import textwrap
-from collections import Counter
-from typing import Any, Dict, List, Tuple
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
 
 import sqlparse
 from tabulate import tabulate
 from sql_metadata import Parser
 
 from think_sql.mysql.db import DB
+from think_sql.tool.fingerprint import fingerprint, normalize
 
-logs = []
+# 分析日志按线程保存,支持后台线程分析
+local = threading.local()
 
 
 def log(s: str = "", level: str = "log") -> List[str]:
-    global logs
+    if not hasattr(local, "logs"):
+        local.logs = []
     tpl = {
         "info": "\033[94m {} \033[0m",  # 蓝
         "error": "\033[91m {} \033[0m",  # 红
@@ -26,10 +34,10 @@ def log(s: str = "", level: str = "log") -> List[str]:
         "debug": "\033[95m {} \033[0m",  # 紫
         "log": "{}",  # 无颜色
     }
-    logs.append(s)
-    s = tpl.get(level, "{}").format(s)
-    print(s)
-    return logs
+    local.logs.append(s)
+    if getattr(local, "echo", True):
+        print(tpl.get(level, "{}").format(s))
+    return local.logs
 
 
 def has_table_alias(table_alias: dict) -> bool:
@@ -60,78 +68,141 @@ def has_table_alias(table_alias: dict) -> bool:
     return True
 
 
-def count_column_value(
-    db: DB,
-    table_name: str,
-    field_name: str,
-    sample_size: int,
-    where_condition: str = "1=1",
-) -> List[Tuple[Any, int]]:
-    """取列阈值
-    <sample_size 取(SELECT COUNT(*) FROM {table_name}) / 2
-    否则 {sample_size} / 2
+def schema_conditions(keys: Iterable[Tuple[str, str]]) -> str:
+    """information_schema 按 (库名, 表名) 过滤的条件
 
     Args:
-        db (DB): 数据库连接
-        table_name (str): name of the table
-        field_name (str): name of the field
-        sample_size (int): number of samples
-        where_condition (str): where condition
+        keys (Iterable[Tuple[str, str]]): [(库名, 表名)]
 
     Returns:
-        List[Tuple[Any, int]]: count result
+        str: (TABLE_SCHEMA = 'db' AND TABLE_NAME IN ('a', 'b')) OR ...
+    """
+    schemas: Dict[str, List[str]] = {}
+    for schema, table in keys:
+        schemas.setdefault(schema, []).append(table)
+    return " OR ".join(
+        f"(TABLE_SCHEMA = '{schema}' AND TABLE_NAME IN ({', '.join(repr(t) for t in tables)}))"
+        for schema, tables in schemas.items()
+    )
 
 
-    在这个查询中，使用了CASE语句来判断数据行数是否小于sample_size。如果数据行数小于sample_size，则使用
-    (SELECT COUNT(*) FROM {table_name}) / 2
-    作为阈值，即表的实际大小除以2；否则使用 {sample_size} / 2 作为阈值。
-    """
+class IndexMetadata:
+    """索引元数据缓存
 
-    # 如果你的数据库是MySQL 8.0，那么推荐用 CTE（公共表达式）的形式
-    '''
-    sql = f"""
-    WITH subquery AS (
-        SELECT {field_name}
-        FROM {table_name}
-        LIMIT {sample_size}
-    )
-    SELECT COUNT(*) as count
-    FROM subquery
-    GROUP BY {field_name}
-    HAVING COUNT(*) >=
-        CASE
-            WHEN (SELECT COUNT(*) FROM subquery) < {sample_size} THEN (SELECT COUNT(*) FROM {table_name}) / 2
-            ELSE {sample_size} / 2
-        END;
+    一次分析会话内,每个表只查询一次 information_schema.STATISTICS,
+    之后的索引检查都从内存中获取.可以在多次 `help` 之间共享,线程安全
+
+    Example:
+        metadata = IndexMetadata(db)
+        metadata.preload(["user", "order"])
+        metadata.index_exists("user", "age")
     """
-    '''
-
-    # 默认采用子查询兼容MySQL 5.7版本
-    '''
-    sql = f"""
-    SELECT COUNT(*) as count
-    FROM (
-        SELECT {field_name}
-        FROM {table_name}
-        LIMIT {sample_size}
-    ) AS subquery
-    GROUP BY {field_name}
-    HAVING COUNT(*) >=
-    CASE
-        WHEN (SELECT COUNT(*) FROM {table_name} LIMIT {sample_size}) < {sample_size}
-        THEN (SELECT COUNT(*) FROM {table_name}) / 2
-        ELSE {sample_size} / 2
-    END;
+
+    def __init__(self, db: DB):
+        """实例化
+
+        Args:
+            db (DB): 数据库连接
+        """
+        self.db = db
+        self.tables: Dict[Tuple[str, str], List[dict]] = {}
+        self.queries = 0
+        self.lock = threading.Lock()
+        # 会话当前库名,首次使用时查询
+        self.database = None
+
+    def __repr__(self):
+        return f"<class 'think_sql.mysql.sql_helper.IndexMetadata' tables={len(self.tables)} queries={self.queries}>"
+
+    def current_database(self) -> str:
+        """会话当前库名 `SELECT DATABASE()`,只查询一次,执行 `USE` 切换库后与配置不同"""
+        if self.database is None:
+            rows = self.db.query("SELECT DATABASE() AS db")
+            self.database = (rows[0]["db"] if rows else None) or self.db.config.database
+        return self.database
+
+    def key(self, table_name: str) -> Tuple[str, str]:
+        """(库名, 表名),没有库名前缀时使用会话当前库"""
+        table_name = table_name.replace("`", "").strip()
+        if "." in table_name:
+            schema, table = table_name.split(".", 1)
+            return schema, table
+        return self.current_database(), table_name
+
+    def preload(self, table_names: Iterable[str]):
+        """一次查询加载多个表的索引信息
+
+        Args:
+            table_names (Iterable[str]): 表名列表,支持 `库名.表名`
+        """
+        with self.lock:
+            keys = [k for k in dict.fromkeys(map(self.key, table_names)) if k not in self.tables]
+            if not keys:
+                return
+            conditions = schema_conditions(keys)
+            sql = f"""SELECT
+                    TABLE_SCHEMA,TABLE_NAME,INDEX_NAME,SEQ_IN_INDEX,COLUMN_NAME,NON_UNIQUE,CARDINALITY
+                FROM information_schema.STATISTICS
+                WHERE {conditions}
+                ORDER BY TABLE_SCHEMA,TABLE_NAME,INDEX_NAME,SEQ_IN_INDEX"""
+            for key in keys:
+                self.tables[key] = []
+            self.queries += 1
+            for row in self.db.query(sql):
+                row = {k.upper(): v for k, v in row.items()}
+                self.tables.setdefault((row["TABLE_SCHEMA"], row["TABLE_NAME"]), []).append(row)
+
+    def rows(self, table_name: str) -> List[dict]:
+        """表的索引信息,每个索引字段一行,按索引名和字段顺序排序"""
+        key = self.key(table_name)
+        if key not in self.tables:
+            self.preload([table_name])
+        return self.tables.get(key, [])
+
+    def indexes(self, table_name: str) -> Dict[str, List[dict]]:
+        """{索引名: [索引字段信息]}"""
+        result: Dict[str, List[dict]] = {}
+        for row in self.rows(table_name):
+            result.setdefault(row["INDEX_NAME"], []).append(row)
+        return result
+
+    def index_exists(self, table_name: str, column: str) -> List[dict]:
+        """包含该字段的索引信息,同 `SHOW INDEX FROM table WHERE column_name = column`"""
+        return [row for row in self.rows(table_name) if row["COLUMN_NAME"] == column]
+
+    def index_exists_multi(self, table_name: str, columns: List[str]) -> List[dict]:
+        """同时包含所有字段的索引,每个索引返回一行"""
+        columns = set(columns)
+        result = []
+        for rows in self.indexes(table_name).values():
+            if len({row["COLUMN_NAME"] for row in rows} & columns) == len(columns):
+                result.append(rows[0])
+        return result
+
+    def column_indexes(self, table_name: str, columns: List[str]) -> List[dict]:
+        """字段的索引及基数"""
+        return [
+            {
+                "TABLE_NAME": row["TABLE_NAME"],
+                "INDEX_NAME": row["INDEX_NAME"],
+                "COLUMN_NAME": row["COLUMN_NAME"],
+                "CARDINALITY": row["CARDINALITY"],
+            }
+            for row in self.rows(table_name)
+            if row["COLUMN_NAME"] in columns
+        ]
+
+
+def table_rows(db: DB, table_name: str) -> int:
+    """表行数,优先使用 information_schema 的估算值
+
+    Args:
+        db (DB): 数据库连接
+        table_name (str): 表名,支持 `库名.表名`
+
+    Returns:
+        int: 行数
     """
-    result = db.query(sql)
-    '''
-    field_list = (
-        db.table(table_name)
-        .where(where_condition)
-        .limit(sample_size)
-        .column(field_name)
-    )
-    distinct_fields = Counter(field_list).most_common(3)
     try:
         if "." in table_name:
             database, table = table_name.split(".")
@@ -143,31 +214,223 @@ def count_column_value(
             AND TABLE_TYPE = "base table";
             """
             table_info = db.query(sql)
-            table_count = int(table_info[0]["TABLE_ROWS"])
+            return int(table_info[0]["TABLE_ROWS"])
+        table_info = db.query(f"SHOW TABLE STATUS WHERE Name='{table_name}';")
+        return int(table_info[0]["Rows"])
+    except Exception:
+        return db.table(table_name).count()
+
+
+def histogram_value(value: Any) -> Any:
+    """解码直方图中的值,字符串类型为 `base64:type254:...`"""
+    if isinstance(value, str) and value.startswith("base64:type"):
+        value = base64.b64decode(value.split(":", 2)[2]).decode("utf-8", "replace")
+    return value
+
+
+def histogram_frequency(histogram: Union[str, dict]) -> Union[Tuple[Any, float], None]:
+    """根据MySQL 8列直方图估算出现频率最高的值
+
+    Args:
+        histogram (Union[str, dict]): information_schema.COLUMN_STATISTICS.HISTOGRAM
+
+    Returns:
+        Union[Tuple[Any, float], None]: (值, 频率), 等高直方图无法确定时返回None
+    """
+    if isinstance(histogram, (str, bytes)):
+        histogram = json.loads(histogram)
+    singleton = histogram.get("histogram-type") == "singleton"
+    top = (None, float(histogram.get("null-values", 0.0)))
+    previous = 0.0
+    for bucket in histogram.get("buckets", []):
+        # singleton: [值, 累计频率], equi-height: [下界, 上界, 累计频率, 不同值数量]
+        frequency = bucket[1] if singleton else bucket[2]
+        share, previous = frequency - previous, frequency
+        if not singleton and bucket[3] > 1:
+            if share >= 0.5:
+                # 桶内有多个值且合计超过一半,无法确定单个值的频率
+                return None
+            continue
+        if share > top[1]:
+            top = (histogram_value(bucket[0]), share)
+    return top
+
+
+def column_statistics(
+    db: DB, table_name: str, fields: List[str], metadata: IndexMetadata = None
+) -> Dict[str, List[Tuple[Any, int]]]:
+    """使用数据库统计信息判断字段重复率,不需要扫描数据
+
+    - 单列唯一索引: 没有重复值
+    - MySQL 8 列直方图(ANALYZE TABLE ... UPDATE HISTOGRAM): 最高频值及频率
+
+    CARDINALITY 只是估算值,也不能给出最高频的值,低基数字段仍由服务端分组计数
+
+    Args:
+        db (DB): 数据库连接
+        table_name (str): 表名
+        fields (List[str]): 字段列表
+        metadata (IndexMetadata, optional): 索引元数据缓存. Defaults to None.
+
+    Returns:
+        Dict[str, List[Tuple[Any, int]]]: 可以确定结果的字段,结果同 `count_column_value`
+    """
+    if not fields or getattr(db.config, "type", "mysql") != "mysql":
+        return {}
+    metadata = metadata or IndexMetadata(db)
+    schema, table = metadata.key(table_name)
+    count = None
+    result = {}
+
+    for rows in metadata.indexes(table_name).values():
+        first = rows[0]
+        field = first["COLUMN_NAME"]
+        if field not in fields or field in result:
+            continue
+        if len(rows) == 1 and not int(first["NON_UNIQUE"]):
+            result[field] = []
+
+    version = ""
+    try:
+        version = db.connector.get_server_info()
+    except Exception:
+        pass
+    rest = [field for field in fields if field not in result]
+    if not rest or not re.match(r"^(8|9|\d{2,})\.", version) or "MariaDB" in version:
+        return result
+    columns = ", ".join(f"'{field}'" for field in rest)
+    sql = f"""SELECT
+            COLUMN_NAME,HISTOGRAM
+        FROM information_schema.COLUMN_STATISTICS
+        WHERE SCHEMA_NAME = '{schema}'
+            AND TABLE_NAME = '{table}'
+            AND COLUMN_NAME IN ({columns})"""
+    for row in db.query(sql):
+        try:
+            top = histogram_frequency(row["HISTOGRAM"])
+        except Exception:
+            continue
+        if top is None:
+            continue
+        value, frequency = top
+        if frequency >= 0.5:
+            if count is None:
+                count = table_rows(db, table_name)
+            result[row["COLUMN_NAME"]] = [(value, int(frequency * count))]
         else:
-            table_info = db.query(f"SHOW TABLE STATUS WHERE Name='{table_name}';")
-            table_count = int(table_info[0]["Rows"])
-    except Exception as e:
-        table_count = db.table(table_name).count()
+            result[row["COLUMN_NAME"]] = []
+    return result
+
+
+def count_column_values(
+    db: DB,
+    table_name: str,
+    fields: Iterable[Union[str, Tuple[str, str]]],
+    sample_size: int,
+    metadata: IndexMetadata = None,
+) -> Dict[Tuple[str, str], List[Tuple[Any, int]]]:
+    """批量取列阈值,一次查询完成多个字段的重复率检查
+
+    没有查询条件的字段优先使用数据库统计信息(`column_statistics`),
+    其余字段在服务端对前 {sample_size} 行分组计数,只返回每个字段出现次数最多的3个值:
 
-    limit_count = min(table_count, sample_size) / 2
-    result = list(filter(lambda x: x[1] >= limit_count, distinct_fields))
+        SELECT * FROM (
+            SELECT 0 AS k, CAST(field AS CHAR) AS v, COUNT(*) AS c
+            FROM (SELECT field FROM table WHERE ... LIMIT {sample_size}) AS s0
+            GROUP BY field ORDER BY c DESC LIMIT 3
+        ) AS t0
+        UNION ALL ...
+
+    阈值为 min(表行数, {sample_size}) / 2
+
+    Args:
+        db (DB): 数据库连接
+        table_name (str): 表名
+        fields (Iterable[Union[str, Tuple[str, str]]]): 字段或 (字段, 查询条件) 列表
+        sample_size (int): 采样行数
+        metadata (IndexMetadata, optional): 索引元数据缓存. Defaults to None.
+
+    Returns:
+        Dict[Tuple[str, str], List[Tuple[Any, int]]]: {(字段, 查询条件): [(值, 出现次数)]},
+            超过阈值的值,采样结果的值为字符串
+    """
+    pairs = list(
+        dict.fromkeys(
+            (field, "1=1") if isinstance(field, str) else (field[0], field[1] or "1=1")
+            for field in fields
+        )
+    )
+    if not pairs:
+        return {}
+
+    plain = [field for field, condition in pairs if condition == "1=1"]
+    statistics = column_statistics(db, table_name, list(dict.fromkeys(plain)), metadata)
+    result = {}
+    queries = []
+    for pair in pairs:
+        field, condition = pair
+        if condition == "1=1" and field in statistics:
+            result[pair] = statistics[field]
+            continue
+        i = len(queries)
+        queries.append(
+            (
+                pair,
+                f"SELECT * FROM ("
+                f"SELECT {i} AS k, CAST({field} AS CHAR) AS v, COUNT(*) AS c "
+                f"FROM (SELECT {field} FROM {table_name} WHERE {condition} LIMIT {sample_size}) AS s{i} "
+                f"GROUP BY {field} ORDER BY c DESC LIMIT 3"
+                f") AS t{i}",
+            )
+        )
+    if not queries:
+        return result
+
+    limit_count = min(table_rows(db, table_name), sample_size) / 2
+    counts: Dict[int, List[Tuple[Any, int]]] = {}
+    for row in db.query(" UNION ALL ".join(sql for _, sql in queries)):
+        counts.setdefault(int(row["k"]), []).append((row["v"], int(row["c"])))
+    for i, (pair, _) in enumerate(queries):
+        distinct_fields = sorted(counts.get(i, []), key=lambda x: x[1], reverse=True)
+        result[pair] = list(filter(lambda x: x[1] >= limit_count, distinct_fields))
     return result
 
 
-def execute_index_query(db: DB, table_name: str, index_columns: str) -> str:
-    index_columns = index_columns
-    index_columns = index_columns.split(",")
-    updated_columns = [f"'{column.strip()}'" for column in index_columns]
-    final_columns = ", ".join(updated_columns)
-    sql = f"""SELECT
-            TABLE_NAME,INDEX_NAME,COLUMN_NAME,cardinality
-        FROM information_schema.STATISTICS
-        WHERE TABLE_SCHEMA = '{db.config.database}'
-            AND TABLE_NAME = '{table_name}'
-            AND COLUMN_NAME IN ({final_columns})"""
+def count_column_value(
+    db: DB,
+    table_name: str,
+    field_name: str,
+    sample_size: int,
+    where_condition: str = "1=1",
+) -> List[Tuple[Any, int]]:
+    """取列阈值
+    <sample_size 取(SELECT COUNT(*) FROM {table_name}) / 2
+    否则 {sample_size} / 2
+
+    Args:
+        db (DB): 数据库连接
+        table_name (str): name of the table
+        field_name (str): name of the field
+        sample_size (int): number of samples
+        where_condition (str): where condition
+
+    Returns:
+        List[Tuple[Any, int]]: count result
+
+    在服务端分组计数,不再把采样数据读取到本地,多个字段请使用 `count_column_values`
+    """
+    pair = (field_name, where_condition or "1=1")
+    return count_column_values(db, table_name, [pair], sample_size)[pair]
+
+
+def execute_index_query(
+    db: DB, table_name: str, index_columns: str, metadata: IndexMetadata = None
+) -> str:
+    metadata = metadata or IndexMetadata(db)
+    index_columns = [column.strip() for column in index_columns.split(",")]
+    final_columns = ", ".join(f"'{column}'" for column in index_columns)
 
-    index_result = db.query(sql)
+    index_result = metadata.column_indexes(table_name, index_columns)
 
     if not index_result:
         log(f"没有检测到 {table_name} 表 字段 {final_columns} 有索引。")
@@ -191,14 +454,11 @@ def execute_index_query(db: DB, table_name: str, index_columns: str) -> str:
     return e_table
 
 
-def check_index_exist(db: DB, table_name: str, index_column: str):
-    show_index_sql = (
-        f"show index from {table_name} where column_name = '{index_column}'"
-    )
-
-    index_result = db.query(show_index_sql)
-
-    return index_result
+def check_index_exist(
+    db: DB, table_name: str, index_column: str, metadata: IndexMetadata = None
+) -> List[dict]:
+    metadata = metadata or IndexMetadata(db)
+    return metadata.index_exists(table_name, index_column)
 
 
 def check_index_exist_multi(
@@ -206,23 +466,13 @@ def check_index_exist_multi(
     table_name: str,
     index_columns: str,
     index_number: int,
+    metadata: IndexMetadata = None,
 ) -> list:
-    index_columns = index_columns
-    index_columns = index_columns.split(",")
-    updated_columns = [f"'{column.strip()}'" for column in index_columns]
-    final_columns = ", ".join(updated_columns)
-    sql = f"""SELECT
-            TABLE_NAME,INDEX_NAME,COLUMN_NAME,cardinality
-        FROM information_schema.STATISTICS
-        WHERE TABLE_SCHEMA = '{db.config.database}'
-            AND TABLE_NAME = '{table_name}'
-            AND COLUMN_NAME IN ({final_columns})
-        GROUP BY INDEX_NAME
-        HAVING COUNT(INDEX_NAME) = {index_number}"""
-
-    index_result = db.query(sql)
-
-    return index_result
+    metadata = metadata or IndexMetadata(db)
+    index_columns = [column.strip() for column in index_columns.split(",")]
+    if len(set(index_columns)) != index_number:
+        return []
+    return metadata.index_exists_multi(table_name, index_columns)
 
 
 def parse_where_condition(sql: str) -> Dict[str, str]:
@@ -308,10 +558,29 @@ def suggestion(where_clauses: Dict[str, str]):
 
 
 def help(
-    db: DB, sql_query: str, tip: str = "输入的SQL语句", sample_size: int = 100000
+    db: DB,
+    sql_query: str,
+    tip: str = "输入的SQL语句",
+    sample_size: int = 100000,
+    echo: bool = True,
+    metadata: IndexMetadata = None,
 ) -> List[str]:
-    global logs
-    logs = []
+    """sql分析,输出执行计划和索引优化建议
+
+    Args:
+        db (DB): 数据库连接
+        sql_query (str): 查询语句
+        tip (str, optional): 标题. Defaults to "输入的SQL语句".
+        sample_size (int, optional): 字段重复率采样行数. Defaults to 100000.
+        echo (bool, optional): 是否打印. Defaults to True.
+        metadata (IndexMetadata, optional): 索引元数据缓存,多次分析可以共享. Defaults to None.
+
+    Returns:
+        List[str]: 分析日志
+    """
+    local.logs = []
+    local.echo = echo
+    metadata = metadata or IndexMetadata(db)
 
     log(f"1) {tip}")
     log("-" * 100)
@@ -326,6 +595,8 @@ def help(
         # 解析SQL，识别出表名和字段名
         parser = Parser(sql_query)
         table_names = parser.tables
+        # 一次查询加载所有表的索引信息
+        metadata.preload(table_names)
         # log(f"表名是: {table_names}")
         table_aliases = parser.tables_aliases
         data = parser.columns_dict
@@ -392,10 +663,7 @@ def help(
 
         for table_name, on_columns in table_field_dict.items():
             for on_column in on_columns:
-                show_index_sql = (
-                    f"show index from {table_name} where column_name = '{on_column}'"
-                )
-                index_result = db.query(show_index_sql)
+                index_result = metadata.index_exists(table_name, on_column)
                 if not index_result:
                     log("join联表查询，on关联字段必须增加索引！")
                     log(
@@ -407,6 +675,7 @@ def help(
                         db,
                         table_name=table_name,
                         index_columns=on_column,
+                        metadata=metadata,
                     )
                     log(index_static)
 
@@ -428,26 +697,32 @@ def help(
         ):
             # 判断表是否有别名，没有别名的情况：
             if not table_aliases_exists and not contains_dot:
+                where_conditions = {}
+                for where_field in where_fields:
+                    where_clause_value = "1=1"
+                    if where_field in where_clauses:
+                        where_clause_value = (
+                            where_clauses[where_field]
+                            .replace("\n", "")
+                            .replace("\r", "")
+                        )
+                        where_clause_value = re.sub(r"\s+", " ", where_clause_value)
+                    where_conditions[where_field] = where_clause_value
+                # 一次查询取所有字段的重复率
+                cardinalities = count_column_values(
+                    db,
+                    table_name,
+                    list(where_conditions.items())
+                    + list(group_by_fields or [])
+                    + list(order_by_fields),
+                    sample_size,
+                    metadata,
+                )
                 if len(where_fields) != 0:
                     for where_field in where_fields:
-                        if where_field in where_clauses:
-                            where_clause_value = (
-                                where_clauses[where_field]
-                                .replace("\n", "")
-                                .replace("\r", "")
-                            )
-                            where_clause_value = re.sub(r"\s+", " ", where_clause_value)
-                            cardinality = count_column_value(
-                                db,
-                                table_name,
-                                where_field,
-                                sample_size,
-                                where_clause_value,
-                            )
-                        else:
-                            cardinality = count_column_value(
-                                db, table_name, where_field, sample_size
-                            )
+                        cardinality = cardinalities[
+                            (where_field, where_conditions[where_field])
+                        ]
                         # log(f"cardinality: {cardinality}")
                         if cardinality:
                             count_value = cardinality[0][1]
@@ -459,9 +734,7 @@ def help(
 
                 if group_by_fields is not None and len(group_by_fields) != 0:
                     for group_field in group_by_fields:
-                        cardinality = count_column_value(
-                            db, table_name, group_field, sample_size
-                        )
+                        cardinality = cardinalities[(group_field, "1=1")]
                         if cardinality:
                             count_value = cardinality[0][1]
                             log(
@@ -472,9 +745,7 @@ def help(
 
                 if len(order_by_fields) != 0:
                     for order_field in order_by_fields:
-                        cardinality = count_column_value(
-                            db, table_name, order_field, sample_size
-                        )
+                        cardinality = cardinalities[(order_field, "1=1")]
                         if cardinality:
                             count_value = cardinality[0][1]
                             log(
@@ -501,6 +772,7 @@ def help(
                         db,
                         table_name=table_name,
                         index_column=index_columns,
+                        metadata=metadata,
                     )
                     if not index_result:
                         if row["key"] is None or (
@@ -520,6 +792,7 @@ def help(
                         db,
                         table_name=table_name,
                         index_columns=index_columns,
+                        metadata=metadata,
                     )
                     log(index_static)
                 else:
@@ -530,6 +803,7 @@ def help(
                         table_name=table_name,
                         index_columns=merged_columns,
                         index_number=len(add_index_fields),
+                        metadata=metadata,
                     )
                     if not index_result_list:
                         if row["key"] is None or (
@@ -549,6 +823,7 @@ def help(
                         db,
                         table_name=table_name,
                         index_columns=merged_columns,
+                        metadata=metadata,
                     )
                     log(index_static)
 
@@ -559,20 +834,32 @@ def help(
                 else:
                     table_real_name = table_name
 
+                def matching_fields(fields: List[str]) -> List[str]:
+                    return [
+                        field.split(".")[-1]
+                        for field in fields or []
+                        if field.startswith(table_real_name + ".")
+                    ]
+
+                where_matching_fields = matching_fields(where_fields)
+                group_matching_fields = matching_fields(group_by_fields)
+                order_matching_fields = matching_fields(order_by_fields)
+                # 一次查询取所有字段的重复率
+                cardinalities = count_column_values(
+                    db,
+                    table_real_name,
+                    where_matching_fields
+                    + group_matching_fields
+                    + order_matching_fields,
+                    sample_size,
+                    metadata,
+                )
+
                 if len(where_fields) != 0:
-                    where_matching_fields = []
-                    for field in where_fields:
-                        if field.startswith(table_real_name + "."):
-                            where_matching_fields.append(field.split(".")[-1])
                     # log(f"where_fields: {where_fields}")
                     # log(f"where_matching_fields: {where_matching_fields}")
                     for where_field in where_matching_fields:
-                        cardinality = count_column_value(
-                            db,
-                            table_real_name,
-                            where_field,
-                            sample_size,
-                        )
+                        cardinality = cardinalities[(where_field, "1=1")]
                         if cardinality:
                             count_value = cardinality[0][1]
                             log(
@@ -582,17 +869,8 @@ def help(
                             add_index_fields.append(where_field)
 
                 if group_by_fields is not None and len(group_by_fields) != 0:
-                    group_matching_fields = []
-                    for field in group_by_fields:
-                        if field.startswith(table_real_name + "."):
-                            group_matching_fields.append(field.split(".")[-1])
                     for group_field in group_matching_fields:
-                        cardinality = count_column_value(
-                            db,
-                            table_real_name,
-                            group_field,
-                            sample_size,
-                        )
+                        cardinality = cardinalities[(group_field, "1=1")]
                         if cardinality:
                             count_value = cardinality[0][1]
                             log(
@@ -602,17 +880,8 @@ def help(
                             add_index_fields.append(group_field)
 
                 if len(order_by_fields) != 0:
-                    order_matching_fields = []
-                    for field in order_by_fields:
-                        if field.startswith(table_real_name + "."):
-                            order_matching_fields.append(field.split(".")[-1])
                     for order_field in order_matching_fields:
-                        cardinality = count_column_value(
-                            db,
-                            table_real_name,
-                            order_field,
-                            sample_size,
-                        )
+                        cardinality = cardinalities[(order_field, "1=1")]
                         if cardinality:
                             count_value = cardinality[0][1]
                             log(
@@ -639,6 +908,7 @@ def help(
                         db,
                         table_name=table_real_name,
                         index_column=index_columns,
+                        metadata=metadata,
                     )
                     if not index_result:
                         if row["key"] is None or (
@@ -658,6 +928,7 @@ def help(
                         db,
                         table_name=table_real_name,
                         index_columns=index_columns,
+                        metadata=metadata,
                     )
                     log(index_static)
                 else:
@@ -668,6 +939,7 @@ def help(
                         table_name=table_real_name,
                         index_columns=merged_columns,
                         index_number=len(add_index_fields),
+                        metadata=metadata,
                     )
                     if not index_result_list:
                         if row["key"] is None or (
@@ -687,9 +959,265 @@ def help(
                         db,
                         table_name=table_real_name,
                         index_columns=merged_columns,
+                        metadata=metadata,
                     )
                     log(index_static)
 
     suggestion(where_clauses)
 
-    return logs
+    return local.logs
+
+
+SLOW_LOG_STATS = re.compile(r"(\w+):\s*([\d.]+)")
+INDEX_ADVICE = re.compile(r"(ALTER TABLE \S+ ADD INDEX \S+?\(.*?\));")
+
+
+def parse_slow_log(path: Union[str, Path]) -> Iterator[dict]:
+    """解析MySQL慢查询日志
+
+    Args:
+        path (Union[str, Path]): 慢查询日志文件路径
+
+    Yields:
+        dict: {sql, query_time, lock_time, rows_sent, rows_examined, database}
+    """
+    entry = None
+    database = ""
+    lines = []
+
+    def flush():
+        sql = "\n".join(lines).strip()
+        if entry is not None and sql:
+            entry["sql"] = sql.rstrip(";").strip()
+            entry["database"] = database
+            return entry
+        return None
+
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("# Query_time:"):
+                item = flush()
+                if item:
+                    yield item
+                stats = {k.lower(): float(v) for k, v in SLOW_LOG_STATS.findall(line)}
+                entry = {
+                    "query_time": stats.get("query_time", 0.0),
+                    "lock_time": stats.get("lock_time", 0.0),
+                    "rows_sent": int(stats.get("rows_sent", 0)),
+                    "rows_examined": int(stats.get("rows_examined", 0)),
+                }
+                lines = []
+                continue
+            if line.startswith("#") or entry is None:
+                continue
+            upper = line.upper()
+            if upper.startswith("USE "):
+                database = line[4:].strip().rstrip(";").strip("`")
+                continue
+            if upper.startswith("SET TIMESTAMP="):
+                continue
+            lines.append(line)
+    item = flush()
+    if item:
+        yield item
+
+
+def load_statements(source: Union[str, Path, Iterable[str]]) -> Iterator[dict]:
+    """读取待分析的sql
+
+    Args:
+        source (Union[str, Path, Iterable[str]]): 慢查询日志路径|sql文件路径|sql语句|sql语句列表
+
+    Yields:
+        dict: {sql, query_time, rows_sent, rows_examined}, sql文件没有耗时,query_time为None
+    """
+    if isinstance(source, (str, Path)) and os.path.isfile(source):
+        with open(source, encoding="utf-8", errors="ignore") as f:
+            head = f.read(65536)
+        if "# Query_time:" in head:
+            yield from parse_slow_log(source)
+            return
+        with open(source, encoding="utf-8", errors="ignore") as f:
+            source = [f.read()]
+    elif isinstance(source, str):
+        source = [source]
+    for text in source:
+        for sql in sqlparse.split(text):
+            sql = sql.strip().rstrip(";").strip()
+            if sql:
+                yield {"sql": sql, "query_time": None, "rows_sent": 0, "rows_examined": 0}
+
+
+def analyze_workload(
+    db: DB,
+    source: Union[str, Path, Iterable[str]],
+    workers: int = 4,
+    sample_size: int = 100000,
+    top: int = 0,
+    analyzer: Callable[[DB, str], List[str]] = None,
+) -> dict:
+    """批量分析sql负载
+
+    解析慢查询日志或sql文件,按指纹去重后使用 `workers` 个独立连接并行执行 `help` 分析
+    (EXPLAIN、索引检查),按 执行次数 × 耗时 排序输出一份报告.
+    sql文件没有耗时信息时按执行次数排序
+
+    Args:
+        db (DB): 数据库连接
+        source (Union[str, Path, Iterable[str]]): 慢查询日志路径|sql文件路径|sql语句|sql语句列表
+        workers (int, optional): 并行连接数,1时使用当前连接串行分析. Defaults to 4.
+        sample_size (int, optional): 字段重复率采样行数,参考 `help`. Defaults to 100000.
+        top (int, optional): 只分析权重最高的前N个指纹,0为全部. Defaults to 0.
+        analyzer (Callable[[DB, str], List[str]], optional): 分析函数,参数为 (连接, sql样本),
+            默认 `help(conn, sql, echo=False)`. Defaults to None.
+
+    Returns:
+        dict: {
+            "statements": [{fingerprint, sql, sample, count, total_time, avg_time, max_time,
+                rows_sent, rows_examined, weight, share, suggestions, logs}],
+            "indexes": [{sql, weight, fingerprints}],
+            "total": {statements, fingerprints, time},
+        }
+    """
+    if analyzer is None:
+        # 索引元数据在所有语句间共享,每个表只查询一次
+        metadata = IndexMetadata(db)
+        analyzer = lambda conn, sql: help(  # noqa: E731
+            conn, sql, "样本SQL", sample_size, echo=False, metadata=metadata
+        )
+
+    groups: Dict[str, dict] = {}
+    total = {"statements": 0, "fingerprints": 0, "time": 0.0}
+    timed = False
+    for item in load_statements(source):
+        total["statements"] += 1
+        fp = fingerprint(item["sql"])
+        group = groups.get(fp)
+        if group is None:
+            group = groups[fp] = {
+                "fingerprint": fp,
+                "sql": normalize(item["sql"]),
+                "sample": item["sql"],
+                "count": 0,
+                "total_time": 0.0,
+                "max_time": 0.0,
+                "rows_sent": 0,
+                "rows_examined": 0,
+            }
+        group["count"] += 1
+        query_time = item["query_time"]
+        if query_time is not None:
+            timed = True
+            group["total_time"] += query_time
+            if query_time > group["max_time"]:
+                # 使用最慢的一次作为分析样本
+                group["max_time"] = query_time
+                group["sample"] = item["sql"]
+        group["rows_sent"] += item["rows_sent"]
+        group["rows_examined"] += item["rows_examined"]
+
+    statements = list(groups.values())
+    for group in statements:
+        group["avg_time"] = group["total_time"] / group["count"]
+        group["weight"] = group["total_time"] if timed else group["count"]
+        total["time"] += group["total_time"]
+    total["fingerprints"] = len(statements)
+    statements.sort(key=lambda g: g["weight"], reverse=True)
+    total_weight = sum(g["weight"] for g in statements) or 1
+    for group in statements:
+        group["share"] = group["weight"] / total_weight
+    if top:
+        statements = statements[:top]
+
+    pool = threading.local()
+    conns = []
+    lock = threading.Lock()
+
+    def connection() -> DB:
+        conn = getattr(pool, "conn", None)
+        if conn is None:
+            conn = pool.conn = db.clone()
+            with lock:
+                conns.append(conn)
+        return conn
+
+    def analyze(group: dict) -> dict:
+        if not group["sample"].lstrip().upper().startswith(("SELECT", "WITH", "(")):
+            group["logs"] = ["sql_helper工具仅支持select语句"]
+        else:
+            try:
+                conn = db if workers <= 1 else connection()
+                group["logs"] = list(analyzer(conn, group["sample"]) or [])
+            except Exception as e:
+                group["logs"] = [f"analyze failed: {e}"]
+        group["suggestions"] = list(
+            dict.fromkeys(m for log in group["logs"] for m in INDEX_ADVICE.findall(str(log)))
+        )
+        return group
+
+    try:
+        if workers <= 1:
+            statements = [analyze(g) for g in statements]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                statements = list(executor.map(analyze, statements))
+    finally:
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    indexes: Dict[str, dict] = {}
+    for group in statements:
+        for sql in group["suggestions"]:
+            index = indexes.setdefault(sql, {"sql": sql, "weight": 0, "fingerprints": []})
+            index["weight"] += group["weight"]
+            index["fingerprints"].append(group["fingerprint"])
+
+    return {
+        "statements": statements,
+        "indexes": sorted(indexes.values(), key=lambda i: i["weight"], reverse=True),
+        "total": total,
+    }
+
+
+def workload_report(result: dict, width: int = 80) -> str:
+    """格式化 `analyze_workload` 结果
+
+    Args:
+        result (dict): analyze_workload 返回结果
+        width (int, optional): sql显示宽度. Defaults to 80.
+
+    Returns:
+        str: 报告
+    """
+    total = result["total"]
+    rows = [
+        [
+            i + 1,
+            g["fingerprint"],
+            g["count"],
+            round(g["total_time"], 3),
+            round(g["avg_time"], 3),
+            f"{g['share'] * 100:.1f}%",
+            textwrap.shorten(g["sql"], width),
+            "\n".join(g["suggestions"]),
+        ]
+        for i, g in enumerate(result["statements"])
+    ]
+    headers = ["rank", "fingerprint", "count", "total(s)", "avg(s)", "share", "sql", "suggestions"]
+    lines = [
+        f"statements: {total['statements']}, fingerprints: {total['fingerprints']}, time: {total['time']:.3f}s",
+        tabulate(rows, headers=headers, tablefmt="grid"),
+    ]
+    if result["indexes"]:
+        lines.append(
+            tabulate(
+                [[round(i["weight"], 3), len(i["fingerprints"]), i["sql"]] for i in result["indexes"]],
+                headers=["weight", "statements", "index"],
+                tablefmt="grid",
+            )
+        )
+    return "\n".join(lines)
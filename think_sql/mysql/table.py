@@ -3,16 +3,19 @@
 __author__ = "hbh112233abc@163.com"
 
 import re
+import queue
 import itertools
+import threading
 from hashlib import md5
 from copy import deepcopy
 from decimal import Decimal
-from typing import Any, Union, Tuple, List
+from typing import Any, Callable, Iterator, Union, Tuple, List
 
 from pymysql.cursors import Cursor
 
 from think_sql.tool.util import to_number
 from think_sql.tool.base import Database, TableBase
+from think_sql.tool.profile import QueryTimer
 from think_sql.tool.interface import TableInterface
 from think_sql.mysql.util import parse_key, parse_where
 
@@ -21,6 +24,7 @@ class Table(TableBase, TableInterface):
     def __init__(self, db: Database, table_name: str):
         super().__init__(db, table_name)
 
+        self.last_cursor = self.db_cursor
         self.columns = {}
         self.pk = {}
         self.get_fields()
@@ -60,7 +64,13 @@ class Table(TableBase, TableInterface):
         sql = f"SELECT {select_fields} FROM {self.table_name} {join} WHERE {self.__condition_str_fix()}{self.group_by}{self.order_by}{limit}"
         params = self.condition_val + self.limit_dict.get("params", ())
 
+        if self.db.uow is not None:
+            self.db.uow.before_read(sql)
+        timer = QueryTimer() if self.db.listeners else None
+        timer and timer.mark()
         self.db_cursor.execute(sql, params)
+        if timer:
+            self.emit_query(timer, "cursor", sql, params)
         return self.db_cursor
 
     def get_fields(self) -> tuple:
@@ -91,7 +101,7 @@ class Table(TableBase, TableInterface):
 
     def get_last_sql(self) -> str:
         """获取最后执行的sql"""
-        return self.db_cursor._executed
+        return self.last_cursor._executed
 
     def get_lastid(self) -> int:
         """获取最后作用的id"""
@@ -134,10 +144,15 @@ class Table(TableBase, TableInterface):
         Returns:
             tuple: 查询结果
         """
+        reader = self.db
+        timer = QueryTimer() if self.db.listeners else None
         try:
             if self._fetch_sql:
                 return self.build_sql(sql, params)
 
+            if self.db.uow is not None:
+                self.db.uow.before_read(sql)
+
             # 缓存操作
             if self.use_cache:
                 if not self.cache_key:
@@ -150,18 +165,26 @@ class Table(TableBase, TableInterface):
                 if result:
                     return result
 
-            self.db_cursor.execute(sql, params)
-            result = self.db_cursor.fetchall()
+            reader = self.db.reader()
+            cursor = self.db_cursor if reader is self.db else reader.cursor
+            timer and timer.mark()
+            cursor.execute(sql, params)
+            timer and timer.mark()
+            self.last_cursor = cursor
+            result = cursor.fetchall()
+            if timer:
+                self.emit_query(timer, "query", sql, params, result=result, db=reader)
             self.set_cache(result)
             self.__log_sql()
             return result
         except Exception as e:
             self.log.error(sql)
             self.log.error(params)
+            if timer:
+                self.emit_query(timer, "query", sql, params, db=reader, error=e)
             raise e
         finally:
-            if self.db.auto_commit:
-                self.connector.commit()
+            reader.commit_read()
             self.init()
 
     def execute(self, sql: str, params: list = []) -> int:
@@ -174,25 +197,43 @@ class Table(TableBase, TableInterface):
         Returns:
             int: 影响行数
         """
+        timer = QueryTimer() if self.db.listeners else None
         try:
             if self._fetch_sql:
                 return self.build_sql(sql, params)
 
-            self.db_cursor.execute(sql, params)
-            self.connector.commit()
+            if self.db.uow is not None:
+                self.db.uow.flush()
+
+            timer and timer.mark()
+            self.db.with_retry(
+                lambda: self.db_cursor.execute(sql, params), self.table_name
+            )
+            self.last_cursor = self.db_cursor
+            self.db.commit_write()
+            # 提交耗时计入执行阶段
+            timer and timer.mark()
             result = self.db_cursor.rowcount
+            if timer:
+                self.emit_query(timer, "execute", sql, params, result)
             self.__log_sql()
             return result
         except Exception as e:
             self.log.error(self.build_sql(sql, params))
+            if timer:
+                self.emit_query(timer, "execute", sql, params, error=e)
             raise e
         finally:
             self.init()
 
+    def __deferrable(self) -> bool:
+        """写操作是否交给事务的 unit of work 合并执行"""
+        return self.db.uow is not None and not self._fetch_sql
+
     def __log_sql(self):
         """记录sql日志"""
         if self._debug:
-            self.log.info(f"[sql]({self.connector.db}) {self.db_cursor._executed}")
+            self.log.info(f"[sql]({self.connector.db}) {self.last_cursor._executed}")
 
     def where(
         self, field: Union[str, list, tuple], symbol: str = "", value: Any = None
@@ -524,7 +565,7 @@ class Table(TableBase, TableInterface):
             get_insert_id (bool): 是否获取插入id
 
         Returns:
-            int: 影响行数或插入id
+            int: 影响行数或插入id,事务开启 unit_of_work 时返回Future
         """
 
         if isinstance(data, dict):
@@ -542,6 +583,11 @@ class Table(TableBase, TableInterface):
             raise TypeError("data must be dict or List[dict]")
 
         inputs = inputs[:-1]
+        if self.__deferrable() and not replace and not get_insert_id:
+            rows = 1 if isinstance(data, dict) else len(data)
+            self.init()
+            return self.db.uow.insert(self.table_name, keys, inputs, params, rows)
+
         action = "REPLACE" if replace else "INSERT"
         sql = f"{action} INTO {self.table_name} ({keys}) VALUES {inputs};"
         result = self.execute(sql, params)
@@ -549,41 +595,87 @@ class Table(TableBase, TableInterface):
             return result
         return self.get_lastid()
 
-    def update(self, data: dict, all_record: bool = False) -> int:
+    def update(
+        self,
+        data: dict,
+        all_record: bool = False,
+        chunk_size: int = 0,
+        sleep: float = 0,
+        max_replica_lag: float = None,
+        progress: Callable[[dict], None] = None,
+    ) -> int:
         """更新数据
 
+        设置 `chunk_size` 时按主键范围分批更新,每批提交,事务中不分批
+
         Args:
             data (dict): 更新数据内容
             all_record (bool): 是否更新全部数据,默认False
+            chunk_size (int): 分批执行每批行数,0不分批. Defaults to 0.
+            sleep (float): 分批执行批次间隔秒数. Defaults to 0.
+            max_replica_lag (float): 分批执行时允许的最大从库复制延迟(秒). Defaults to None.
+            progress (Callable[[dict], None]): 分批执行进度回调,参考 `run_chunks`. Defaults to None.
 
         Returns:
-            int: 影响行数
+            int: 影响行数,事务开启 unit_of_work 时返回Future
         """
         if not all_record and self.condition_str == "1=1":
             raise ValueError("please set `where` conditions!")
+        if chunk_size > 0 and self.db.auto_commit and not self._fetch_sql:
+            step = self.range_chunks(lambda: self.update(data, True), chunk_size)
+            return self.run_chunks(step, sleep, max_replica_lag, progress)
         inputs = ",".join(map(lambda k: k + "=%s", data.keys()))
         params = tuple(data.values()) + self.condition_val
         sql = (
             f"UPDATE {self.table_name} SET {inputs} WHERE {self.__condition_str_fix()};"
         )
+        if self.__deferrable():
+            self.init()
+            return self.db.uow.statement(self.table_name, sql, params)
         result = self.execute(sql, params)
         return result
 
-    def delete(self, all_record: bool = False) -> int:
+    def delete(
+        self,
+        all_record: bool = False,
+        chunk_size: int = 0,
+        sleep: float = 0,
+        max_replica_lag: float = None,
+        progress: Callable[[dict], None] = None,
+    ) -> int:
         """删除数据
 
+        设置 `chunk_size` 时使用 `DELETE ... LIMIT` 分批删除直到没有匹配数据,每批提交,事务中不分批
+
         Args:
             all_record (bool): 是否更新全部数据,默认False
+            chunk_size (int): 分批执行每批行数,0不分批. Defaults to 0.
+            sleep (float): 分批执行批次间隔秒数. Defaults to 0.
+            max_replica_lag (float): 分批执行时允许的最大从库复制延迟(秒). Defaults to None.
+            progress (Callable[[dict], None]): 分批执行进度回调,参考 `run_chunks`. Defaults to None.
 
         Raises:
             Exception: please set delete conditions!
 
         Returns:
-            int: 影响行数
+            int: 影响行数,事务开启 unit_of_work 时返回Future
         """
         if not all_record and self.condition_str == "1=1":
             raise ValueError("please set `where` conditions!")
         sql = f"DELETE FROM {self.table_name} WHERE {self.__condition_str_fix()};"
+        if chunk_size > 0 and self.db.auto_commit and not self._fetch_sql:
+            sql = f"{sql[:-1]} LIMIT {int(chunk_size)};"
+            params = self.condition_val
+
+            def step() -> Tuple[int, bool]:
+                count = self.execute(sql, params)
+                return count, count < chunk_size
+
+            return self.run_chunks(step, sleep, max_replica_lag, progress)
+        if self.__deferrable():
+            params = self.condition_val
+            self.init()
+            return self.db.uow.statement(self.table_name, sql, params)
         result = self.execute(sql, self.condition_val)
         return result
 
@@ -620,6 +712,42 @@ class Table(TableBase, TableInterface):
         step = to_number(step, "step")
         return self.inc(field, step=(0 - step))
 
+    def batch_inc(
+        self, field: str, key: str, steps: dict, upsert: bool = False
+    ) -> int:
+        """批量递增,一条sql完成多行不同步长的递增
+
+        Args:
+            field (str): 字段名
+            key (str): 行标识字段名,一般是主键
+            steps (dict): {key值: 步长}
+            upsert (bool, optional): 是否使用 `INSERT ... ON DUPLICATE KEY UPDATE`,
+                行不存在时插入 {key: key值, field: 步长}. Defaults to False.
+
+        Returns:
+            int: 影响行数
+        """
+        steps = {k: to_number(v, "step") for k, v in steps.items() if v}
+        if not steps:
+            self.init()
+            return 0
+        if upsert:
+            inputs = ",".join(["(%s,%s)"] * len(steps))
+            params = tuple(p for item in steps.items() for p in item)
+            sql = (
+                f"INSERT INTO {self.table_name} (`{key}`,`{field}`) VALUES {inputs} "
+                f"ON DUPLICATE KEY UPDATE `{field}` = `{field}` + VALUES(`{field}`)"
+            )
+            return self.execute(sql, params)
+        cases = " ".join(["WHEN %s THEN %s"] * len(steps))
+        inputs = ",".join(["%s"] * len(steps))
+        params = tuple(p for item in steps.items() for p in item) + tuple(steps.keys())
+        sql = (
+            f"UPDATE {self.table_name} SET `{field}` = `{field}` + CASE `{key}` {cases} END "
+            f"WHERE `{key}` IN ({inputs})"
+        )
+        return self.execute(sql, params)
+
     def max(self, field: str) -> Union[int, float]:
         """最大值
 
@@ -811,10 +939,200 @@ class Table(TableBase, TableInterface):
                 raise ValueError(f"key:{key} not in data item")
             self.init()
             sql.append(self.where(key, row[key]).fetch_sql().update(row))
+        if self.db.uow is not None:
+            self.db.uow.flush()
+        def run(chunk: List[str]) -> int:
+            count = 0
+            for s in chunk:
+                self.db_cursor.execute(s)
+                count += self.get_rowcount()
+            return count
+
         result = 0
         for x in range(0, len(sql), 100):
-            for s in sql[x : x + 100]:
-                self.db_cursor.execute(s)
-                result += self.get_rowcount()
-            self.connector.commit()
+            chunk = sql[x : x + 100]
+            result += self.db.with_retry(lambda: run(chunk), self.table_name)
+            self.db.commit_write()
         return result
+
+    def parallel_scan(
+        self,
+        workers: int = 8,
+        split_by: str = "",
+        batch_size: int = 1000,
+        ordered: bool = False,
+        batch: bool = False,
+        consistent_snapshot: bool = False,
+    ) -> Iterator[Union[dict, List[dict]]]:
+        """并行分段扫描
+
+        按 `split_by` 字段将当前查询切分为多个区间,每个区间使用独立连接流式读取,
+        结果合并为一个迭代器输出,保留已设置的 `where` 条件.
+        提前结束迭代时,未读完的工作连接直接断开,不再读取剩余数据
+
+        Args:
+            workers (int, optional): 并行连接数. Defaults to 8.
+            split_by (str, optional): 切分字段,默认主键. Defaults to "".
+            batch_size (int, optional): 每次fetch的行数. Defaults to 1000.
+            ordered (bool, optional): 是否按切分字段顺序输出. Defaults to False.
+            batch (bool, optional): 是否按批次输出List[dict]. Defaults to False.
+            consistent_snapshot (bool, optional): 各连接读取前执行
+                `START TRANSACTION WITH CONSISTENT SNAPSHOT`. Defaults to False.
+
+        Raises:
+            ValueError: 未设置切分字段或包含limit/group条件
+
+        Returns:
+            Iterator[Union[dict, List[dict]]]: 数据行(或批次)迭代器,
+                `fetch_sql`=True 时返回各区间sql列表
+        """
+        if not split_by:
+            split_by = self.pk.get("Field", "") if self.pk else ""
+        if not split_by:
+            raise ValueError("please set `split_by`")
+        if self.limit_dict or self.group_by:
+            raise ValueError("parallel_scan not support `limit` or `group`")
+
+        key = parse_key(split_by)
+        select_fields = ",".join(self.select_fields)
+        join = " ".join(self.join_list)
+        where = self.__condition_str_fix()
+        params = self.condition_val
+        fetch_sql = self._fetch_sql
+        base_sql = f"SELECT {select_fields} FROM {self.table_name} {join} WHERE ({where})"
+        try:
+            ranges = self.__split_ranges(key, max(int(workers), 1), join, where, params)
+        finally:
+            self.init()
+
+        order = f" ORDER BY {key} ASC" if ordered else ""
+        tasks = []
+        for low, high, last in ranges:
+            symbol = "<=" if last else "<"
+            sql = f"{base_sql} AND {key} >= %s AND {key} {symbol} %s{order}"
+            tasks.append((sql, params + (low, high)))
+
+        if fetch_sql:
+            return [self.build_sql(sql, p) for sql, p in tasks]
+        return self.__scan(tasks, batch_size, ordered, batch, consistent_snapshot)
+
+    def __split_ranges(
+        self, key: str, workers: int, join: str, where: str, params: tuple
+    ) -> List[Tuple[Any, Any, bool]]:
+        """计算分段区间
+
+        数值字段按 MIN/MAX 等分,其他字段按 OFFSET 采样取分割点
+
+        Returns:
+            List[Tuple[Any, Any, bool]]: [(下界, 上界, 是否包含上界)]
+        """
+        sql = f"SELECT MIN({key}) AS lo, MAX({key}) AS hi, COUNT(1) AS cnt FROM {self.table_name} {join} WHERE {where}"
+        self.db_cursor.execute(sql, params)
+        stat = self.db_cursor.fetchall()[0]
+        low, high, count = stat["lo"], stat["hi"], stat["cnt"]
+        if low is None:
+            return []
+
+        if isinstance(low, int) and isinstance(high, int):
+            step = max((high - low + 1 + workers - 1) // workers, 1)
+            points = list(range(low, high + 1, step))[1:]
+        else:
+            points = []
+            sql = f"SELECT {key} AS point FROM {self.table_name} {join} WHERE {where} ORDER BY {key} LIMIT 1 OFFSET %s"
+            for i in range(1, workers):
+                self.db_cursor.execute(sql, params + (count * i // workers,))
+                rows = self.db_cursor.fetchall()
+                if rows and rows[0]["point"] not in points:
+                    points.append(rows[0]["point"])
+
+        bounds = [low] + [p for p in points if low < p < high] + [high]
+        ranges = [(bounds[i], bounds[i + 1], False) for i in range(len(bounds) - 1)]
+        if not ranges:
+            return [(low, high, True)]
+        ranges[-1] = (ranges[-1][0], ranges[-1][1], True)
+        return ranges
+
+    def __scan(
+        self,
+        tasks: List[Tuple[str, tuple]],
+        batch_size: int,
+        ordered: bool,
+        batch: bool,
+        consistent_snapshot: bool,
+    ) -> Iterator[Union[dict, List[dict]]]:
+        """启动工作线程分段读取,合并输出"""
+        done = object()
+        stop = threading.Event()
+        if ordered:
+            queues = [queue.Queue(maxsize=4) for _ in tasks]
+        else:
+            shared = queue.Queue(maxsize=4 * max(len(tasks), 1))
+            queues = [shared] * len(tasks)
+
+        def put(q: queue.Queue, item: Any):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def worker(q: queue.Queue, sql: str, params: tuple):
+            db = None
+            finished = False
+            try:
+                db = self.db.__class__(self.db.config, self.db.params)
+                if consistent_snapshot:
+                    db.cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+                db.cursor.execute(sql, params)
+                while not stop.is_set():
+                    rows = db.cursor.fetchmany(batch_size)
+                    if not rows:
+                        finished = True
+                        break
+                    put(q, rows)
+            except Exception as e:
+                put(q, e)
+            finally:
+                if db is not None:
+                    try:
+                        force_close = getattr(db.connector, "_force_close", None)
+                        if not finished and force_close:
+                            # 关闭流式游标会读完区间内剩余的行,提前结束时直接断开连接,服务端随之终止查询
+                            force_close()
+                        else:
+                            db.close()
+                    except Exception as e:
+                        self.log.warning(e)
+                put(q, done)
+
+        threads = [
+            threading.Thread(target=worker, args=(q, sql, params), daemon=True)
+            for q, (sql, params) in zip(queues, tasks)
+        ]
+        for t in threads:
+            t.start()
+
+        def consume(q: queue.Queue, count: int):
+            while count > 0:
+                item = q.get()
+                if item is done:
+                    count -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                if batch:
+                    yield item
+                else:
+                    yield from item
+
+        try:
+            if ordered:
+                for q in queues:
+                    yield from consume(q, 1)
+            elif queues:
+                yield from consume(queues[0], len(queues))
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
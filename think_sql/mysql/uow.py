@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+from concurrent.futures import Future
+from typing import Any, List, Tuple
+
+from pymysql.constants import CLIENT
+
+
+class Pending(Future):
+    """待执行写操作的结果,未执行时调用 `result()` 会立即执行全部待写入操作"""
+
+    def __init__(self, uow: "UnitOfWork"):
+        super().__init__()
+        self.uow = uow
+
+    def result(self, timeout=None):
+        if not self.done():
+            self.uow.flush()
+        return super().result(timeout)
+
+
+class Batch:
+    """同一张表、同一语句形态的待执行写操作"""
+
+    def __init__(self, table: str, shape: tuple):
+        self.table = table
+        self.shape = shape
+        self.items: List[Tuple[Any, Future]] = []
+
+
+class UnitOfWork:
+    """事务内写操作合并(unit of work)
+
+    事务内的 insert/update/delete 不立即执行,按表和语句形态缓存:
+    - 相同字段的 INSERT 合并为一条多行 INSERT
+    - 相同模板的 UPDATE/DELETE 在连接开启 `CLIENT.MULTI_STATEMENTS` 时一次发送,否则依次执行
+
+    在提交前、读取相关表前、或缓存条数达到 `flush_size` 时执行,
+    每次调用返回 Future,通过 `result()` 获取该次调用的影响行数(未执行时会先执行)
+    """
+
+    def __init__(self, db, flush_size: int = 1000):
+        self.db = db
+        self.flush_size = flush_size
+        self.batches: List[Batch] = []
+        self.size = 0
+
+    def insert(
+        self, table: str, keys: str, inputs: str, params: tuple, rows: int
+    ) -> Future:
+        """缓存INSERT
+
+        Args:
+            table (str): 表名
+            keys (str): 字段列表
+            inputs (str): VALUES 占位符,ex: `(%s,%s),(%s,%s)`
+            params (tuple): 绑定参数
+            rows (int): 行数
+
+        Returns:
+            Future: 影响行数
+        """
+        return self.add(table, ("INSERT", keys), (inputs, params, rows))
+
+    def statement(self, table: str, sql: str, params: tuple) -> Future:
+        """缓存UPDATE/DELETE
+
+        Args:
+            table (str): 表名
+            sql (str): sql模板
+            params (tuple): 绑定参数
+
+        Returns:
+            Future: 影响行数
+        """
+        return self.add(table, ("SQL", sql), params)
+
+    def add(self, table: str, shape: tuple, item: Any) -> Future:
+        """加入待执行队列
+
+        只并入最后一个批次(同表同形态),中间有其他表的写操作时新建批次,
+        保证跨表的执行顺序(ex: 先删子表再删父表的外键约束)
+        """
+        future = Pending(self)
+        batch = self.batches[-1] if self.batches else None
+        if batch is not None and (batch.table != table or batch.shape != shape):
+            batch = None
+        if batch is None:
+            batch = Batch(table, shape)
+            self.batches.append(batch)
+        batch.items.append((item, future))
+        self.size += 1
+        if self.size >= self.flush_size:
+            self.flush()
+        return future
+
+    def before_read(self, sql: str):
+        """读取前检查,涉及待写入的表时先执行"""
+        if any(b.table in sql for b in self.batches):
+            self.flush()
+
+    def flush(self):
+        """执行全部待写入操作"""
+        batches, self.batches, self.size = self.batches, [], 0
+        for i, batch in enumerate(batches):
+            try:
+                counts = self.execute(batch)
+            except Exception as e:
+                for rest in batches[i:]:
+                    for _, future in rest.items:
+                        if not future.done():
+                            future.set_exception(e)
+                raise e
+            for (_, future), count in zip(batch.items, counts):
+                future.set_result(count)
+
+    def fail(self, err: Exception):
+        """事务失败,未执行的操作全部置为异常"""
+        batches, self.batches, self.size = self.batches, [], 0
+        for batch in batches:
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(err)
+
+    def execute(self, batch: Batch) -> List[int]:
+        """执行一个批次
+
+        Returns:
+            List[int]: 每次调用对应的影响行数
+        """
+        cursor = self.db.cursor
+        if batch.shape[0] == "INSERT":
+            keys = batch.shape[1]
+            inputs = ",".join(item[0] for item, _ in batch.items)
+            params = tuple(p for item, _ in batch.items for p in item[1])
+            sql = f"INSERT INTO {batch.table} ({keys}) VALUES {inputs};"
+            cursor.execute(sql, params)
+            self.log(cursor)
+            return [item[2] for item, _ in batch.items]
+
+        sql = batch.shape[1]
+        counts = []
+        if (
+            len(batch.items) > 1
+            and self.db.connector.client_flag & CLIENT.MULTI_STATEMENTS
+        ):
+            cursor.execute(
+                ";".join(
+                    cursor.mogrify(sql, params).rstrip("; ")
+                    for params, _ in batch.items
+                )
+            )
+            counts.append(cursor.rowcount)
+            while cursor.nextset():
+                counts.append(cursor.rowcount)
+            self.log(cursor)
+            return counts
+
+        for params, _ in batch.items:
+            cursor.execute(sql, params)
+            counts.append(cursor.rowcount)
+            self.log(cursor)
+        return counts
+
+    def log(self, cursor):
+        """记录sql日志"""
+        if self.db._debug:
+            self.db.log.info(f"[sql]({self.db.database}) {cursor._executed}")
@@ -0,0 +1,2 @@
+from think_sql.sqlite.db import DB
+from think_sql.sqlite.table import Table
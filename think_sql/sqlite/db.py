@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import sqlite3
+from typing import Any, List, Union
+
+from think_sql import metrics
+from think_sql.tool.util import DBConfig
+from think_sql.tool.plan import Plan, parse_sqlite
+from think_sql.mysql.db import DB as MysqlDB
+from think_sql.sqlite.table import Table
+from think_sql.sqlite.util import Connection
+
+
+class DB(MysqlDB):
+    """sqlite数据库连接
+
+    进程内数据库,没有网络和服务端开销,用于测试和评估类库本身的性能.
+    `type` 为 `memory` 或 `database` 为空/`:memory:` 时使用内存数据库,
+    同名内存数据库在进程内共享(`clone()`、后台写入等使用的新连接可以读取相同数据),
+    否则 `database` 为数据库文件路径
+
+    Example:
+        db = think_sql.db({"type": "memory", "database": "test"})
+        db = think_sql.db({"type": "sqlite", "database": "/tmp/test.db"})
+    """
+
+    # 5: SQLITE_BUSY, 6: SQLITE_LOCKED
+    RETRY_ERRORS = (5, 6)
+
+    def __init__(
+        self,
+        config: Union[str, dict, DBConfig],
+        params={},
+    ):
+        """实例化数据库连接
+
+        Args:
+            config: str|dict|DBConfig 数据库连接配置
+            params: dict `sqlite3.connect` 参数
+        """
+        super().__init__(config, params)
+
+    def __repr__(self):
+        return f"<class 'think_sql.sqlite.DB' database={self.database}>"
+
+    def is_memory(self) -> bool:
+        """是否内存数据库"""
+        return self.config.type == "memory" or self.database in ("", ":memory:")
+
+    def connect(self):
+        """连接数据库"""
+        params = {"check_same_thread": False}
+        params.update(self.params)
+        if self.is_memory():
+            name = self.database if self.database not in ("", ":memory:") else "think_sql"
+            raw = sqlite3.connect(f"file:{name}?mode=memory&cache=shared", uri=True, **params)
+        else:
+            raw = sqlite3.connect(self.database, **params)
+        self.connector = Connection(raw, self.database)
+        self.cursor = self.connector.cursor()
+        if self._read_only:
+            self.set_read_only(True)
+
+    def connection_id(self) -> int:
+        """连接id"""
+        return id(self.connector)
+
+    def error_code(self, err: Exception) -> Any:
+        """获取异常的错误码(sqlite扩展错误码的主错误码)"""
+        code = getattr(err, "sqlite_errorcode", None)
+        if code is None:
+            return super().error_code(err)
+        return code & 0xFF
+
+    def analyze_slow(self, sql: str, params: tuple = ()) -> List[str]:
+        """使用 `EXPLAIN QUERY PLAN` 分析慢sql
+
+        Returns:
+            List[str]: 执行计划
+        """
+        if not self.check_connected():
+            self.connect()
+        cursor = self.connector.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or None)
+            return [row["detail"] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def explain(self, sql: str, params: tuple = (), analyze: bool = False) -> Plan:
+        """使用 `EXPLAIN QUERY PLAN` 获取结构化执行计划,sqlite不提供代价和行数估算
+
+        Raises:
+            ValueError: sqlite不支持 analyze
+
+        Returns:
+            Plan: 执行计划
+        """
+        if analyze:
+            raise ValueError("sqlite does not support EXPLAIN ANALYZE")
+        if not self.check_connected():
+            self.connect()
+        cursor = self.connector.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or None)
+            return parse_sqlite(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def set_read_only(self, flag: bool = True):
+        """设置只读会话"""
+        self.cursor.execute(f"PRAGMA query_only = {int(flag)}")
+
+    def query(self, sql: str, params: tuple = ()) -> List[dict]:
+        result = []
+        try:
+            self.exec(sql, params)
+            result = self.cursor.fetchall()
+        except Exception as e:
+            self.log.warning(sql)
+            self.log.exception(e)
+        return result
+
+    def get_tables(self) -> List[str]:
+        """获取数据库中的所有表名
+
+        Returns:
+            List[str]: 表名列表
+        """
+        sql = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        return [row["name"] for row in self.query(sql)]
+
+    def table(self, table_name="") -> Table:
+        """生成对应数据表
+
+        Args:
+            table_name (str): 表名
+
+        Returns:
+            Table: 数据表对象,可以执行链式操作
+        """
+        start = time.perf_counter() if metrics.REGISTRY.enabled else 0
+        with self.span("connection.checkout", **{"db.sql.table": table_name}):
+            if not self.check_connected():
+                self.connect()
+                metrics.inc("think_sql_reconnects_total", database=self.database)
+        if start:
+            metrics.observe(
+                "think_sql_checkout_wait_seconds",
+                time.perf_counter() - start,
+                database=self.database,
+            )
+        return Table(self, table_name)
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+from think_sql.tool.util import to_number
+from think_sql.mysql.table import Table as MysqlTable
+
+
+class Table(MysqlTable):
+    """sqlite数据表
+
+    复用mysql的链式操作和sql构建,由游标转换占位符和不兼容的语法
+    """
+
+    def get_fields(self) -> tuple:
+        """获取数据表字段名列表
+
+        Returns:
+            tuple: 字段名列表
+        """
+        if self.columns:
+            return self.columns.keys()
+
+        self.db_cursor.execute(f"PRAGMA table_info(`{self.table_name}`)")
+        data = self.db_cursor.fetchall()
+        pks = [d for d in data if d["pk"]]
+        for d in data:
+            primary = bool(d["pk"])
+            # INTEGER PRIMARY KEY 为 rowid 别名,自增
+            autoinc = primary and len(pks) == 1 and d["type"].upper() == "INTEGER"
+            self.columns[d["name"]] = {
+                "name": d["name"],
+                "type": d["type"],
+                "notnull": not d["notnull"],
+                "default": d["dflt_value"],
+                "primary": primary,
+                "autoinc": autoinc,
+            }
+            if primary:
+                self.pk = {
+                    "Field": d["name"],
+                    "Type": d["type"],
+                    "Null": "NO",
+                    "Key": "PRI",
+                    "Default": d["dflt_value"],
+                    "Extra": "auto_increment" if autoinc else "",
+                }
+        return tuple(d["name"] for d in data)
+
+    def batch_inc(self, field: str, key: str, steps: dict, upsert: bool = False) -> int:
+        """批量递增,参考 mysql `Table.batch_inc`
+
+        upsert 使用 `INSERT ... ON CONFLICT DO UPDATE`,`key` 需要有唯一索引
+        """
+        if not upsert:
+            return super().batch_inc(field, key, steps)
+        steps = {k: to_number(v, "step") for k, v in steps.items() if v}
+        if not steps:
+            self.init()
+            return 0
+        inputs = ",".join(["(%s,%s)"] * len(steps))
+        params = tuple(p for item in steps.items() for p in item)
+        sql = (
+            f"INSERT INTO {self.table_name} (`{key}`,`{field}`) VALUES {inputs} "
+            f"ON CONFLICT(`{key}`) DO UPDATE SET `{field}` = `{field}` + excluded.`{field}`"
+        )
+        return self.execute(sql, params)
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import re
+import sqlite3
+import datetime
+from decimal import Decimal
+from typing import Any, List, Union
+
+PLACEHOLDER = re.compile(r"%%|%s|%\((\w+)\)s")
+DELETE_LIMIT = re.compile(
+    r"^\s*DELETE\s+FROM\s+(\S+)\s+WHERE\s+(.*?)\s+LIMIT\s+(\d+)\s*;?\s*$", re.I | re.S
+)
+SELECT_INTO = re.compile(r"^\s*SELECT\s+(.*?)\s+INTO\s+(\S+)\s+FROM\s+(.*)$", re.I | re.S)
+
+
+def to_param(value: Any) -> Any:
+    """转换为sqlite支持的参数类型"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def literal(value: Any) -> str:
+    """参数转为sql字面量"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (list, tuple, set)):
+        return "(" + ",".join(literal(v) for v in value) + ")"
+    value = to_param(value)
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (bytes, bytearray)):
+        return f"X'{bytes(value).hex()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def translate(sql: str) -> str:
+    """mysql语法转换为sqlite语法
+
+    - `DELETE ... LIMIT n` 转为 rowid 子查询
+    - `SELECT ... INTO new_table FROM ...` 转为 `CREATE TABLE ... AS SELECT`
+    """
+    match = DELETE_LIMIT.match(sql)
+    if match:
+        table, where, limit = match.groups()
+        return f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT {limit})"
+    match = SELECT_INTO.match(sql)
+    if match:
+        fields, table, rest = match.groups()
+        return f"CREATE TABLE {table} AS SELECT {fields} FROM {rest}"
+    return sql
+
+
+def format_sql(query: str, args: Union[tuple, list, dict, None] = None, bind: bool = True):
+    """pymysql风格(`%s`/`%(name)s`)的sql转换为sqlite
+
+    参数为None时不处理占位符,与pymysql一致
+
+    Args:
+        query (str): sql语句
+        args (Union[tuple, list, dict, None], optional): 绑定参数. Defaults to None.
+        bind (bool, optional): True返回 (sql, 参数) 使用 `?` 绑定,False返回填充参数后的sql. Defaults to True.
+    """
+    if args is None:
+        return (query, ()) if bind else query
+    params = []
+    values = iter(args) if not isinstance(args, dict) else None
+
+    def replace(match: re.Match) -> str:
+        text = match.group(0)
+        if text == "%%":
+            return "%"
+        value = args[match.group(1)] if match.group(1) else next(values)
+        if not bind:
+            return literal(value)
+        if isinstance(value, (list, tuple, set)):
+            params.extend(to_param(v) for v in value)
+            return "(" + ",".join("?" * len(value)) + ")"
+        params.append(to_param(value))
+        return "?"
+
+    sql = PLACEHOLDER.sub(replace, query)
+    return (sql, tuple(params)) if bind else sql
+
+
+class Cursor:
+    """sqlite游标,接口与 pymysql DictCursor 保持一致"""
+
+    def __init__(self, connection: "Connection"):
+        self.connection = connection
+        self.cursor = connection.raw.cursor()
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        # 最后执行的sql和参数,读取 `_executed` 时才生成填充参数后的sql
+        self.last = ("", None)
+        self.executed = ""
+
+    @property
+    def _executed(self) -> str:
+        """最后执行的填充参数后的sql,与 pymysql 一致,只在日志、调试读取时生成"""
+        if self.last is not None:
+            query, args = self.last
+            self.executed = self.mogrify(query, args) if query else ""
+            self.last = None
+        return self.executed
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def mogrify(self, query: str, args: Union[tuple, list, dict, None] = None) -> str:
+        """生成填充参数后的sql"""
+        return format_sql(query, args, bind=False)
+
+    def execute(self, query: str, args: Union[tuple, list, dict, None] = None) -> int:
+        """执行sql
+
+        Returns:
+            int: 影响行数,查询语句为-1
+        """
+        sql, params = format_sql(query, args)
+        self.last = (query, args)
+        self.cursor.execute(translate(sql), params)
+        self.description = self.cursor.description
+        self.rowcount = self.cursor.rowcount
+        self.lastrowid = self.cursor.lastrowid
+        return self.rowcount
+
+    def executemany(self, query: str, args: List[Union[tuple, list, dict]]) -> int:
+        count = 0
+        for params in args:
+            count += max(self.execute(query, params), 0)
+        self.rowcount = count
+        return count
+
+    def __row(self, row: tuple) -> dict:
+        return {d[0]: v for d, v in zip(self.description, row)}
+
+    def fetchone(self) -> Union[dict, None]:
+        if self.description is None:
+            return None
+        row = self.cursor.fetchone()
+        return None if row is None else self.__row(row)
+
+    def fetchmany(self, size: int = None) -> List[dict]:
+        if self.description is None:
+            return []
+        rows = self.cursor.fetchmany(size or self.cursor.arraysize)
+        return [self.__row(row) for row in rows]
+
+    def fetchall(self) -> List[dict]:
+        if self.description is None:
+            return []
+        return [self.__row(row) for row in self.cursor.fetchall()]
+
+    def close(self):
+        self.cursor.close()
+
+
+class Connection:
+    """sqlite连接,接口与 pymysql Connection 保持一致"""
+
+    def __init__(self, raw: sqlite3.Connection, database: str = ""):
+        self.raw = raw
+        self.db = database
+        self.open = True
+
+    def cursor(self, cursor: type = None) -> Cursor:
+        return Cursor(self)
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute("BEGIN")
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect: bool = True):
+        if not self.open:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self.raw.close()
@@ -2,16 +2,33 @@
 # -*- coding: utf-8 -*-
 __author__ = "hbh112233abc@163.com"
 
-import cacheout
-from loguru import logger
-from typing import Any, Union
+import time
+import queue
+import contextlib
+import random
+import threading
+from collections import Counter, deque
 
-from think_sql.tool.util import DBConfig, db_config
+from typing import Any, Callable, Iterable, List, Tuple, Union
+
+from think_sql import metrics
+from think_sql.tool.log import logger
+from think_sql.tool.util import DBConfig, db_config, make_converter
 
 from think_sql.tool.cache import CacheStorage
+from think_sql.tool.writer import AsyncWriter
+from think_sql.tool.counter import CounterBuffer
+from think_sql.tool.profile import QueryEvent, QueryTimer
+from think_sql.tool.slow import SlowQueryLog
+from think_sql.tool.digest import QueryDigestLog
+from think_sql.tool.nplusone import NPlusOneDetector
+from think_sql.tool.tracing import SpanExporter, Tracer, query_span
 
 
 class Database:
+    # 可重试的错误码(死锁、锁等待超时等),由各驱动定义
+    RETRY_ERRORS: tuple = ()
+
     def __init__(
         self,
         config: Union[str, dict, DBConfig],
@@ -32,13 +49,468 @@ class Database:
         self.connector = None
         self.cursor = None
         self.auto_commit = True
+        self.uow = None
         self._debug = debug
+        # 提交模式
+        self._read_only = False
+        self._group_commit = (0, 0)
+        self.pending_writes = 0
+        self.pending_since = 0.0
+        self.commit_stats = {"commits": 0, "saved": 0}
+        # 重试策略
+        self._retry = {"attempts": 0, "base": 0.05, "max_delay": 2.0, "codes": self.RETRY_ERRORS}
+        self.retry_stats = Counter()
+        # 后台写入
+        self.writers = {}
+        self.writers_lock = threading.Lock()
+        # sql执行事件监听
+        self.listeners: List[Callable[[QueryEvent], None]] = []
+        self.events = None
+        self.tracer = None
 
         self.connect()
 
     def connect(self):
         pass
 
+    def reader(self) -> "Database":
+        """读操作使用的数据库连接,读写分离时由子类返回从库"""
+        return self
+
+    def connection_id(self) -> int:
+        """连接id,由各驱动实现"""
+        return id(self.connector)
+
+    def on_query(self, callback: Callable[[QueryEvent], None]) -> Callable[[QueryEvent], None]:
+        """注册sql执行事件监听,可作为装饰器使用
+
+        没有监听时不做任何计时统计
+
+        Args:
+            callback (Callable[[QueryEvent], None]): 回调函数,参数为 QueryEvent
+
+        Returns:
+            Callable[[QueryEvent], None]: 回调函数
+        """
+        self.listeners.append(callback)
+        return callback
+
+    def off_query(self, callback: Callable[[QueryEvent], None]):
+        """取消sql执行事件监听"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def emit(self, event: QueryEvent):
+        """分发sql执行事件,回调异常只记录日志"""
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                self.log.exception(e)
+
+    def profile(self, size: int = 1000) -> deque:
+        """记录最近 `size` 条sql执行事件
+
+        Args:
+            size (int, optional): 环形缓冲区大小,0关闭. Defaults to 1000.
+
+        Returns:
+            deque: 事件缓冲区 `db.events`
+        """
+        if self.events is not None:
+            self.off_query(self.events.append)
+            self.events = None
+        if size > 0:
+            self.events = deque(maxlen=size)
+            self.on_query(self.events.append)
+        return self.events
+
+    def trace(self, exporter: SpanExporter = None, tracer: Any = None) -> Any:
+        """开启链路追踪
+
+        每条sql生成一个span(表名、操作、行数等属性),事务、获取连接也会生成span.
+        `tracer` 可以是 OpenTelemetry Tracer,未设置时使用内置 Tracer 导出到 `exporter`.
+        两者都为None时关闭追踪. 关闭或替换时先调用原 tracer 的 `shutdown()`(如果有),关闭导出文件
+
+        Args:
+            exporter (SpanExporter, optional): InMemorySpanExporter|JsonLinesExporter. Defaults to None.
+            tracer (Any, optional): Tracer 或 OpenTelemetry Tracer. Defaults to None.
+
+        Returns:
+            Any: tracer
+        """
+        self.off_query(self.trace_query)
+        old = self.tracer
+        if exporter is None and tracer is None:
+            self.tracer = None
+        else:
+            self.tracer = tracer or Tracer(exporter)
+            self.on_query(self.trace_query)
+        shutdown = getattr(old, "shutdown", None)
+        if old is not None and old is not self.tracer and callable(shutdown):
+            try:
+                shutdown()
+            except Exception as e:
+                self.log.warning(e)
+        return self.tracer
+
+    def trace_query(self, event: QueryEvent):
+        """sql执行事件生成span"""
+        if self.tracer is not None:
+            query_span(self.tracer, event, self.config.type)
+
+    def span(self, name: str, **attributes):
+        """追踪开启时创建当前span,否则返回空上下文
+
+        Args:
+            name (str): span名称
+            **attributes: span属性
+
+        Returns:
+            ContextManager: span上下文
+        """
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        attributes.setdefault("db.system", self.config.type)
+        attributes.setdefault("db.name", self.database)
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    def detect_n_plus_one(self, threshold: int = 5, strict: bool = False) -> NPlusOneDetector:
+        """N+1 查询检测
+
+        with 作用域内同一sql模板执行超过 `threshold` 次时记录警告(调用位置、IN批量查询建议),
+        `strict`=True 时抛出 NPlusOneError,用于测试
+
+        Args:
+            threshold (int, optional): 同一模板允许的最大执行次数. Defaults to 5.
+            strict (bool, optional): 严格模式. Defaults to False.
+
+        Returns:
+            NPlusOneDetector: 检测器,`detector.findings` 为检测结果
+        """
+        return NPlusOneDetector(self, threshold, strict)
+
+    def slow_query(self, ms: float = 200, **kwargs) -> SlowQueryLog:
+        """记录慢sql
+
+        耗时超过 `ms` 毫秒的sql按指纹汇总,首次出现时在后台使用独立连接分析执行计划
+
+        Args:
+            ms (float, optional): 慢sql阈值(毫秒),0关闭. Defaults to 200.
+            **kwargs: SlowQueryLog 参数(explain, max_fingerprints, analyzer)
+
+        Returns:
+            SlowQueryLog: 慢sql记录,`slow.top(10)` 查看排行
+        """
+        with self.writers_lock:
+            slow = self.writers.pop(("slow_query",), None)
+        if slow is not None:
+            slow.close()
+        if not ms:
+            return None
+        slow = SlowQueryLog(self, ms, **kwargs)
+        with self.writers_lock:
+            self.writers[("slow_query",)] = slow
+        return slow
+
+    def query_digest(self, max_fingerprints: int = 1000) -> QueryDigestLog:
+        """开启sql指纹统计
+
+        每条sql归一化为指纹,按指纹统计次数、耗时(p50/p95/p99)、行数和最后一次样本,
+        `db.digest()` 查看排行
+
+        Args:
+            max_fingerprints (int, optional): 最多统计的指纹数,0关闭. Defaults to 1000.
+
+        Returns:
+            QueryDigestLog: 指纹统计
+        """
+        with self.writers_lock:
+            digest = self.writers.pop(("digest",), None)
+        if digest is not None:
+            digest.close()
+        if not max_fingerprints:
+            return None
+        digest = QueryDigestLog(self, max_fingerprints)
+        with self.writers_lock:
+            self.writers[("digest",)] = digest
+        return digest
+
+    def digest(self, top: int = 10, by: str = "total") -> List[dict]:
+        """sql指纹统计排行,需先调用 `query_digest()` 开启
+
+        Args:
+            top (int, optional): 条数. Defaults to 10.
+            by (str, optional): 排序字段 total|count|avg|max|p95|p99|rows_returned|rows_examined. Defaults to "total".
+
+        Returns:
+            List[dict]: 统计列表,参考 `QueryDigest.to_dict`
+        """
+        digest = self.writers.get(("digest",))
+        if digest is None:
+            return []
+        return [d.to_dict() for d in digest.top(top, by)]
+
+    def analyze_slow(self, sql: str, params: tuple = ()) -> Any:
+        """分析慢sql执行计划,由各驱动实现
+
+        Args:
+            sql (str): sql模板
+            params (tuple, optional): 绑定参数. Defaults to ().
+
+        Returns:
+            Any: 分析结果
+        """
+        return None
+
+    def explain(self, sql: str, params: tuple = (), analyze: bool = False) -> Union["Plan", None]:
+        """结构化执行计划,由各驱动实现
+
+        Args:
+            sql (str): sql模板
+            params (tuple, optional): 绑定参数. Defaults to ().
+            analyze (bool, optional): 是否实际执行并统计行数和耗时. Defaults to False.
+
+        Returns:
+            Union[Plan, None]: 执行计划,参考 `think_sql.tool.plan.Plan`,不支持时返回None
+        """
+        return None
+
+    def max_replica_lag(self) -> Union[float, None]:
+        """从库最大复制延迟(秒),无从库时返回None"""
+        return None
+
+    def wait_replica(self, max_lag: float, interval: float = 1, timeout: float = 300):
+        """等待从库复制延迟降到 `max_lag` 秒以内
+
+        从库未复制(Seconds_Behind_Master为NULL)时延迟视为无穷大,超时后抛出异常而不是一直等待
+
+        Args:
+            max_lag (float): 最大复制延迟(秒)
+            interval (float, optional): 检查间隔秒数. Defaults to 1.
+            timeout (float, optional): 最长等待秒数,None不限制. Defaults to 300.
+
+        Raises:
+            TimeoutError: 超时后从库延迟仍然超过 `max_lag`
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            lag = self.max_replica_lag()
+            if lag is None or lag <= max_lag:
+                return
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(
+                    f"replica lag {lag}s still > {max_lag}s after {timeout}s"
+                )
+            self.log.warning(f"replica lag {lag}s > {max_lag}s, waiting")
+            time.sleep(interval)
+
+    def set_read_only(self, flag: bool = True):
+        """设置连接只读会话,由各驱动实现"""
+        pass
+
+    def clone(self) -> "Database":
+        """使用相同配置创建新的连接"""
+        conn = self.__class__(self.config, self.params)
+        conn._debug = self._debug
+        conn._retry = dict(self._retry)
+        return conn
+
+    def async_writer(self, table_name: str, **kwargs):
+        """获取数据表的后台写入对象,不存在时创建
+
+        Args:
+            table_name (str): 表名
+            **kwargs: AsyncWriter 参数(batch_size, interval_ms, queue_size, on_error),仅创建时生效
+
+        Returns:
+            AsyncWriter: 后台写入对象
+        """
+        with self.writers_lock:
+            writer = self.writers.get(table_name)
+            if writer is None or writer.closed:
+                writer = AsyncWriter(self, table_name, **kwargs)
+                self.writers[table_name] = writer
+            return writer
+
+    def counter(self, table_name: str, field: str, key: str = "id", **kwargs) -> CounterBuffer:
+        """获取数据表字段的计数器,不存在时创建
+
+        Args:
+            table_name (str): 表名
+            field (str): 字段名
+            key (str, optional): 行标识字段名. Defaults to "id".
+            **kwargs: CounterBuffer 参数(interval_ms, upsert, on_error),仅创建时生效
+
+        Returns:
+            CounterBuffer: 计数器
+        """
+        with self.writers_lock:
+            name = ("counter", table_name, field, key)
+            counter = self.writers.get(name)
+            if counter is None or counter.closed:
+                counter = CounterBuffer(self, table_name, field, key, **kwargs)
+                self.writers[name] = counter
+            return counter
+
+    def flush_writers(self):
+        """等待全部后台写入完成"""
+        for writer in list(self.writers.values()):
+            writer.flush()
+
+    def close_writers(self):
+        """写入剩余数据并关闭全部后台写入和计数器"""
+        with self.writers_lock:
+            writers, self.writers = self.writers, {}
+        for writer in writers.values():
+            writer.close()
+
+    def read_only(self, flag: bool = True):
+        """只读会话模式
+
+        读操作后不再执行commit,驱动支持时设置会话只读(ex: mysql `SET SESSION TRANSACTION READ ONLY`)
+
+        Args:
+            flag (bool, optional): 是否只读. Defaults to True.
+
+        Returns:
+            self: 支持链式调用
+        """
+        self._read_only = flag
+        self.set_read_only(flag)
+        return self
+
+    def group_commit(self, size: int = 0, next_write_ms: int = 0):
+        """合并提交模式
+
+        写操作后不立即commit,累计 `size` 条时统一提交;
+        `next_write_ms` 只在下一次写操作时检查,距首条未提交写操作超过该毫秒数则提交,没有后续写操作时不会自动提交.
+        读操作、开始事务、关闭连接时也会提交,一批写入结束后应调用 `flush_pending()` 释放行锁.
+        `size`和`next_write_ms`都为0时关闭合并提交
+
+        Args:
+            size (int, optional): 累计写操作条数. Defaults to 0.
+            next_write_ms (int, optional): 下一次写操作时检查的最长等待毫秒数. Defaults to 0.
+
+        Returns:
+            self: 支持链式调用
+        """
+        self.flush_pending()
+        self._group_commit = (int(size), int(next_write_ms))
+        return self
+
+    def commit(self):
+        """提交"""
+        self.connector.commit()
+        self.commit_stats["commits"] += 1
+        metrics.inc("think_sql_commits_total", database=self.database)
+        self.pending_writes = 0
+
+    def flush_pending(self):
+        """提交合并提交模式下尚未提交的写操作"""
+        if self.pending_writes and self.connector:
+            self.commit()
+
+    def commit_read(self):
+        """读操作后提交"""
+        if not self.auto_commit:
+            return
+        if self._read_only and not self.pending_writes:
+            self.commit_stats["saved"] += 1
+            return
+        self.commit()
+
+    def commit_write(self):
+        """写操作后提交"""
+        if not self.auto_commit:
+            return
+        size, ms = self._group_commit
+        if not size and not ms:
+            self.commit()
+            return
+        now = time.time()
+        if not self.pending_writes:
+            self.pending_since = now
+        self.pending_writes += 1
+        if (size and self.pending_writes >= size) or (
+            ms and (now - self.pending_since) * 1000 >= ms
+        ):
+            self.commit()
+            return
+        self.commit_stats["saved"] += 1
+
+    def retry(
+        self,
+        attempts: int = 3,
+        base: float = 0.05,
+        max_delay: float = 2.0,
+        codes: Iterable[int] = None,
+    ):
+        """死锁/锁等待超时重试策略
+
+        非事务的写操作遇到可重试错误时回滚并按指数退避(带随机抖动)重试,
+        事务内的错误由 `transaction()` 重放整个事务. `attempts` 为0时关闭重试,
+        重试次数按 (表名, 错误码) 记录在 `retry_stats`
+
+        Args:
+            attempts (int, optional): 最大重试次数. Defaults to 3.
+            base (float, optional): 首次退避秒数,之后每次翻倍. Defaults to 0.05.
+            max_delay (float, optional): 最大退避秒数. Defaults to 2.0.
+            codes (Iterable[int], optional): 可重试的错误码,默认为驱动的 `RETRY_ERRORS`. Defaults to None.
+
+        Returns:
+            self: 支持链式调用
+        """
+        self._retry = {
+            "attempts": int(attempts),
+            "base": base,
+            "max_delay": max_delay,
+            "codes": tuple(self.RETRY_ERRORS if codes is None else codes),
+        }
+        return self
+
+    def error_code(self, err: Exception) -> Any:
+        """获取异常的错误码"""
+        if err.args and isinstance(err.args[0], int):
+            return err.args[0]
+        return None
+
+    def retryable(self, err: Exception) -> Any:
+        """可重试的异常返回错误码,否则返回None"""
+        code = self.error_code(err)
+        if code is not None and code in self._retry["codes"]:
+            return code
+        return None
+
+    def backoff(self, attempt: int) -> float:
+        """第 `attempt` 次重试前的等待秒数(指数退避 + 随机抖动)"""
+        delay = min(self._retry["max_delay"], self._retry["base"] * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    def with_retry(self, func: Callable[[], Any], table: str = "") -> Any:
+        """执行写操作,遇到可重试错误时回滚后重试
+
+        仅在自动提交且没有未提交写操作时重试,事务中或合并提交模式下有未提交数据时直接抛出
+
+        Args:
+            func (Callable[[], Any]): 写操作
+            table (str, optional): 表名,用于统计. Defaults to "".
+        """
+        attempt = 0
+        while True:
+            safe = self.auto_commit and not self.pending_writes
+            try:
+                return func()
+            except Exception as e:
+                code = self.retryable(e)
+                if code is None or not safe or attempt >= self._retry["attempts"]:
+                    raise e
+                self.connector.rollback()
+                self.retry_stats[(table, code)] += 1
+                self.log.warning(f"[retry]({table}) {e}, attempt {attempt + 1}")
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
     def debug(self, flag: bool = True):
         """设置调试模式
 
@@ -64,6 +536,7 @@ class Database:
             exc_value (object): 异常值,默认为None
             trace (traceback object): 异常位置,默认为None
         """
+        self.close_writers()
         if exc_value is not None:
             self.error()
         else:
@@ -86,7 +559,7 @@ class TableBase:
         self.use_cache = False
         self.cache_key = None
         self.cache_expire = 3600
-        self.cache_storage = cacheout.Cache()
+        self._cache_storage = None
 
     def debug(self, flag: bool = True):
         """设置调试模式
@@ -113,6 +586,19 @@ class TableBase:
         self._fetch_sql = flag
         return self
 
+    @property
+    def cache_storage(self) -> CacheStorage:
+        """缓存驱动,未设置时首次使用创建 cacheout 内存缓存"""
+        if self._cache_storage is None:
+            import cacheout
+
+            self._cache_storage = cacheout.Cache()
+        return self._cache_storage
+
+    @cache_storage.setter
+    def cache_storage(self, storage: CacheStorage):
+        self._cache_storage = storage
+
     def set_cache_storage(self, storage: CacheStorage):
         """设置缓存驱动
 
@@ -144,7 +630,11 @@ class TableBase:
             key = self.cache_key
         if not key:
             return None
-        return self.cache_storage.get(key)
+        value = self.cache_storage.get(key)
+        if metrics.REGISTRY.enabled:
+            result = "miss" if value is None else "hit"
+            metrics.inc("think_sql_cache_total", table=self.table_name, result=result)
+        return value
 
     def set_cache(self, value: Any, key: str = ""):
         if not self.cache_key:
@@ -154,3 +644,266 @@ class TableBase:
         if not key:
             return
         self.cache_storage.set(key, value, self.cache_expire)
+
+    def insert_async(
+        self,
+        data: Union[dict, List[dict]],
+        block: bool = True,
+        timeout: float = None,
+    ):
+        """后台写入
+
+        数据放入队列后立即返回,由后台线程使用独立连接批量写入,
+        写入参数通过 `db.async_writer(table_name, ...)` 设置
+
+        Args:
+            data (Union[dict, List[dict]]): 待写入数据
+            block (bool, optional): 队列满时是否等待. Defaults to True.
+            timeout (float, optional): 最长等待秒数. Defaults to None.
+        """
+        self.db.async_writer(self.table_name).insert(data, block, timeout)
+
+    def emit_query(
+        self,
+        timer: QueryTimer,
+        operation: str,
+        sql: str,
+        params: Any = (),
+        rows: int = 0,
+        result: List[dict] = None,
+        db: Database = None,
+        error: Exception = None,
+    ):
+        """分发当前表的sql执行事件,参数参考 `QueryTimer.event`"""
+        self.db.emit(
+            timer.event(
+                operation,
+                self.table_name,
+                sql,
+                params,
+                rows,
+                result,
+                db or self.db,
+                error,
+            )
+        )
+
+    def counter(self, field: str, key: str = "id", **kwargs) -> CounterBuffer:
+        """计数器,在内存中合并递增后定时批量写入,用于高频递增的热点行
+
+        Args:
+            field (str): 字段名
+            key (str, optional): 行标识字段名. Defaults to "id".
+            **kwargs: CounterBuffer 参数(interval_ms, upsert, on_error),仅创建时生效
+
+        Returns:
+            CounterBuffer: 计数器
+        """
+        return self.db.counter(self.table_name, field, key, **kwargs)
+
+    def run_chunks(
+        self,
+        step: Callable[[], Tuple[int, bool]],
+        sleep: float = 0,
+        max_replica_lag: float = None,
+        progress: Callable[[dict], None] = None,
+    ) -> int:
+        """分批执行写操作
+
+        每批执行后提交,批次之间休眠 `sleep` 秒,设置 `max_replica_lag` 时等待从库追上后再执行下一批
+
+        Args:
+            step (Callable[[], Tuple[int, bool]]): 执行一批,返回 (影响行数, 是否完成)
+            sleep (float, optional): 批次间隔秒数. Defaults to 0.
+            max_replica_lag (float, optional): 最大从库复制延迟(秒). Defaults to None.
+            progress (Callable[[dict], None], optional): 进度回调,
+                参数 {"table", "chunks", "rows", "total", "elapsed", "rate"},
+                未设置时调试模式下输出日志. Defaults to None.
+
+        Returns:
+            int: 影响行数
+        """
+        total, chunks, start = 0, 0, time.time()
+        debug = self._debug
+        while True:
+            if max_replica_lag is not None:
+                self.db.wait_replica(max_replica_lag, max(sleep, 1))
+            count, done = step()
+            # 合并提交模式下也在批次之间提交,释放本批的行锁
+            self.db.commit()
+            total += count
+            chunks += 1
+            elapsed = time.time() - start
+            info = {
+                "table": self.table_name,
+                "chunks": chunks,
+                "rows": count,
+                "total": total,
+                "elapsed": elapsed,
+                "rate": total / elapsed if elapsed else 0,
+            }
+            if progress:
+                progress(info)
+            elif debug:
+                self.log.info(
+                    f"[chunk]({self.table_name}) #{chunks} {count} rows, total {total}, {info['rate']:.0f} rows/s"
+                )
+            if done:
+                return total
+            if sleep:
+                time.sleep(sleep)
+
+    def range_chunks(
+        self, action: Callable[[], int], chunk_size: int
+    ) -> Callable[[], Tuple[int, bool]]:
+        """按主键范围分批
+
+        每批先查询当前条件下第 `chunk_size` 行的主键作为上界,再对 (上一批上界, 上界] 范围执行 `action`
+
+        Args:
+            action (Callable[[], int]): 在已设置的条件上执行一次写操作,返回影响行数
+            chunk_size (int): 每批行数
+
+        Raises:
+            ValueError: 数据表没有主键
+
+        Returns:
+            Callable[[], Tuple[int, bool]]: 供 `run_chunks` 使用的分批函数
+        """
+        pk = self.pk_name()
+        if not pk:
+            raise ValueError(f"table {self.table_name} has no primary key to chunk by")
+        condition = (self.condition_str, self.condition_val)
+        state = {"last": None}
+
+        def where():
+            self.condition_str, self.condition_val = condition
+            self.group_where()
+            if state["last"] is not None:
+                self.where(pk, ">", state["last"])
+            return self
+
+        def step() -> Tuple[int, bool]:
+            rows = where().field(pk).order(pk).limit(chunk_size - 1, 1).select()
+            where()
+            if rows:
+                self.where(pk, "<=", rows[0][pk])
+            count = action()
+            if not rows:
+                return count, True
+            state["last"] = rows[0][pk]
+            return count, False
+
+        return step
+
+    def group_where(self):
+        """给已设置的条件加括号,之后追加的条件对整体生效(ex: `where_or` 之后追加主键范围)
+
+        Returns:
+            self: 对象本身
+        """
+        condition = self.condition_str.replace("1=1 AND ", "").replace("1=1 OR ", "")
+        if condition != "1=1":
+            self.condition_str = f"1=1 AND ({condition})"
+        return self
+
+    def pk_name(self) -> str:
+        """获取主键字段名
+
+        Returns:
+            str: 主键字段名,无主键时返回空字符串
+        """
+        for column in self.columns.values():
+            if column.get("primary"):
+                return column["name"]
+        return ""
+
+    def copy_into(
+        self,
+        other_db: Database,
+        table: str = "",
+        batch_size: int = 1000,
+        queue_size: int = 4,
+        key: str = "",
+        resume: bool = True,
+    ) -> int:
+        """跨库流式复制
+
+        在当前连接流式读取查询结果,按双方字段类型转换后,由独立线程批量写入目标库,
+        读写通过有界队列流水线执行.
+        设置 `key` 时按 `key` 顺序复制,`resume`=True 时从目标表已存在的最大 `key` 之后继续
+
+        Args:
+            other_db (Database): 目标数据库
+            table (str, optional): 目标表名,默认同名. Defaults to "".
+            batch_size (int, optional): 每批写入行数. Defaults to 1000.
+            queue_size (int, optional): 读写之间缓冲的批次数. Defaults to 4.
+            key (str, optional): 断点续传字段,默认主键. Defaults to "".
+            resume (bool, optional): 是否断点续传. Defaults to True.
+
+        Returns:
+            int: 写入行数
+        """
+        table = table or self.table_name
+        target = other_db.table(table)
+        names = {name.lower(): name for name in target.columns}
+        key = key or self.pk_name()
+        target_key = names.get(key.lower(), "") if key else ""
+        if target_key:
+            if resume:
+                last = other_db.table(table).order(target_key, "desc").value(target_key)
+                if last not in ("", None):
+                    self.group_where().where(key, ">", last)
+            self.order(key)
+
+        converters = {}
+
+        def convert(row: dict) -> dict:
+            if not converters:
+                for field in row:
+                    name = names.get(field.lower())
+                    if name is None:
+                        continue
+                    src_type = self.columns.get(field, {}).get("type", "")
+                    dst_type = target.columns[name].get("type", "")
+                    converters[field] = (name, make_converter(src_type, dst_type))
+            data = {}
+            for field, (name, func) in converters.items():
+                value = row.get(field)
+                data[name] = func(value) if func else value
+            return data
+
+        buffer = queue.Queue(maxsize=max(int(queue_size), 1))
+        errors = []
+        written = [0]
+
+        def writer():
+            while True:
+                rows = buffer.get()
+                if rows is None:
+                    break
+                if errors:
+                    continue
+                try:
+                    target.insert(rows)
+                    written[0] += len(rows)
+                except Exception as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        try:
+            cursor = self.cursor()
+            while not errors:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                buffer.put([convert(row) for row in rows])
+        finally:
+            buffer.put(None)
+            thread.join()
+            self.init()
+        if errors:
+            self.log.error(f"copy into {table} failed after {written[0]} rows")
+            raise errors[0]
+        return written[0]
@@ -3,13 +3,29 @@
 __author__ = "hbh112233abc@163.com"
 
 import abc  # 利用abc模块实现抽象类
-import dill
 import hashlib
 from functools import wraps
 
-import cacheout
+# 默认缓存驱动,首次使用时创建
+_storage = None
+
+
+def default_storage():
+    """默认缓存驱动(cacheout内存缓存)"""
+    global _storage
+    if _storage is None:
+        import cacheout
+
+        _storage = cacheout.Cache()
+    return _storage
+
+
+def __getattr__(name: str):
+    """`cache_storage` 按需创建默认缓存驱动,导入模块时不加载cacheout"""
+    if name == "cache_storage":
+        return default_storage()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-cache_storage = cacheout.Cache()
 
 def params_to_key(function_name, *args, **kwargs):
     """按参数生成缓存键名
@@ -20,6 +36,8 @@ def params_to_key(function_name, *args, **kwargs):
     Returns:
         str: 缓存键名
     """
+    import dill
+
     key = function_name
     hash = hashlib.md5()
     for arg in args:
@@ -38,13 +56,13 @@ def params_to_key(function_name, *args, **kwargs):
     return key + hash.hexdigest()
 
 
-def cache(key=None, ttl=3600, storage=cache_storage):
+def cache(key=None, ttl=3600, storage=None):
     """缓存装饰器
 
     Args:
         key (str, optional): 缓存标识key. Defaults to None.
         ttl (int, optional): 缓存有效期. Defaults to 3600.
-        storage (object, optional): 缓存驱动对象. Defaults to cache_storage.
+        storage (object, optional): 缓存驱动对象. Defaults to None(默认缓存驱动).
 
     Example:
         @cache()
@@ -56,17 +74,19 @@ def cache(key=None, ttl=3600, storage=cache_storage):
     def cache_decorator(func):
         @wraps(func)
         def wrapped_function(*args, **kwargs):
+            # 空的缓存对象可能为假值,只在未传入时使用默认驱动
+            store = storage if storage is not None else default_storage()
             cache_key = key
             if not cache_key:
                 cache_key = params_to_key(func.__name__, *args, **kwargs)
             else:
                 cache_key = f"{func.__name__}_{key}"
 
-            if storage.get(cache_key):
-                return storage.get(cache_key)
+            if store.get(cache_key):
+                return store.get(cache_key)
             result = func(*args, **kwargs)
             if result:
-                storage.set(cache_key, result, ttl)
+                store.set(cache_key, result, ttl)
             return result
 
         return wrapped_function
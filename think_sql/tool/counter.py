@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import threading
+from typing import Any, Callable, Dict, Union
+
+
+class CounterBuffer:
+    """热点行计数合并
+
+    `inc()` 只在内存中按行累加步长,后台线程每 `interval_ms` 毫秒使用独立连接
+    以一条 `batch_inc` 语句写入全部行的累计值. 语句执行失败的累计值会合并回缓冲区,
+    下次继续写入; 提交失败时语句可能已经生效,累计值只交给 `on_error`,不会重复写入.
+    数据表对象只创建一次并在各次写入间复用,失败后丢弃,下次写入重新创建(会检查并重连)
+    """
+
+    def __init__(
+        self,
+        db,
+        table_name: str,
+        field: str,
+        key: str = "id",
+        interval_ms: int = 1000,
+        batch_size: int = 1000,
+        upsert: bool = False,
+        on_error: Callable[[Exception, Dict[Any, Union[int, float]]], None] = None,
+    ):
+        """实例化计数器
+
+        Args:
+            db (Database): 数据库连接,后台线程使用 `db.clone()` 创建的独立连接
+            table_name (str): 表名
+            field (str): 计数字段名
+            key (str, optional): 行标识字段名. Defaults to "id".
+            interval_ms (int, optional): 写入间隔毫秒数. Defaults to 1000.
+            batch_size (int, optional): 每条sql最多写入的行数. Defaults to 1000.
+            upsert (bool, optional): 行不存在时插入(mysql). Defaults to False.
+            on_error (Callable, optional): 写入失败回调,参数为异常和该批累计值. Defaults to None.
+        """
+        self.db = db
+        self.table_name = table_name
+        self.field = field
+        self.key = key
+        self.interval = max(int(interval_ms), 1) / 1000
+        self.batch_size = max(int(batch_size), 1)
+        self.upsert = upsert
+        self.on_error = on_error
+        self.log = db.log
+        self.buffer: Dict[Any, Union[int, float]] = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stats = {"calls": 0, "flushes": 0, "rows": 0, "errors": 0}
+        self.closed = False
+        self.stop = threading.Event()
+        self.conn = db.clone()
+        # 语句和提交分开执行,区分语句失败和提交失败
+        self.conn.auto_commit = False
+        self.table = None
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return f"<class 'think_sql.tool.counter.CounterBuffer' table={self.table_name} field={self.field} pending={len(self.buffer)}>"
+
+    def inc(self, key: Any, step: Union[int, float] = 1):
+        """递增
+
+        Args:
+            key (Any): 行标识值
+            step (Union[int, float], optional): 步长. Defaults to 1.
+
+        Raises:
+            RuntimeError: 已关闭
+        """
+        if self.closed:
+            raise RuntimeError(f"CounterBuffer of {self.table_name}.{self.field} is closed")
+        with self.lock:
+            self.buffer[key] = self.buffer.get(key, 0) + step
+            self.stats["calls"] += 1
+
+    def dec(self, key: Any, step: Union[int, float] = 1):
+        """递减
+
+        Args:
+            key (Any): 行标识值
+            step (Union[int, float], optional): 步长. Defaults to 1.
+        """
+        self.inc(key, 0 - step)
+
+    def pending(self) -> Dict[Any, Union[int, float]]:
+        """尚未写入的累计值"""
+        with self.lock:
+            return dict(self.buffer)
+
+    def flush(self) -> int:
+        """立即写入全部累计值
+
+        Returns:
+            int: 影响行数
+        """
+        with self.flush_lock:
+            with self.lock:
+                buffer, self.buffer = self.buffer, {}
+            result = 0
+            items = [(k, v) for k, v in buffer.items() if v]
+            for i in range(0, len(items), self.batch_size):
+                steps = dict(items[i : i + self.batch_size])
+                try:
+                    if self.table is None:
+                        self.table = self.conn.table(self.table_name)
+                    count = self.table.batch_inc(
+                        self.field, self.key, steps, self.upsert
+                    )
+                except Exception as e:
+                    self.table = None
+                    self.__rollback()
+                    self.__restore(steps)
+                    self.__failed(e, steps)
+                    continue
+                try:
+                    self.conn.commit()
+                except Exception as e:
+                    # 语句已执行,提交结果未知,合并回缓冲区可能重复计数
+                    self.table = None
+                    self.__failed(e, steps)
+                    continue
+                result += count
+                self.stats["rows"] += len(steps)
+            self.stats["flushes"] += 1
+            return result
+
+    def __failed(self, err: Exception, steps: Dict[Any, Union[int, float]]):
+        """写入失败回调"""
+        self.stats["errors"] += 1
+        if self.on_error:
+            try:
+                self.on_error(err, steps)
+            except Exception as e:
+                self.log.exception(e)
+        else:
+            self.log.exception(err)
+
+    def __rollback(self):
+        try:
+            self.conn.connector.rollback()
+        except Exception as e:
+            self.log.warning(e)
+
+    def __restore(self, steps: Dict[Any, Union[int, float]]):
+        """写入失败,累计值合并回缓冲区"""
+        with self.lock:
+            for k, v in steps.items():
+                self.buffer[k] = self.buffer.get(k, 0) + v
+
+    def close(self):
+        """写入剩余累计值后停止后台线程并关闭连接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.stop.set()
+        self.thread.join()
+        self.flush()
+        try:
+            self.conn.close()
+        except Exception as e:
+            self.log.warning(e)
+
+    def __run(self):
+        while not self.stop.wait(self.interval):
+            if self.buffer:
+                self.flush()
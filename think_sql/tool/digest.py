@@ -0,0 +1,241 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import math
+import threading
+from typing import Dict, List
+
+from think_sql.tool.fingerprint import fingerprint, normalize
+from think_sql.tool.profile import QueryEvent
+
+
+class QuantileSketch:
+    """流式分位数估算(DDSketch)
+
+    按对数区间计数,估算值的相对误差不超过 `accuracy`,内存只与数值范围有关,与样本数无关
+    """
+
+    def __init__(self, accuracy: float = 0.01, min_value: float = 1e-6):
+        """实例化
+
+        Args:
+            accuracy (float, optional): 相对误差. Defaults to 0.01.
+            min_value (float, optional): 小于该值的样本计入最小区间. Defaults to 1e-6.
+        """
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value < self.min_value:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch"):
+        """合并另一个相同精度的sketch"""
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float:
+        """估算分位数
+
+        Args:
+            q (float): 0~1
+
+        Returns:
+            float: 分位数,无样本时为0
+        """
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class QueryDigest:
+    """同一指纹的sql统计
+
+    Attributes:
+        fingerprint (str): sql指纹
+        sql (str): 归一化sql
+        table (str): 表名
+        count (int): 执行次数
+        errors (int): 失败次数
+        total (float): 总耗时(秒)
+        min (float): 最小耗时(秒)
+        max (float): 最大耗时(秒)
+        rows_returned (int): 查询返回行数合计
+        rows_affected (int): 写操作影响行数合计
+        rows_examined (int): 扫描行数合计,驱动在 `event.extra["rows_examined"]` 提供时统计
+        bytes (int): 返回数据估算字节数合计
+        first_seen (float): 首次执行时间戳
+        last_seen (float): 最后执行时间戳
+        sample (dict): 最后一次执行样本 {sql, params, duration, rows, time}
+    """
+
+    def __init__(self, fp: str, event: QueryEvent):
+        self.fingerprint = fp
+        self.sql = normalize(event.sql)
+        self.table = event.table
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.rows_returned = 0
+        self.rows_affected = 0
+        self.rows_examined = 0
+        self.bytes = 0
+        self.first_seen = event.time
+        self.last_seen = event.time
+        self.sample = {}
+        self.sketch = QuantileSketch()
+
+    def __repr__(self):
+        return f"<QueryDigest {self.fingerprint} count={self.count} total={self.total:.3f}s sql={self.sql[:80]}>"
+
+    def add(self, event: QueryEvent):
+        duration = event.duration
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.sketch.add(duration)
+        if event.error is not None:
+            self.errors += 1
+        elif event.operation == "execute":
+            self.rows_affected += event.rows
+        else:
+            self.rows_returned += event.rows
+        self.rows_examined += event.extra.get("rows_examined", 0)
+        self.bytes += event.bytes
+        self.last_seen = event.time
+        self.sample = {
+            "sql": event.sql,
+            "params": event.params,
+            "duration": duration,
+            "rows": event.rows,
+            "time": event.time,
+        }
+
+    @property
+    def avg(self) -> float:
+        """平均耗时(秒)"""
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def p50(self) -> float:
+        return self.sketch.quantile(0.5)
+
+    @property
+    def p95(self) -> float:
+        return self.sketch.quantile(0.95)
+
+    @property
+    def p99(self) -> float:
+        return self.sketch.quantile(0.99)
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "table": self.table,
+            "count": self.count,
+            "errors": self.errors,
+            "total": self.total,
+            "avg": self.avg,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.p50,
+            "p95": self.p95,
+            "p99": self.p99,
+            "rows_returned": self.rows_returned,
+            "rows_affected": self.rows_affected,
+            "rows_examined": self.rows_examined,
+            "bytes": self.bytes,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "sample": self.sample,
+        }
+
+
+class QueryDigestLog:
+    """sql指纹统计,类似 pt-query-digest,在进程内实时汇总
+
+    监听sql执行事件,按指纹统计次数、耗时分位数、行数和最后一次样本
+    """
+
+    def __init__(self, db, max_fingerprints: int = 1000):
+        """实例化
+
+        Args:
+            db (Database): 数据库连接
+            max_fingerprints (int, optional): 最多统计的指纹数,超出后新指纹计入 `dropped`. Defaults to 1000.
+        """
+        self.db = db
+        self.max_fingerprints = max_fingerprints
+        self.digests: Dict[str, QueryDigest] = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        db.on_query(self.record)
+
+    def __repr__(self):
+        return f"<class 'think_sql.tool.digest.QueryDigestLog' fingerprints={len(self.digests)}>"
+
+    def record(self, event: QueryEvent):
+        """sql执行事件回调"""
+        fp = fingerprint(event.sql)
+        with self.lock:
+            digest = self.digests.get(fp)
+            if digest is None:
+                if len(self.digests) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                digest = self.digests[fp] = QueryDigest(fp, event)
+            digest.add(event)
+
+    def top(self, n: int = 10, by: str = "total") -> List[QueryDigest]:
+        """统计排行
+
+        Args:
+            n (int, optional): 条数. Defaults to 10.
+            by (str, optional): 排序字段 total|count|avg|max|p95|p99|rows_returned|rows_examined. Defaults to "total".
+
+        Returns:
+            List[QueryDigest]: 统计列表
+        """
+        with self.lock:
+            digests = list(self.digests.values())
+        return sorted(digests, key=lambda d: getattr(d, by), reverse=True)[:n]
+
+    def reset(self):
+        """清空统计"""
+        with self.lock:
+            self.digests = {}
+            self.dropped = 0
+
+    def flush(self):
+        """没有后台任务,兼容 `db.flush_writers()`"""
+
+    def close(self):
+        """停止统计"""
+        if self.closed:
+            return
+        self.closed = True
+        self.db.off_query(self.record)
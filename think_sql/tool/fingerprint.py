@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import re
+from functools import lru_cache
+from hashlib import md5
+
+COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?")
+NUMBER = re.compile(r"(?<![\w`.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w`])", re.I)
+LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+VALUES = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+SPACE = re.compile(r"\s+")
+# 短sql模板缓存指纹结果
+CACHE_SQL_LENGTH = 4096
+
+
+def normalize(sql: str) -> str:
+    """sql归一化
+
+    去掉注释,字符串、数字、绑定参数替换为 `?`,
+    IN 列表和多行 VALUES 合并为 `(?+)`,合并空白并转小写
+
+    Args:
+        sql (str): sql语句或模板
+
+    Returns:
+        str: 归一化后的sql
+    """
+    sql = COMMENT.sub(" ", sql)
+    sql = STRING.sub("?", sql)
+    sql = PLACEHOLDER.sub("?", sql)
+    sql = NUMBER.sub("?", sql)
+    sql = LIST.sub("(?+)", sql)
+    sql = VALUES.sub("(?+)", sql)
+    sql = SPACE.sub(" ", sql).strip().rstrip(";").strip()
+    return sql.lower()
+
+
+def fingerprint(sql: str) -> str:
+    """sql指纹,相同结构的sql指纹相同
+
+    Args:
+        sql (str): sql语句或模板
+
+    Returns:
+        str: 16位指纹
+    """
+    if len(sql) <= CACHE_SQL_LENGTH:
+        return cached_fingerprint(sql)
+    return md5(normalize(sql).encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=4096)
+def cached_fingerprint(sql: str) -> str:
+    return md5(normalize(sql).encode("utf-8")).hexdigest()[:16]
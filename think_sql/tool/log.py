@@ -0,0 +1,18 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+
+class LazyLogger:
+    """loguru logger 代理,首次使用时才导入 loguru"""
+
+    def __getattr__(self, name: str):
+        from loguru import logger
+
+        return getattr(logger, name)
+
+    def __repr__(self):
+        return "<LazyLogger loguru.logger>"
+
+
+logger = LazyLogger()
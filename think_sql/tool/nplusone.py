@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from think_sql.tool.fingerprint import fingerprint, normalize
+from think_sql.tool.profile import QueryEvent
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+EQ_CONDITION = re.compile(r"\bWHERE\s+[`\"]?([\w.]+)[`\"]?\s*=\s*'?%s'?", re.I)
+
+
+class NPlusOneError(Exception):
+    """严格模式下检测到 N+1 查询"""
+
+
+def call_site() -> str:
+    """think_sql 包外最近的调用位置 `文件:行号`"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(PACKAGE_DIR):
+            return f"{filename}:{frame.f_lineno}"
+        frame = frame.f_back
+    return ""
+
+
+def suggest(event: QueryEvent) -> str:
+    """根据sql模板给出批量查询写法"""
+    match = EQ_CONDITION.search(event.sql)
+    if not match:
+        return "合并为一次批量查询"
+    field = match.group(1).split(".")[-1]
+    return (
+        f"使用 IN 批量查询: db.table('{event.table}').where('{field}', 'in', values).select(),"
+        f" 再按 {field} 分组使用"
+    )
+
+
+class NPlusOneDetector:
+    """N+1 查询检测
+
+    作用域内按指纹统计执行的sql,同一模板执行次数超过 `threshold` 时报告调用位置和批量查询建议,
+    严格模式下退出作用域时抛出 NPlusOneError
+    """
+
+    def __init__(self, db, threshold: int = 5, strict: bool = False):
+        """实例化检测器
+
+        Args:
+            db (Database): 数据库连接
+            threshold (int, optional): 同一模板允许的最大执行次数. Defaults to 5.
+            strict (bool, optional): 严格模式,检测到时抛出异常. Defaults to False.
+        """
+        self.db = db
+        self.threshold = threshold
+        self.strict = strict
+        self.thread = threading.get_ident()
+        self.counts: Counter = Counter()
+        self.sites: Dict[str, Counter] = {}
+        self.samples: Dict[str, QueryEvent] = {}
+        self.findings: List[dict] = []
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self.db.on_query(self.record)
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        self.db.off_query(self.record)
+        self.findings = self.report()
+        for finding in self.findings:
+            self.db.log.warning(
+                f"[n+1] {finding['count']} x {finding['sql']} at {', '.join(finding['call_sites'])}; {finding['suggestion']}"
+            )
+        if self.strict and self.findings and exc_value is None:
+            raise NPlusOneError(
+                "; ".join(f"{f['count']} x {f['sql']}" for f in self.findings)
+            )
+
+    def record(self, event: QueryEvent):
+        """sql执行事件回调"""
+        if threading.get_ident() != self.thread or event.error is not None:
+            return
+        fp = fingerprint(event.sql)
+        self.counts[fp] += 1
+        self.sites.setdefault(fp, Counter())[call_site()] += 1
+        self.samples.setdefault(fp, event)
+
+    def report(self) -> List[dict]:
+        """执行次数超过阈值的sql模板
+
+        Returns:
+            List[dict]: [{fingerprint, sql, table, count, call_sites, suggestion}]
+        """
+        findings = []
+        for fp, count in self.counts.most_common():
+            if count <= self.threshold:
+                break
+            event = self.samples[fp]
+            findings.append(
+                {
+                    "fingerprint": fp,
+                    "sql": normalize(event.sql),
+                    "table": event.table,
+                    "count": count,
+                    "call_sites": [site for site, _ in self.sites[fp].most_common()],
+                    "suggestion": suggest(event),
+                }
+            )
+        return findings
@@ -0,0 +1,439 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""结构化执行计划
+
+把各数据库的执行计划解析为统一的 `Plan` 树:
+
+- mysql: `EXPLAIN FORMAT=JSON`(`parse_json`)、`EXPLAIN ANALYZE`(8.0.18+,`parse_analyze`)
+- dm: `explain`(`parse_dm`)
+- sqlite: `EXPLAIN QUERY PLAN`(`parse_sqlite`)
+
+Example:
+    plan = db.explain("SELECT * FROM user WHERE status = 1")
+    plan.cost
+    plan.full_scans(min_rows=10000)
+    plan.using_filesort
+"""
+__author__ = "hbh112233abc@163.com"
+
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional, Union
+
+# 全表扫描/全索引扫描的访问类型
+FULL_SCAN_TYPES = ("ALL", "index")
+
+
+@dataclass
+class PlanNode:
+    """执行计划节点
+
+    Attributes:
+        operation (str): 操作,mysql json为 table|nested_loop|ordering_operation 等,analyze/dm为原始描述
+        table (str): 表名或别名
+        access_type (str): 访问类型,统一为mysql的 ALL|index|range|ref|eq_ref|const 等
+        key (str): 使用的索引
+        possible_keys (List[str]): 可用索引
+        used_key_parts (List[str]): 使用的索引字段
+        cost (float): 估算代价,mysql json为该表的 read_cost + eval_cost,其他为节点代价
+        rows (float): 估算每次扫描的行数
+        rows_produced (float): 估算输出行数
+        filtered (float): 条件过滤后剩余行数百分比
+        actual_rows (float): 实际输出行数(EXPLAIN ANALYZE)
+        actual_time (float): 实际耗时毫秒(EXPLAIN ANALYZE,每次循环)
+        loops (int): 实际循环次数(EXPLAIN ANALYZE)
+        using_filesort (bool): 是否文件排序
+        using_temporary (bool): 是否使用临时表
+        condition (str): 过滤条件
+        detail (str): 原始描述
+        children (List[PlanNode]): 子节点
+    """
+
+    operation: str
+    table: str = ""
+    access_type: str = ""
+    key: str = ""
+    possible_keys: List[str] = field(default_factory=list)
+    used_key_parts: List[str] = field(default_factory=list)
+    cost: float = 0.0
+    rows: float = 0.0
+    rows_produced: float = 0.0
+    filtered: float = 100.0
+    actual_rows: Optional[float] = None
+    actual_time: Optional[float] = None
+    loops: Optional[int] = None
+    using_filesort: bool = False
+    using_temporary: bool = False
+    condition: str = ""
+    detail: str = ""
+    children: List["PlanNode"] = field(default_factory=list)
+
+    def walk(self) -> Iterator["PlanNode"]:
+        """先序遍历所有节点"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    @property
+    def full_scan(self) -> bool:
+        """是否全表扫描或全索引扫描"""
+        return self.access_type in FULL_SCAN_TYPES
+
+    def to_dict(self) -> dict:
+        data = {k: v for k, v in self.__dict__.items() if k != "children"}
+        data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+@dataclass
+class Plan:
+    """执行计划
+
+    Attributes:
+        root (PlanNode): 根节点
+        cost (float): 整个查询的估算代价
+        format (str): 来源 json|analyze|dm|sqlite
+        raw (Any): 原始执行计划
+    """
+
+    root: PlanNode
+    cost: float = 0.0
+    format: str = ""
+    raw: Any = None
+
+    def __repr__(self):
+        return f"<Plan format={self.format} cost={self.cost} tables={[n.table for n in self.tables()]}>"
+
+    def nodes(self) -> Iterator[PlanNode]:
+        return self.root.walk()
+
+    def find(self, predicate: Callable[[PlanNode], bool]) -> List[PlanNode]:
+        """查找满足条件的节点"""
+        return [node for node in self.nodes() if predicate(node)]
+
+    def tables(self) -> List[PlanNode]:
+        """访问表的节点"""
+        return self.find(lambda node: bool(node.table))
+
+    def table(self, name: str) -> Optional[PlanNode]:
+        """按表名或别名查找访问表的节点"""
+        for node in self.tables():
+            if node.table == name:
+                return node
+        return None
+
+    def full_scans(self, min_rows: float = 0) -> List[PlanNode]:
+        """扫描行数不少于 `min_rows` 的全表/全索引扫描
+
+        Args:
+            min_rows (float, optional): 最少扫描行数. Defaults to 0.
+
+        Returns:
+            List[PlanNode]: 节点
+        """
+        return self.find(lambda node: node.full_scan and node.rows >= min_rows)
+
+    def filesorts(self) -> List[PlanNode]:
+        return self.find(lambda node: node.using_filesort)
+
+    def temporaries(self) -> List[PlanNode]:
+        return self.find(lambda node: node.using_temporary)
+
+    @property
+    def using_filesort(self) -> bool:
+        return bool(self.filesorts())
+
+    @property
+    def using_temporary(self) -> bool:
+        return bool(self.temporaries())
+
+    @property
+    def rows_examined(self) -> float:
+        """估算扫描行数合计,EXPLAIN ANALYZE 按实际循环次数累计"""
+        total = 0.0
+        for node in self.tables():
+            total += node.rows * max(node.loops or 1, 1)
+        return total
+
+    def to_dict(self) -> dict:
+        return {"cost": self.cost, "format": self.format, "root": self.root.to_dict()}
+
+
+def number(value: Any, default: float = 0.0) -> float:
+    """数字或带单位的字符串(如 `1.2K`)转为float"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    units = {"K": 1e3, "M": 1e6, "G": 1e9}
+    try:
+        if value and value[-1].upper() in units:
+            return float(value[:-1]) * units[value[-1].upper()]
+        return float(value)
+    except ValueError:
+        return default
+
+
+# ---------------------------------------------------------------- mysql json
+
+JSON_CHILDREN = (
+    "query_block",
+    "table",
+    "nested_loop",
+    "ordering_operation",
+    "grouping_operation",
+    "duplicates_removal",
+    "windowing",
+    "union_result",
+    "query_specifications",
+    "materialized_from_subquery",
+    "attached_subqueries",
+    "optimized_away_subqueries",
+)
+
+
+def json_children(data: dict) -> List[PlanNode]:
+    children = []
+    for key in JSON_CHILDREN:
+        value = data.get(key)
+        if value is None:
+            continue
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if key in ("nested_loop", "attached_subqueries", "optimized_away_subqueries", "query_specifications"):
+                children.extend(json_children(item))
+            else:
+                children.append(json_node(key, item))
+    return children
+
+
+def json_node(operation: str, data: dict) -> PlanNode:
+    cost_info = data.get("cost_info", {})
+    node = PlanNode(operation, detail=data.get("message", ""))
+    if operation == "table":
+        node.table = data.get("table_name", "")
+        node.access_type = data.get("access_type", "")
+        node.key = data.get("key", "") or ""
+        node.possible_keys = data.get("possible_keys", []) or []
+        node.used_key_parts = data.get("used_key_parts", []) or []
+        node.rows = number(data.get("rows_examined_per_scan"))
+        node.rows_produced = number(data.get("rows_produced_per_join"))
+        node.filtered = number(data.get("filtered"), 100.0)
+        node.cost = number(cost_info.get("read_cost")) + number(cost_info.get("eval_cost"))
+        node.condition = data.get("attached_condition", "")
+    elif operation == "query_block":
+        node.cost = number(cost_info.get("query_cost"))
+    else:
+        node.cost = number(cost_info.get("sort_cost"))
+    node.using_filesort = bool(data.get("using_filesort"))
+    node.using_temporary = bool(data.get("using_temporary_table"))
+    node.children = json_children(data)
+    return node
+
+
+def parse_json(data: Union[str, bytes, dict]) -> Plan:
+    """解析mysql `EXPLAIN FORMAT=JSON`
+
+    Args:
+        data (Union[str, bytes, dict]): json文本或解析后的dict
+
+    Returns:
+        Plan: 执行计划
+    """
+    if isinstance(data, (str, bytes)):
+        data = json.loads(data)
+    root = json_node("query_block", data.get("query_block", data))
+    return Plan(root, root.cost, "json", data)
+
+
+# ---------------------------------------------------------------- mysql analyze
+
+ANALYZE_LINE = re.compile(r"^(?P<indent>\s*)-> (?P<detail>.*?)\s*(?:\((?P<estimate>cost=[^)]*)\))?\s*(?:\((?P<actual>actual [^)]*|never executed)\))?\s*$")
+ANALYZE_ACCESS = (
+    # (描述前缀, 访问类型)
+    ("Table scan on ", "ALL"),
+    ("Index scan on ", "index"),
+    ("Covering index scan on ", "index"),
+    ("Index range scan on ", "range"),
+    ("Covering index range scan on ", "range"),
+    ("Index lookup on ", "ref"),
+    ("Covering index lookup on ", "ref"),
+    ("Single-row index lookup on ", "eq_ref"),
+    ("Single-row covering index lookup on ", "eq_ref"),
+    ("Constant row from ", "const"),
+    ("Rows fetched before execution", "const"),
+    ("Full-text index search on ", "fulltext"),
+)
+
+
+def analyze_values(text: str) -> dict:
+    """`cost=0.35..10.2 rows=100` 转为 {cost: 10.2, rows: 100},范围取结束值"""
+    values = {}
+    for key, value in re.findall(r"([\w ]+?)=([\d.eE+-]+(?:\.\.[\d.eE+-]+)?)", text or ""):
+        values[key.strip()] = number(value.split("..")[-1])
+    return values
+
+
+def analyze_node(detail: str, estimate: str, actual: str) -> PlanNode:
+    node = PlanNode(detail, detail=detail)
+    values = analyze_values(estimate)
+    node.cost = values.get("cost", 0.0)
+    node.rows = node.rows_produced = values.get("rows", 0.0)
+    if actual and actual != "never executed":
+        values = analyze_values(actual)
+        node.actual_time = values.get("actual time")
+        node.actual_rows = values.get("rows")
+        node.loops = int(values.get("loops", 1))
+    elif actual == "never executed":
+        node.loops = 0
+    for prefix, access_type in ANALYZE_ACCESS:
+        if detail.startswith(prefix):
+            node.access_type = access_type
+            rest = detail[len(prefix):]
+            match = re.match(r"`?(?P<table>[\w$]+)`?(?: using (?P<key>[\w$]+))?(?: \((?P<cond>.*)\))?", rest)
+            if match and prefix != "Rows fetched before execution":
+                node.table = match.group("table")
+                node.key = match.group("key") or ""
+                node.condition = match.group("cond") or ""
+                node.used_key_parts = re.findall(r"(\w+)\s*[=<>]", node.condition)
+            break
+    if detail.startswith("Filter: "):
+        node.condition = detail[len("Filter: "):]
+    if detail.startswith("Sort") and "row IDs" not in detail:
+        node.using_filesort = True
+    if "temporary" in detail.lower() or detail.startswith("Materialize"):
+        node.using_temporary = True
+    return node
+
+
+def parse_analyze(text: str) -> Plan:
+    """解析mysql `EXPLAIN ANALYZE` / `EXPLAIN FORMAT=TREE` 的树形文本
+
+    Args:
+        text (str): 执行计划文本
+
+    Returns:
+        Plan: 执行计划,节点包含实际行数、耗时和循环次数
+    """
+    root = PlanNode("root")
+    stack = [(-1, root)]
+    for line in text.splitlines():
+        match = ANALYZE_LINE.match(line)
+        if not match:
+            continue
+        indent = len(match.group("indent"))
+        node = analyze_node(match.group("detail"), match.group("estimate"), match.group("actual"))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        stack[-1][1].children.append(node)
+        stack.append((indent, node))
+    if len(root.children) == 1:
+        root = root.children[0]
+    return Plan(root, root.cost, "analyze", text)
+
+
+# ---------------------------------------------------------------- dm
+
+# 行号按固定宽度对齐,以 `#` 所在列作为缩进
+DM_LINE = re.compile(r"^(?P<indent>\s*\d+\s+)#(?P<op>[\w ]+?):\s*\[(?P<cost>[\d.]+),\s*(?P<rows>[\d.]+),\s*(?P<bytes>[\d.]+)\];?\s*(?P<detail>.*?)\s*$")
+DM_ACCESS = (
+    # (操作前缀, 访问类型)
+    ("CSCN", "ALL"),
+    ("SSCN", "index"),
+    ("CSEK", "ref"),
+    ("SSEK", "ref"),
+    ("BLKUP", "eq_ref"),
+)
+DM_KEYWORDS = {"scan_type", "scan_range", "exp_num", "exp_cnt", "is_atom", "grp_num", "sfun_num", "distinct_flag"}
+
+
+def parse_dm(text: str) -> Plan:
+    """解析达梦 `explain` 文本,如 `1   #NSET2: [1, 1, 30]`
+
+    Args:
+        text (str): 执行计划文本
+
+    Returns:
+        Plan: 执行计划
+    """
+    root = PlanNode("root")
+    stack = [(-1, root)]
+    for line in str(text).splitlines():
+        match = DM_LINE.match(line)
+        if not match:
+            continue
+        operation, detail = match.group("op").strip(), match.group("detail")
+        node = PlanNode(
+            operation,
+            cost=number(match.group("cost")),
+            rows=number(match.group("rows")),
+            rows_produced=number(match.group("rows")),
+            detail=detail,
+        )
+        for prefix, access_type in DM_ACCESS:
+            if operation.startswith(prefix):
+                node.access_type = access_type
+                for key, table in re.findall(r"(\w+)\((\w+)\)", detail):
+                    if key.lower() not in DM_KEYWORDS and table.upper() not in ("ASC", "DESC", "TRUE", "FALSE"):
+                        node.key, node.table = key, table
+                        break
+                break
+        if operation.startswith("SORT"):
+            node.using_filesort = True
+        if operation.startswith(("HAGR", "DIST")) or "TEMP" in operation:
+            node.using_temporary = True
+        indent = len(match.group("indent"))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        stack[-1][1].children.append(node)
+        stack.append((indent, node))
+    if len(root.children) == 1:
+        root = root.children[0]
+    return Plan(root, root.cost, "dm", text)
+
+
+# ---------------------------------------------------------------- sqlite
+
+
+# ex: SEARCH user USING COVERING INDEX idx_status (status=?), SEARCH user USING INTEGER PRIMARY KEY (rowid=?)
+SQLITE_ACCESS = re.compile(
+    r"(?P<op>SCAN|SEARCH) (?:TABLE )?(?P<table>\w+)(?: AS \w+)?"
+    r"(?: USING (?:(?:AUTOMATIC )?(?P<covering>COVERING )?INDEX(?: (?P<key>\w+))?|(?P<pk>(?:INTEGER )?PRIMARY KEY))"
+    r"(?: \((?P<condition>.*)\))?)?$"
+)
+
+
+def parse_sqlite(rows: List[dict]) -> Plan:
+    """解析sqlite `EXPLAIN QUERY PLAN`,结果行为 {id, parent, detail}
+
+    Args:
+        rows (List[dict]): 执行计划
+
+    Returns:
+        Plan: 执行计划,sqlite不提供代价和行数估算
+    """
+    root = PlanNode("root")
+    nodes = {0: root}
+    for row in rows:
+        detail = row["detail"]
+        node = PlanNode(detail.split(" ", 1)[0], detail=detail)
+        match = SQLITE_ACCESS.match(detail)
+        if match:
+            node.table = match.group("table")
+            if match.group("op") == "SCAN":
+                node.access_type = "index" if match.group("covering") else "ALL"
+            else:
+                node.condition = match.group("condition") or ""
+                node.used_key_parts = re.findall(r"(\w+)\s*[=<>]", node.condition)
+                node.access_type = "ref" if "=" in node.condition and not re.search(r"[<>]", node.condition) else "range"
+            node.key = match.group("key") or ("PRIMARY" if match.group("pk") else "")
+        if "TEMP B-TREE" in detail:
+            node.using_temporary = True
+            node.using_filesort = "ORDER BY" in detail
+        nodes[row["id"]] = node
+        nodes.get(row["parent"], root).children.append(node)
+    return Plan(root, 0.0, "sqlite", rows)
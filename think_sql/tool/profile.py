@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass
+class QueryEvent:
+    """单条sql执行事件
+
+    Attributes:
+        operation (str): 操作类型 query|execute|cursor
+        table (str): 表名
+        sql (str): sql模板
+        params (tuple): 绑定参数
+        build (float): 执行前准备耗时(秒),包含缓存检查、连接选择、sql拼接
+        execute (float): 执行耗时(秒),写操作包含提交耗时
+        fetch (float): 取数耗时(秒)
+        rows (int): 返回行数或影响行数
+        bytes (int): 返回数据的估算字节数
+        connection_id (int): 连接id(mysql为服务端线程id)
+        database (str): 数据库名
+        time (float): 开始时间戳
+        error (Exception): 执行异常
+    """
+
+    operation: str
+    table: str
+    sql: str
+    params: tuple = ()
+    build: float = 0.0
+    execute: float = 0.0
+    fetch: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    connection_id: int = 0
+    database: str = ""
+    time: float = 0.0
+    error: Optional[Exception] = None
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """总耗时(秒)"""
+        return self.build + self.execute + self.fetch
+
+    @property
+    def params_count(self) -> int:
+        """绑定参数个数"""
+        return len(self.params)
+
+
+def payload_size(rows: List[dict]) -> int:
+    """估算查询结果字节数,字符串/二进制按长度计算,其他值按8字节计算"""
+    size = 0
+    for row in rows:
+        for value in row.values():
+            if isinstance(value, (str, bytes, bytearray)):
+                size += len(value)
+            elif value is not None:
+                size += 8
+    return size
+
+
+class QueryTimer:
+    """sql执行分段计时,依次调用 `mark()` 标记执行开始、执行结束"""
+
+    __slots__ = ("time", "marks")
+
+    def __init__(self):
+        self.time = time.time()
+        self.marks = [time.perf_counter()]
+
+    def mark(self):
+        """标记阶段结束"""
+        self.marks.append(time.perf_counter())
+
+    def event(
+        self,
+        operation: str,
+        table: str,
+        sql: str,
+        params: Any = (),
+        rows: int = 0,
+        result: List[dict] = None,
+        db=None,
+        error: Exception = None,
+    ) -> QueryEvent:
+        """生成执行事件
+
+        Args:
+            operation (str): 操作类型
+            table (str): 表名
+            sql (str): sql模板
+            params (Any, optional): 绑定参数. Defaults to ().
+            rows (int, optional): 影响行数,有查询结果时取结果行数. Defaults to 0.
+            result (List[dict], optional): 查询结果. Defaults to None.
+            db (Database, optional): 执行的连接. Defaults to None.
+            error (Exception, optional): 执行异常. Defaults to None.
+
+        Returns:
+            QueryEvent: 执行事件
+        """
+        marks = self.marks + [time.perf_counter()]
+        spans = [b - a for a, b in zip(marks, marks[1:])] + [0.0, 0.0]
+        return QueryEvent(
+            operation=operation,
+            table=table,
+            sql=sql,
+            params=tuple(params or ()),
+            build=spans[0],
+            execute=spans[1],
+            fetch=spans[2],
+            rows=len(result) if result is not None else rows,
+            bytes=payload_size(result) if result else 0,
+            connection_id=db.connection_id() if db is not None else 0,
+            database=db.database if db is not None else "",
+            time=self.time,
+            error=error,
+        )
@@ -0,0 +1,190 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from think_sql.tool.fingerprint import fingerprint, normalize
+from think_sql.tool.profile import QueryEvent
+
+STOP = object()
+
+
+class SlowQuery:
+    """同一指纹的慢sql汇总
+
+    Attributes:
+        fingerprint (str): sql指纹
+        sql (str): 归一化sql
+        table (str): 表名
+        count (int): 次数
+        total (float): 总耗时(秒)
+        max (float): 最大耗时(秒)
+        samples (deque): 最近的慢sql样本 {sql, params, duration, time, connection_id}
+        explain (Any): 执行计划分析结果,分析完成前为None
+    """
+
+    def __init__(self, fp: str, event: QueryEvent, samples: int = 5):
+        self.fingerprint = fp
+        self.sql = normalize(event.sql)
+        self.table = event.table
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=samples)
+        self.explain = None
+
+    def __repr__(self):
+        return f"<SlowQuery {self.fingerprint} count={self.count} total={self.total:.3f}s sql={self.sql[:80]}>"
+
+    def add(self, event: QueryEvent):
+        duration = event.duration
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(
+            {
+                "sql": event.sql,
+                "params": event.params,
+                "duration": duration,
+                "time": event.time,
+                "connection_id": event.connection_id,
+            }
+        )
+
+    @property
+    def avg(self) -> float:
+        """平均耗时(秒)"""
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "table": self.table,
+            "count": self.count,
+            "total": self.total,
+            "avg": self.avg,
+            "max": self.max,
+            "samples": list(self.samples),
+            "explain": self.explain,
+        }
+
+
+class SlowQueryLog:
+    """慢sql记录
+
+    监听sql执行事件,耗时超过 `ms` 毫秒的sql按指纹汇总,
+    每个指纹第一次出现时交给后台线程使用独立连接分析执行计划(`db.analyze_slow`),不阻塞业务请求
+    """
+
+    def __init__(
+        self,
+        db,
+        ms: float = 200,
+        explain: bool = True,
+        max_fingerprints: int = 1000,
+        analyzer: Callable[[Any, str, tuple], Any] = None,
+    ):
+        """实例化慢sql记录
+
+        Args:
+            db (Database): 数据库连接
+            ms (float, optional): 慢sql阈值(毫秒). Defaults to 200.
+            explain (bool, optional): 是否分析执行计划. Defaults to True.
+            max_fingerprints (int, optional): 最多记录的指纹数. Defaults to 1000.
+            analyzer (Callable[[Any, str, tuple], Any], optional): 执行计划分析函数,
+                参数为 (独立连接, sql模板, 绑定参数),默认 `conn.analyze_slow(sql, params)`. Defaults to None.
+        """
+        self.db = db
+        self.threshold = ms / 1000
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.analyzer = analyzer or (lambda conn, sql, params: conn.analyze_slow(sql, params))
+        self.log = db.log
+        self.queries: Dict[str, SlowQuery] = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.queue = queue.Queue()
+        self.conn = None
+        self.thread = None
+        db.on_query(self.record)
+
+    def __repr__(self):
+        return f"<class 'think_sql.tool.slow.SlowQueryLog' threshold={self.threshold * 1000:.0f}ms fingerprints={len(self.queries)}>"
+
+    def record(self, event: QueryEvent):
+        """sql执行事件回调"""
+        if event.error is not None or event.duration < self.threshold:
+            return
+        fp = fingerprint(event.sql)
+        with self.lock:
+            slow = self.queries.get(fp)
+            first = slow is None
+            if first:
+                if len(self.queries) >= self.max_fingerprints:
+                    return
+                slow = self.queries[fp] = SlowQuery(fp, event)
+            slow.add(event)
+        if first and self.explain and not self.closed:
+            self.__start()
+            self.queue.put((slow, event.sql, event.params))
+
+    def __start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run, daemon=True)
+            self.thread.start()
+
+    def __run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is STOP:
+                    break
+                slow, sql, params = item
+                try:
+                    if self.conn is None:
+                        self.conn = self.db.clone()
+                    slow.explain = self.analyzer(self.conn, sql, params)
+                except Exception as e:
+                    slow.explain = f"explain failed: {e}"
+                    self.log.warning(f"[slow] explain failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def top(self, n: int = 10, by: str = "total") -> List[SlowQuery]:
+        """慢sql排行
+
+        Args:
+            n (int, optional): 条数. Defaults to 10.
+            by (str, optional): 排序字段 total|count|max|avg. Defaults to "total".
+
+        Returns:
+            List[SlowQuery]: 慢sql汇总列表
+        """
+        with self.lock:
+            queries = list(self.queries.values())
+        return sorted(queries, key=lambda q: getattr(q, by), reverse=True)[:n]
+
+    def flush(self):
+        """等待执行计划分析完成"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """停止记录并关闭分析连接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.db.off_query(self.record)
+        if self.thread is not None:
+            self.queue.put(STOP)
+            self.thread.join()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception as e:
+                self.log.warning(e)
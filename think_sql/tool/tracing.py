@@ -0,0 +1,317 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import json
+import time
+import random
+import threading
+import contextlib
+import contextvars
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from think_sql.tool.log import logger
+
+# 当前span
+current_span = contextvars.ContextVar("think_sql_current_span", default=None)
+
+
+def get_current_span() -> Optional["Span"]:
+    """获取当前span"""
+    return current_span.get()
+
+
+class SpanContext:
+    """span标识,trace_id 128位, span_id 64位"""
+
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: int, span_id: int):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @property
+    def is_valid(self) -> bool:
+        return bool(self.trace_id and self.span_id)
+
+
+class Span:
+    """span,接口与 OpenTelemetry `Span` 保持一致"""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"] = None,
+        kind: str = "INTERNAL",
+        attributes: Dict[str, Any] = None,
+        start_time: int = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.parent = parent.get_span_context() if parent else None
+        trace_id = self.parent.trace_id if self.parent else random.getrandbits(128)
+        self.context = SpanContext(trace_id, random.getrandbits(64))
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[dict] = []
+        self.status = "UNSET"
+        self.status_description = ""
+        self.start_time = start_time or time.time_ns()
+        self.end_time = None
+
+    def __repr__(self):
+        return f"<Span {self.name} trace_id={self.context.trace_id:032x} span_id={self.context.span_id:016x}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        if exc_value is not None:
+            self.record_exception(exc_value)
+            self.set_status("ERROR", str(exc_value))
+        self.end()
+
+    def get_span_context(self) -> SpanContext:
+        return self.context
+
+    def is_recording(self) -> bool:
+        return self.end_time is None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Dict[str, Any] = None, timestamp: int = None):
+        self.events.append(
+            {
+                "name": name,
+                "attributes": dict(attributes or {}),
+                "timestamp": timestamp or time.time_ns(),
+            }
+        )
+
+    def record_exception(self, exception: BaseException, attributes: Dict[str, Any] = None, **kwargs):
+        event = {
+            "exception.type": type(exception).__name__,
+            "exception.message": str(exception),
+        }
+        event.update(attributes or {})
+        self.add_event("exception", event)
+
+    def set_status(self, status: Any, description: str = None):
+        self.status = getattr(status, "status_code", status)
+        self.status = getattr(self.status, "name", self.status)
+        self.status_description = description or getattr(status, "description", "") or ""
+
+    def update_name(self, name: str):
+        self.name = name
+
+    def end(self, end_time: int = None):
+        if self.end_time is not None:
+            return
+        self.end_time = end_time or time.time_ns()
+        self.tracer.export(self)
+
+    @property
+    def duration(self) -> float:
+        """耗时(秒)"""
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": f"{self.context.trace_id:032x}",
+            "span_id": f"{self.context.span_id:016x}",
+            "parent_id": f"{self.parent.span_id:016x}" if self.parent else None,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status,
+            "status_description": self.status_description,
+            "resource": self.tracer.resource,
+        }
+
+
+class Tracer:
+    """tracer,接口与 OpenTelemetry `Tracer` 保持一致,结束的span交给exporter导出"""
+
+    def __init__(self, exporter: "SpanExporter" = None, name: str = "think_sql", resource: dict = None):
+        self.exporter = exporter or InMemorySpanExporter()
+        self.name = name
+        self.resource = resource or {"service.name": name}
+
+    def start_span(
+        self,
+        name: str,
+        context: Any = None,
+        kind: Any = "INTERNAL",
+        attributes: Dict[str, Any] = None,
+        start_time: int = None,
+        **kwargs,
+    ) -> Span:
+        """创建span,父span为当前span"""
+        parent = context if isinstance(context, Span) else get_current_span()
+        kind = getattr(kind, "name", kind)
+        return Span(self, name, parent, kind, attributes, start_time)
+
+    @contextlib.contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        context: Any = None,
+        kind: Any = "INTERNAL",
+        attributes: Dict[str, Any] = None,
+        start_time: int = None,
+        record_exception: bool = True,
+        set_status_on_exception: bool = True,
+        end_on_exit: bool = True,
+        **kwargs,
+    ) -> Iterator[Span]:
+        """创建span并设为当前span"""
+        span = self.start_span(name, context, kind, attributes, start_time)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if record_exception:
+                span.record_exception(e)
+            if set_status_on_exception:
+                span.set_status("ERROR", str(e))
+            raise
+        finally:
+            current_span.reset(token)
+            if end_on_exit:
+                span.end()
+
+    def export(self, span: Span):
+        try:
+            self.exporter.export([span])
+        except Exception as e:
+            logger.warning(f"[trace] export span {span.name} failed: {e}")
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+
+class SpanExporter:
+    """span导出"""
+
+    def export(self, spans: Sequence[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """保存在内存中,用于测试"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]):
+        with self.lock:
+            self.spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self.lock:
+            self.spans = []
+
+
+class JsonLinesExporter(SpanExporter):
+    """每个span一行json写入文件"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]):
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+        with self.lock:
+            self.file.write(lines)
+            self.file.flush()
+
+    def shutdown(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def query_span(tracer: Any, event, system: str = ""):
+    """根据sql执行事件生成span
+
+    Args:
+        tracer (Any): Tracer 或 OpenTelemetry Tracer
+        event (QueryEvent): sql执行事件
+        system (str, optional): 数据库类型. Defaults to "".
+    """
+    statement = event.sql.lstrip().split(" ", 1)[0].upper()
+    start = int(event.time * 1e9)
+    attributes = {
+        "db.system": system,
+        "db.name": event.database,
+        "db.statement": event.sql,
+        "db.operation": statement,
+        "db.sql.table": event.table,
+        "think_sql.operation": event.operation,
+        "think_sql.rows": event.rows,
+        "think_sql.bytes": event.bytes,
+        "think_sql.connection_id": event.connection_id,
+        "think_sql.build_ms": event.build * 1000,
+        "think_sql.execute_ms": event.execute * 1000,
+        "think_sql.fetch_ms": event.fetch * 1000,
+    }
+    span = tracer.start_span(
+        f"{statement} {event.table}", kind=client_kind(), attributes=attributes, start_time=start
+    )
+    if event.error is not None:
+        span.record_exception(event.error)
+        status = error_status(str(event.error))
+        if isinstance(status, str):
+            span.set_status(status, str(event.error))
+        else:
+            span.set_status(status)
+    span.end(end_time=start + int(event.duration * 1e9))
+
+
+@lru_cache(maxsize=None)
+def otel() -> Any:
+    """已安装 opentelemetry 时返回 `opentelemetry.trace` 模块"""
+    try:
+        from opentelemetry import trace
+
+        return trace
+    except ImportError:
+        return None
+
+
+def client_kind() -> Any:
+    """span类型CLIENT,安装 opentelemetry 时使用其 SpanKind"""
+    trace = otel()
+    return trace.SpanKind.CLIENT if trace else "CLIENT"
+
+
+def error_status(description: str) -> Any:
+    """错误状态,安装 opentelemetry 时使用其 Status"""
+    trace = otel()
+    if trace:
+        return trace.Status(trace.StatusCode.ERROR, description)
+    return "ERROR"
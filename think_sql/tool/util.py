@@ -3,7 +3,10 @@
 __author__ = "hbh112233abc@163.com"
 
 import re
-from typing import Optional, Union
+import json
+import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -55,11 +58,34 @@ class DBConfig(BaseModel):
         dbc = DBConfig.model_validate(config)
         return dbc
 
+# 字典配置快速路径允许的字段类型
+CONFIG_TYPES = {
+    "type": str,
+    "host": str,
+    "port": int,
+    "user": str,
+    "password": str,
+    "database": (str, type(None)),
+}
+
+
+def plain_config(config: dict) -> bool:
+    """字典配置的字段和类型都正确时无需校验"""
+    return all(
+        k in CONFIG_TYPES and isinstance(v, CONFIG_TYPES[k]) and not isinstance(v, bool)
+        for k, v in config.items()
+    )
+
+
 def db_config(config:Union[str,dict,DBConfig])->DBConfig:
     if isinstance(config, str):
         config = DBConfig.parse_dsn(config)
     elif isinstance(config, dict):
-        config = DBConfig.model_validate(config)
+        if plain_config(config):
+            # 跳过 pydantic 校验,缺省字段使用默认值
+            config = DBConfig.model_construct(**config)
+        else:
+            config = DBConfig.model_validate(config)
     if not isinstance(config, DBConfig):
         raise ValueError(
             """
@@ -76,6 +102,55 @@ def db_config(config:Union[str,dict,DBConfig])->DBConfig:
         )
     return config
 
+class ClusterConfig(BaseModel):
+    primary: DBConfig = Field(description="Primary(write) database")
+    replicas: List[DBConfig] = Field(
+        default_factory=list, description="Replica(read) databases"
+    )
+    strategy: str = Field(
+        default="round_robin",
+        description="Replica choosing strategy: `round_robin` or `least_latency`",
+    )
+    max_lag: Optional[int] = Field(
+        default=None,
+        description="Exclude replicas whose replication lag(seconds) is over `max_lag`, None: not check",
+    )
+    sticky: float = Field(
+        default=0,
+        description="Read from primary within `sticky` seconds after a write(read-your-writes)",
+    )
+    check_interval: float = Field(
+        default=5, description="Replica health check interval seconds"
+    )
+
+
+def is_cluster_config(config: Any) -> bool:
+    """判断是否主从配置"""
+    if isinstance(config, ClusterConfig):
+        return True
+    return isinstance(config, dict) and "primary" in config
+
+
+def cluster_config(config: Union[dict, DBConfig, ClusterConfig]) -> ClusterConfig:
+    """生成主从配置
+
+    Args:
+        config (Union[dict, DBConfig, ClusterConfig]): {"primary":..., "replicas":[...]},
+            primary/replicas 支持 str|dict|DBConfig, 传入单个数据库配置时无从库
+
+    Returns:
+        ClusterConfig: 主从配置
+    """
+    if isinstance(config, ClusterConfig):
+        return config
+    if not is_cluster_config(config):
+        return ClusterConfig(primary=db_config(config))
+    config = dict(config)
+    config["primary"] = db_config(config["primary"])
+    config["replicas"] = [db_config(c) for c in config.get("replicas", [])]
+    return ClusterConfig.model_validate(config)
+
+
 def to_number(s: Union[str, int, float], key: str = ""):
     """转换为数值
 
@@ -105,3 +180,80 @@ def to_number(s: Union[str, int, float], key: str = ""):
         raise ValueError(f"`{key}` must number")
 
     return s
+
+
+INT_TYPES = ("int", "integer", "tinyint", "smallint", "mediumint", "bigint", "byte")
+NUMBER_TYPES = ("decimal", "numeric", "number", "dec", "float", "double", "real")
+STRING_TYPES = ("char", "varchar", "varchar2", "nchar", "nvarchar", "text", "tinytext", "mediumtext", "longtext", "clob", "enum", "set")
+BINARY_TYPES = ("binary", "varbinary", "blob", "tinyblob", "mediumblob", "longblob", "image", "bfile")
+
+
+def column_type(type_str: str) -> str:
+    """获取字段基础类型名
+
+    Args:
+        type_str (str): 字段类型,ex: `int(10) unsigned`,`VARCHAR`
+
+    Returns:
+        str: 小写基础类型名,ex: `int`,`varchar`
+    """
+    if not type_str:
+        return ""
+    return re.split(r"[\s(]", str(type_str).strip().lower(), 1)[0]
+
+
+def make_converter(src_type: str, dst_type: str) -> Optional[Callable[[Any], Any]]:
+    """按源字段类型和目标字段类型生成值转换函数
+
+    Args:
+        src_type (str): 源字段类型
+        dst_type (str): 目标字段类型
+
+    Returns:
+        Optional[Callable[[Any], Any]]: 转换函数,无需转换时返回None
+    """
+    src = column_type(src_type)
+    dst = column_type(dst_type)
+    if src and src == dst:
+        return None
+
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        if dst in INT_TYPES or dst == "bit":
+            if isinstance(value, bytes):
+                return int.from_bytes(value, "big")
+            if isinstance(value, (bool, Decimal, float)):
+                return int(value)
+            if isinstance(value, str):
+                return to_number(value)
+            return value
+        if dst in NUMBER_TYPES:
+            if isinstance(value, str):
+                return Decimal(value.strip())
+            if isinstance(value, bool):
+                return int(value)
+            return value
+        if dst in STRING_TYPES:
+            if isinstance(value, bytes):
+                return value.decode("utf-8")
+            if isinstance(value, (dict, list)):
+                return json.dumps(value, ensure_ascii=False)
+            if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+                return value.isoformat(" ") if isinstance(value, datetime.datetime) else value.isoformat()
+            if not isinstance(value, str):
+                return str(value)
+            return value
+        if dst in BINARY_TYPES:
+            if isinstance(value, str):
+                return value.encode("utf-8")
+            return value
+        if dst == "json":
+            if isinstance(value, (dict, list)):
+                return json.dumps(value, ensure_ascii=False)
+            if isinstance(value, bytes):
+                return value.decode("utf-8")
+            return value
+        return value
+
+    return convert
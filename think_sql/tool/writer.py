@@ -0,0 +1,149 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+__author__ = "hbh112233abc@163.com"
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Union
+
+# 队列控制标记
+FLUSH = object()
+STOP = object()
+
+
+class AsyncWriter:
+    """后台批量写入(write-behind)
+
+    `insert()` 只把数据放入有界队列,后台线程使用独立连接消费队列,
+    每累计 `batch_size` 行或距首行超过 `interval_ms` 毫秒时以多行INSERT写入.
+    队列满时 `insert()` 阻塞(背压),写入失败时调用 `on_error(err, rows)`.
+    数据表对象只创建一次并在各批次间复用,写入失败后丢弃,下一批重新创建(会检查并重连)
+    """
+
+    def __init__(
+        self,
+        db,
+        table_name: str,
+        batch_size: int = 500,
+        interval_ms: int = 200,
+        queue_size: int = 10000,
+        on_error: Callable[[Exception, List[dict]], None] = None,
+    ):
+        """实例化后台写入
+
+        Args:
+            db (Database): 数据库连接,后台线程使用 `db.clone()` 创建的独立连接
+            table_name (str): 表名
+            batch_size (int, optional): 每批写入行数. Defaults to 500.
+            interval_ms (int, optional): 最长等待毫秒数. Defaults to 200.
+            queue_size (int, optional): 队列最大行数. Defaults to 10000.
+            on_error (Callable[[Exception, List[dict]], None], optional):
+                写入失败回调,参数为异常和该批数据. Defaults to None.
+        """
+        self.db = db
+        self.table_name = table_name
+        self.batch_size = max(int(batch_size), 1)
+        self.interval = max(int(interval_ms), 0) / 1000
+        self.on_error = on_error
+        self.log = db.log
+        self.queue = queue.Queue(maxsize=max(int(queue_size), 1))
+        self.stats = {"written": 0, "failed": 0, "batches": 0}
+        self.closed = False
+        self.conn = db.clone()
+        self.table = None
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return f"<class 'think_sql.tool.writer.AsyncWriter' table={self.table_name} pending={self.queue.qsize()}>"
+
+    def insert(
+        self,
+        data: Union[dict, List[dict]],
+        block: bool = True,
+        timeout: float = None,
+    ):
+        """放入写入队列
+
+        Args:
+            data (Union[dict, List[dict]]): 待写入数据
+            block (bool, optional): 队列满时是否等待. Defaults to True.
+            timeout (float, optional): 最长等待秒数. Defaults to None.
+
+        Raises:
+            RuntimeError: 已关闭
+            queue.Full: 队列满且不等待或等待超时
+        """
+        if self.closed:
+            raise RuntimeError(f"AsyncWriter of {self.table_name} is closed")
+        rows = [data] if isinstance(data, dict) else data
+        for row in rows:
+            self.queue.put(row, block, timeout)
+
+    def flush(self):
+        """立即写入队列中的全部数据并等待完成"""
+        if self.closed:
+            return
+        self.queue.put(FLUSH)
+        self.queue.join()
+
+    def close(self):
+        """写入剩余数据后停止后台线程并关闭连接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(STOP)
+        self.thread.join()
+        try:
+            self.conn.close()
+        except Exception as e:
+            self.log.warning(e)
+
+    def __run(self):
+        buffer: List[dict] = []
+        deadline = 0.0
+        while True:
+            timeout = max(deadline - time.time(), 0) if buffer else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                buffer = self.__write(buffer)
+                continue
+            if item is FLUSH or item is STOP:
+                buffer = self.__write(buffer)
+                self.queue.task_done()
+                if item is STOP:
+                    break
+                continue
+            if not buffer:
+                deadline = time.time() + self.interval
+            buffer.append(item)
+            if len(buffer) >= self.batch_size:
+                buffer = self.__write(buffer)
+
+    def __write(self, buffer: List[dict]) -> List[dict]:
+        """按字段分组写入,返回新的空缓冲区"""
+        groups: Dict[tuple, List[dict]] = {}
+        for row in buffer:
+            groups.setdefault(tuple(row.keys()), []).append(row)
+        for rows in groups.values():
+            try:
+                if self.table is None:
+                    self.table = self.conn.table(self.table_name)
+                self.table.insert(rows)
+                self.stats["written"] += len(rows)
+            except Exception as e:
+                self.table = None
+                self.stats["failed"] += len(rows)
+                if self.on_error:
+                    try:
+                        self.on_error(e, rows)
+                    except Exception as err:
+                        self.log.exception(err)
+                else:
+                    self.log.exception(e)
+            self.stats["batches"] += 1
+        for _ in buffer:
+            self.queue.task_done()
+        return []